@@ -7,8 +7,17 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
+# The deployment directory is read-only: keep upload checkpoints under /tmp
+os.environ.setdefault('CHECKPOINT_STORE', 'filesystem')
+# Background threads do not outlive a function invocation: start no job workers
+os.environ.setdefault('JOB_WORKERS', '0')
+
 # Import the Flask app
 from app import app
 
+# A function invocation cannot run a whole sheet: the upload form drives
+# /slices one bounded slice of rows per request instead of /jobs
+app.config['SLICED_UPLOADS'] = True
+
 # Vercel expects the app to be exported
 # The Flask app is now available as 'app'
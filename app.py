@@ -1,8 +1,9 @@
-from flask import Flask, render_template, request, send_file, redirect, url_for, flash, session
+from flask import Flask, render_template, request, send_file, redirect, url_for, flash, session, Response, stream_with_context
 import pandas as pd
-import requests
+import http_client
 import json
 from paper_count import GetPublicationsByName, GetCitedByCountFromOpenAlex, GetPublicationsFromORCID, _get_publications_from_orcid
+from paper_count import FetchORCIDProfile, PrefetchDOIMetadata, _profile_dois, _profile_reused_dois, _lookup_orcid_works
 from bs4 import BeautifulSoup
 import urllib.parse
 
@@ -93,6 +94,7 @@ def index():
     prof_name = ''
     error = None
     stats = None
+    source_status = None
 
     if request.method == 'POST':
         prof_name = request.form.get('prof_name', '').strip()
@@ -104,7 +106,7 @@ def index():
         if prof_name:
             try:
                 print(f"DEBUG index: About to call GetPublicationsByName with prof_name={prof_name}, start_year={start_year}, end_year={end_year}")
-                pubs = GetPublicationsByName(prof_name, start_date_str, end_date_str)
+                pubs, source_status = GetPublicationsByName(prof_name, start_date_str, end_date_str, return_status=True)
                 publications = pubs
                 # compute stats using start year derived from start_date_str
                 try:
@@ -127,7 +129,8 @@ def index():
     cache_info = f"Faculty cache has {len(faculty_cache)} ORCIDs loaded" if faculty_cache else "No faculty data loaded yet. Upload an Excel file first."
     print(f"DEBUG: Rendering index page with cache_info: {cache_info}")
     print(f"   Current faculty_cache contents: {dict(list(faculty_cache.items())[:3])}")  # Show first 3
-    return render_template('index.html', prof_name=prof_name, publications=publications, error=error, cache_info=cache_info, stats=stats)
+    return render_template('index.html', prof_name=prof_name, publications=publications, error=error, cache_info=cache_info, stats=stats, source_status=source_status,
+                           sliced_uploads=app.config.get('SLICED_UPLOADS', False))
 
 def _find_column(df, keywords):
     """Find first column name in df that contains any of the keywords (case-insensitive)."""
@@ -170,6 +173,37 @@ def _detect_orcid_column(df, sample_size=50, threshold=0.25):
     return None
 
 
+def _normalize_orcid_series(values):
+    """Normalize a whole column of ORCID cells (bare iD, orcid.org URL, quoted).
+
+    Returns bare upper-case 0000-0000-0000-000X iDs, and '' for empty cells
+    and placeholders without a single digit ('N/A', '-', 'none'), whose rows
+    fall back to the name search.  Other cells that do not look like an iD
+    are attempts at one: they come back cleaned but otherwise as typed, so
+    that validation can report them.
+    """
+    s = values.astype('string').fillna('').str.strip().str.strip('<>"\'').str.strip()
+    s = s.str.replace(r'^(?:https?://)?(?:www\.|sandbox\.)?orcid\.org/', '', regex=True, case=False)
+    s = s.str.strip().str.rstrip('/').str.strip('<>"\'').str.strip()
+    parts = s.str.upper().str.extract(r'^(\d{4})[-\s]?(\d{4})[-\s]?(\d{4})[-\s]?(\d{3}[\dX])$')
+    matched = parts[0].notna()
+    s = s.where(~matched, parts[0] + '-' + parts[1] + '-' + parts[2] + '-' + parts[3])
+    s = s.where(s.str.contains(r'\d', regex=True), '')
+    return s.astype(object)
+
+
+def _orcid_checksum_ok(orcid):
+    """ISO 7064 mod 11-2 check of a normalized ORCID iD (the last character is the check digit)."""
+    digits = str(orcid).replace('-', '')
+    if len(digits) != 16 or not digits[:15].isdigit():
+        return False
+    total = 0
+    for d in digits[:15]:
+        total = (total + int(d)) * 2
+    check = (12 - total % 11) % 11
+    return digits[15] == ('X' if check == 10 else str(check))
+
+
 def _detect_scholar_column(df):
     """Try to detect a Google Scholar identifier or URL column by header or value patterns."""
     keywords = ['scholar', 'google scholar', 'gsid', 'scholar_id', 'scholar id', 'scholar url']
@@ -209,7 +243,7 @@ def _get_scholar_citation_count(profile_url_or_id):
             val = f"https://scholar.google.com/citations?user={urllib.parse.quote(val)}&hl=en"
         # fetch page
         headers = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36"}
-        r = requests.get(val, headers=headers, timeout=10)
+        r = http_client.get(val, headers=headers, timeout=10)
         if r.status_code != 200:
             return None
         soup = BeautifulSoup(r.text, 'html.parser')
@@ -259,11 +293,12 @@ def _search_openalex_author_by_name(name, max_retries=3):
                 'search': name_clean,
                 'per-page': 10
             }
-            q = requests.get(url, params=params, timeout=10)
+            q = http_client.get(url, params=params, timeout=10)
             if q.status_code != 200:
                 print(f"OpenAlex API returned {q.status_code} for name '{name_clean}'")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # exponential backoff
+                    # exponential backoff on the shared OpenAlex limiter, so every thread slows down
+                    http_client.backoff(url, 2 ** attempt)
                 continue
             
             data = q.json()
@@ -304,507 +339,865 @@ def _search_openalex_author_by_name(name, max_retries=3):
         except Exception as e:
             print(f"OpenAlex search error for '{name_clean}' (attempt {attempt+1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # exponential backoff
+                http_client.backoff('api.openalex.org', 2 ** attempt)  # exponential backoff
             continue
     
     print(f"Failed to find author on OpenAlex after {max_retries} attempts: {name_clean}")
     return None
 
 
-@app.route('/upload', methods=['POST'])
-def upload():
+def _fetch_and_enrich_threaded(orcids, from_year, to_year, max_workers):
+    """Thread-pool stages 1-3 of process_upload; same contract as async_engine.fetch_and_enrich."""
+    import concurrent.futures
+    import contextvars
+    # Stage 1: fetch every distinct ORCID's work summaries concurrently
+    orcid_profiles = {}
+    orcid_errors = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_orcid = {
+            executor.submit(contextvars.copy_context().run, FetchORCIDProfile, o, from_year, to_year, raise_errors=True): o
+            for o in orcids
+        }
+        for fut in concurrent.futures.as_completed(future_to_orcid):
+            try:
+                profile = fut.result()
+            except http_client.PermanentFetchError as e:
+                print(f"Stage 1 fetch failed permanently for {future_to_orcid[fut]}: {e}")
+                orcid_errors[future_to_orcid[fut]] = e
+                continue
+            except Exception as e:
+                # Retryable outcomes are retried per row in stage 4
+                print(f"Stage 1 fetch failed for {future_to_orcid[fut]}: {e}")
+                continue
+            if profile.get('works') is not None:
+                orcid_profiles[future_to_orcid[fut]] = profile
+    # Stage 2: global set of unique DOIs (co-authored papers appear once) of new or
+    # modified works, and of reused works, whose citation counts may have expired
+    all_dois, reused_dois = set(), set()
+    for profile in orcid_profiles.values():
+        all_dois.update(_profile_dois(profile))
+        reused_dois.update(_profile_reused_dois(profile))
+    # Stage 3: enrich that set once, with batching
+    print(f"DEBUG: Enriching {len(all_dois)} unique DOIs across {len(orcid_profiles)} ORCID profiles")
+    try:
+        PrefetchDOIMetadata(sorted(all_dois), citation_dois=sorted(reused_dois - all_dois))
+        for profile in orcid_profiles.values():
+            profile['enriched'] = True
+    except Exception as e:
+        print(f"DEBUG: Batch DOI enrichment failed, falling back to per-profile enrichment: {e}")
+    return orcid_profiles, orcid_errors
+
+
+def _upload_form():
+    """Read the upload form: (file, faculty_file, process_upload keyword arguments)."""
     # Expect a file input named 'file' and optional sheet_name
     f = request.files.get('file')
     sheet_name = request.form.get('sheet_name') or 0
     # Optional user-specified start/end years for bulk processing (overrides join year)
     user_start_year_str = request.form.get('start_year', '').strip()
     user_end_year_str = request.form.get('end_year', '').strip()
-    # We'll keep both full parsed datetimes (for exact range) and year fallbacks
     user_start_year = None
     user_end_year = None
-    user_start_date_dt = None
-    user_end_date_dt = None
-    import datetime as _dt
     try:
         if user_start_year_str:
             user_start_year = int(user_start_year_str)
-            user_start_date_dt = _dt.datetime(user_start_year, 1, 1)
     except Exception:
         user_start_year = None
-        user_start_date_dt = None
     try:
         if user_end_year_str:
             user_end_year = int(user_end_year_str)
-            user_end_date_dt = _dt.datetime(user_end_year, 12, 31)
     except Exception:
         user_end_year = None
-        user_end_date_dt = None
+    # 'threads' (default) or 'async' fetch engine
+    engine = request.form.get('engine') or 'threads'
+    # Optionally a separate faculty file mapping (form field 'faculty_file') to override join years
+    faculty_file = request.files.get('faculty_file')
+    # Optional wall-clock budget in seconds (JOB_DEADLINE by default); past it a partial workbook is returned
+    deadline = request.form.get('deadline', '').strip() or None
+    params = {'sheet_name': sheet_name, 'start_year': user_start_year, 'end_year': user_end_year, 'engine': engine,
+              'deadline': deadline}
+    return f, faculty_file, params
+
+
+@app.route('/upload', methods=['POST'])
+def upload():
+    f, faculty_file, params = _upload_form()
     if not f:
         flash('No file uploaded', 'danger')
         return redirect(url_for('index'))
 
+    import jobs
+    deadline = jobs.job_deadline(params.pop('deadline'))
+    budget = http_client.Budget(deadline) if deadline else None
     try:
-        # Read Excel into DataFrame
-        import io
-        import pandas as pd
-        file_bytes = f.read()
-        excel = pd.ExcelFile(io.BytesIO(file_bytes))
-        # default to first sheet if provided sheet_name not in workbook
+        out_path = process_upload(f.read(), faculty_bytes=faculty_file.read() if faculty_file else None,
+                                  budget=budget, **params)
+    except http_client.BudgetExceeded:
+        flash('The deadline was reached before the workbook could be written', 'danger')
+        return redirect(url_for('index'))
+    except UploadError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('index'))
+    except Exception as e:
+        flash(f'Failed to process uploaded file: {e}', 'danger')
+        return redirect(url_for('index'))
+    # send file for download
+    return send_file(out_path, as_attachment=True, download_name='publications_output.xlsx')
+
+
+def _job_queue():
+    """The job queue; its workers are started with the app (_start_job_workers)."""
+    import jobs
+    return jobs.get_queue()
+
+
+def _job_json(job):
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'error': job['error'],
+        'params': job['params'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'cancel_requested': job['cancel_requested'],
+        'partial': job['partial'],
+        'status_url': url_for('job_status', job_id=job['id']),
+        'cancel_url': url_for('cancel_job', job_id=job['id']),
+        'result_url': url_for('job_result', job_id=job['id']),
+    }
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an upload (same form as /upload) and return its job id immediately."""
+    f, faculty_file, params = _upload_form()
+    if not f:
+        return {'error': 'No file uploaded'}, 400
+    queue = _job_queue()
+    job_id = queue.submit(f.read(), params, faculty_bytes=faculty_file.read() if faculty_file else None)
+    return _job_json(queue.get(job_id)), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = _job_queue().get(job_id)
+    if job is None:
+        return {'error': 'Unknown job'}, 404
+    return _job_json(job)
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running job; a running job keeps the rows it finished as a partial workbook."""
+    queue = _job_queue()
+    if queue.cancel(job_id) is None:
+        return {'error': 'Unknown job'}, 404
+    return _job_json(queue.get(job_id)), 202
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events with the job's per-ORCID progress, counters, request rate and ETA."""
+    import jobs
+    queue = _job_queue()
+    if queue.get(job_id) is None:
+        return {'error': 'Unknown job'}, 404
+    return Response(stream_with_context(jobs.stream_events(queue, job_id)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = _job_queue().get(job_id)
+    if job is None:
+        return {'error': 'Unknown job'}, 404
+    # A cancelled job that had started keeps its partial workbook
+    if job['status'] not in ('done', 'cancelled') or not job['result_path']:
+        return _job_json(job), 409
+    return send_file(job['result_path'], as_attachment=True, download_name='publications_output.xlsx')
+
+
+def _slice_limits():
+    """max_rows / seconds for one slice: form or query fields, else SLICE_ROWS / SLICE_SECONDS."""
+    import os
+    limits = {}
+    for name, env, default, cast in (('max_rows', 'SLICE_ROWS', 10, int), ('seconds', 'SLICE_SECONDS', 8.0, float)):
+        value = request.values.get(name, '').strip() or os.environ.get(env)
         try:
-            if sheet_name and isinstance(sheet_name, str) and sheet_name.isdigit():
-                sheet_name = int(sheet_name)
-            if sheet_name not in excel.sheet_names and isinstance(sheet_name, str):
-                sheet_name = excel.sheet_names[0]
-        except Exception:
+            limits[name] = cast(value) if value else default
+        except ValueError:
+            limits[name] = default
+        if limits[name] <= 0:
+            limits[name] = default
+    return limits
+
+
+def _slice_response(sliced, limits):
+    if sliced is None:
+        return {'error': 'Unknown or expired token'}, 404
+    token, out_path, status = sliced
+    if out_path is not None:
+        return send_file(out_path, as_attachment=True, download_name='publications_output.xlsx')
+    max_rows = limits['max_rows']
+    if not status['processed']:
+        # Nothing finished within the time budget: retry with fewer rows per slice
+        if max_rows == 1:
+            return dict(status, token=token, error=f"A single row does not finish within {limits['seconds']:g}s; "
+                                                   f"continue with a larger 'seconds'"), 503
+        max_rows = max(1, max_rows // 2)
+    return dict(status, token=token,
+                continue_url=url_for('continue_slices', token=token, max_rows=max_rows, seconds=limits['seconds'])), 202
+
+
+@app.route('/slices', methods=['POST'])
+def start_slices():
+    """Chunked upload (same form as /upload): process the first slice and answer with a continuation token.
+
+    For serverless hosts, where one request cannot run a whole sheet.  While
+    rows remain the answer is 202 with the token and a continue_url to POST
+    to for the next slice; the call that finishes the batch returns the workbook.
+    continue_url carries the slice limits, halving max_rows after a slice
+    that finished nothing.
+    """
+    f, faculty_file, params = _upload_form()
+    if not f:
+        return {'error': 'No file uploaded'}, 400
+    # Each slice gets its own time budget instead of a deadline for the whole batch
+    params.pop('deadline')
+    limits = _slice_limits()
+    try:
+        return _slice_response(process_upload_slice(file_bytes=f.read(), params=params,
+                                                    faculty_bytes=faculty_file.read() if faculty_file else None,
+                                                    **limits), limits)
+    except UploadError as e:
+        return {'error': str(e)}, 400
+
+
+@app.route('/slices/<token>', methods=['POST'])
+def continue_slices(token):
+    limits = _slice_limits()
+    try:
+        return _slice_response(process_upload_slice(token, **limits), limits)
+    except UploadError as e:
+        return {'error': str(e)}, 400
+
+
+class UploadError(ValueError):
+    """The uploaded sheet itself cannot be processed (shown to the user as-is)."""
+
+
+def process_upload(file_bytes, sheet_name=0, start_year=None, end_year=None, engine='threads',
+                   faculty_bytes=None, progress=None, budget=None, max_rows=None, checkpoint_store=None):
+    """Run the batch pipeline on an uploaded faculty workbook.
+
+    start_year/end_year override each row's join year for the publication
+    range; faculty_bytes is an optional separate faculty join-year workbook.  engine selects how ORCID profiles are fetched and their DOIs
+    enriched: 'threads' (a thread pool over the synchronous fetchers) or
+    'async' (async_engine, many requests in flight).  Returns the path of
+    the generated .xlsx; raises UploadError for sheets that cannot be used.
+
+    progress, if given, is called as progress(event, **data) while the batch
+    runs: 'stage' (stage=...), 'start' (total=ORCIDs/rows to process,
+    restored=how many of them come from checkpoints and are reported first) and
+    one 'orcid' per processed ORCID or row (outcome='succeeded', 'fallback',
+    'failed' or 'not_reached'); see jobs.JobProgress.
+
+    Every completed result is checkpointed (see checkpoints.py): running the
+    same workbook with the same parameters again, e.g. after a restart,
+    only processes the rows that had not finished.
+
+    budget (an http_client.Budget) lets the caller cancel the batch or give
+    it a deadline: once it is spent, no further API calls are made and the
+    workbook is written with what was finished, plus a 'Not Reached' sheet
+    listing the remaining rows.
+
+    max_rows turns on slice mode (see process_upload_slice): only that many
+    unfinished ORCIDs/rows are processed, every result (errors included) is
+    checkpointed, and None is returned instead of a workbook while rows
+    remain.  checkpoint_store overrides checkpoints.get_store().
+    """
+    token = http_client.use_budget(budget)
+    try:
+        return _process_upload(file_bytes, sheet_name, start_year, end_year, engine, faculty_bytes, progress, budget,
+                               max_rows, checkpoint_store)
+    finally:
+        http_client.reset_budget(token)
+
+
+def _process_upload(file_bytes, sheet_name, start_year, end_year, engine, faculty_bytes, progress, budget,
+                    max_rows, checkpoint_store):
+    import datetime as _dt
+    import checkpoints
+    import contextvars
+    batch = checkpoints.batch_key(file_bytes, faculty_bytes, sheet_name=sheet_name,
+                                  start_year=start_year, end_year=end_year)
+    # We'll keep both full parsed datetimes (for exact range) and year fallbacks
+    user_start_date_dt = _dt.datetime(start_year, 1, 1) if start_year else None
+    user_end_date_dt = _dt.datetime(end_year, 12, 31) if end_year else None
+
+    # Read Excel into DataFrame
+    import io
+    import pandas as pd
+    excel = pd.ExcelFile(io.BytesIO(file_bytes))
+    # default to first sheet if provided sheet_name not in workbook
+    try:
+        if sheet_name and isinstance(sheet_name, str) and sheet_name.isdigit():
+            sheet_name = int(sheet_name)
+        if sheet_name not in excel.sheet_names and isinstance(sheet_name, str):
             sheet_name = excel.sheet_names[0]
+    except Exception:
+        sheet_name = excel.sheet_names[0]
 
-        df = pd.read_excel(io.BytesIO(file_bytes), sheet_name=sheet_name)
+    df = pd.read_excel(io.BytesIO(file_bytes), sheet_name=sheet_name)
 
-        # If the sheet uses a non-zero header row (e.g., your sample uses header=2),
-        # try to detect the correct header by scanning the first few rows for a 'Join' column.
-        preferred_join_cols = ['Join Date', 'Join Year', 'Join', 'join date', 'join']
-        found_join = False
-        for header_row in range(0, 5):
-            try:
-                tmp = pd.read_excel(io.BytesIO(file_bytes), sheet_name=sheet_name, header=header_row)
-            except Exception:
-                continue
-            for col in tmp.columns:
-                low = str(col).strip().lower()
-                for k in preferred_join_cols:
-                    if k.lower() == low:
-                        df = tmp
-                        found_join = True
-                        break
-                if found_join:
+    # If the sheet uses a non-zero header row (e.g., your sample uses header=2),
+    # try to detect the correct header by scanning the first few rows for a 'Join' column.
+    preferred_join_cols = ['Join Date', 'Join Year', 'Join', 'join date', 'join']
+    found_join = False
+    for header_row in range(0, 5):
+        try:
+            tmp = pd.read_excel(io.BytesIO(file_bytes), sheet_name=sheet_name, header=header_row)
+        except Exception:
+            continue
+        for col in tmp.columns:
+            low = str(col).strip().lower()
+            for k in preferred_join_cols:
+                if k.lower() == low:
+                    df = tmp
+                    found_join = True
                     break
             if found_join:
-                print(f"DEBUG: Detected header row={header_row} based on join column")
-                break
-
-        # Locate likely columns
-        orcid_col = _find_column(df, ['orcid'])
-        name_col = _find_column(df, ['name', 'employee', 'full name'])
-        # Prefer exact column names if present (user sample uses 'Join Date' / 'Join Year')
-        # Use case-insensitive matching
-        preferred_join_cols = ['join date', 'join year', 'join', 'start date']
-        join_col = None
-        for c in df.columns:
-            if str(c).strip().lower() in preferred_join_cols:
-                join_col = c
                 break
-        if join_col is None:
-            join_col = _find_column(df, ['join', 'join date', 'start date', 'joined'])
-        print(f"DEBUG: Available columns: {list(df.columns)}")
-        print(f"DEBUG: Detected orcid_col={orcid_col!r}, name_col={name_col!r}, join_col={join_col!r}")
-
-        # Try to detect a Google Scholar column (optional)
-        scholar_col = _detect_scholar_column(df)
-
-        # Pre-parse join date column (vectorized) so year/month are reliable
-        if join_col and join_col in df.columns:
-            print(f"DEBUG: Attempting vectorized parse of join_col={join_col!r}")
-            try:
-                # If the column already contains year values (e.g., 'Join Year'), coerce appropriately
-                if 'year' in str(join_col).lower() and pd.api.types.is_numeric_dtype(df[join_col]):
-                    df['_parsed_join_year'] = df[join_col].astype('Int64')
-                    df['_parsed_join_month'] = None
-                    print(f"DEBUG: Parsed numeric Join Year column")
-                else:
-                    df[join_col] = pd.to_datetime(df[join_col], errors='coerce')
-                    df['_parsed_join_year'] = df[join_col].dt.year
-                    df['_parsed_join_month'] = df[join_col].dt.month
-                    print(f"DEBUG: Parsed datetime join column to year/month")
-            except Exception as e:
-                print(f"DEBUG: Vectorized join parse failed: {e}")
-                df['_parsed_join_year'] = None
+        if found_join:
+            print(f"DEBUG: Detected header row={header_row} based on join column")
+            break
+
+    # Locate likely columns
+    orcid_col = _find_column(df, ['orcid'])
+    name_col = _find_column(df, ['name', 'employee', 'full name'])
+    # Prefer exact column names if present (user sample uses 'Join Date' / 'Join Year')
+    # Use case-insensitive matching
+    preferred_join_cols = ['join date', 'join year', 'join', 'start date']
+    join_col = None
+    for c in df.columns:
+        if str(c).strip().lower() in preferred_join_cols:
+            join_col = c
+            break
+    if join_col is None:
+        join_col = _find_column(df, ['join', 'join date', 'start date', 'joined'])
+    print(f"DEBUG: Available columns: {list(df.columns)}")
+    print(f"DEBUG: Detected orcid_col={orcid_col!r}, name_col={name_col!r}, join_col={join_col!r}")
+
+    # Try to detect a Google Scholar column (optional)
+    scholar_col = _detect_scholar_column(df)
+
+    # Pre-parse join date column (vectorized) so year/month are reliable
+    if join_col and join_col in df.columns:
+        print(f"DEBUG: Attempting vectorized parse of join_col={join_col!r}")
+        try:
+            # If the column already contains year values (e.g., 'Join Year'), coerce appropriately
+            if 'year' in str(join_col).lower() and pd.api.types.is_numeric_dtype(df[join_col]):
+                df['_parsed_join_year'] = df[join_col].astype('Int64')
                 df['_parsed_join_month'] = None
+                print(f"DEBUG: Parsed numeric Join Year column")
+            else:
+                df[join_col] = pd.to_datetime(df[join_col], errors='coerce')
+                df['_parsed_join_year'] = df[join_col].dt.year
+                df['_parsed_join_month'] = df[join_col].dt.month
+                print(f"DEBUG: Parsed datetime join column to year/month")
+        except Exception as e:
+            print(f"DEBUG: Vectorized join parse failed: {e}")
+            df['_parsed_join_year'] = None
+            df['_parsed_join_month'] = None
+    else:
+        print(f"DEBUG: No join_col found or not in df.columns")
+
+    # If header-based detection failed, scan values for ORCID-like patterns
+    if orcid_col is None:
+        orcid_col = _detect_orcid_column(df)
+        if orcid_col:
+            pass
         else:
-            print(f"DEBUG: No join_col found or not in df.columns")
+            raise UploadError('Could not find ORCID column in uploaded file')
 
-        # If header-based detection failed, scan values for ORCID-like patterns
-        if orcid_col is None:
-            orcid_col = _detect_orcid_column(df)
-            if orcid_col:
-                pass
-            else:
-                flash('Could not find ORCID column in uploaded file', 'danger')
-                return redirect(url_for('index'))
+    # Normalize and validate every ORCID cell up front, before any network work
+    df['_orcid'] = _normalize_orcid_series(df[orcid_col])
+    valid_orcids = {o for o in df['_orcid'].unique() if o and _orcid_checksum_ok(o)}
 
-        # Load faculty join years directly from the main uploaded file using LoadFacultyJoinYears
-        faculty_map_by_orcid = {}
-        faculty_map_by_name = {}
-        faculty_df_info = None
+    # Load faculty join years directly from the main uploaded file using LoadFacultyJoinYears
+    faculty_map_by_orcid = {}
+    faculty_map_by_name = {}
+    faculty_df_info = None
+    try:
+        from paper_count import LoadFacultyJoinYears
+        # Use the main uploaded file to extract join years
+        # Try to detect the correct sheet and header
+        main_sheet = sheet_name if sheet_name else excel.sheet_names[0]
+        faculty_map_by_orcid, faculty_map_by_name, faculty_df_info = LoadFacultyJoinYears(
+            file_bytes,
+            sheet_name=main_sheet,
+            header=0 if not found_join else df.columns.tolist().index(join_col) if join_col in df.columns else 0
+        )
+        print(f"DEBUG: Loaded faculty join years from main file: orcid={len(faculty_map_by_orcid)} names={len(faculty_map_by_name)}")
+            
+        # ✅ POPULATE CACHE EARLY - right after loading faculty years
+        global faculty_cache
+        faculty_cache.clear()
+        for orcid, data in faculty_map_by_orcid.items():
+            faculty_cache[str(orcid)] = {
+                'join_year': int(data.get('join_year')) if data.get('join_year') is not None else None,
+                'join_month': int(data.get('join_month')) if data.get('join_month') is not None else None
+            }
+        # Populate faculty_names from mapping by name (lowercased)
         try:
-            from paper_count import LoadFacultyJoinYears
-            # Use the main uploaded file to extract join years
-            # Try to detect the correct sheet and header
-            main_sheet = sheet_name if sheet_name else excel.sheet_names[0]
-            faculty_map_by_orcid, faculty_map_by_name, faculty_df_info = LoadFacultyJoinYears(
-                file_bytes,
-                sheet_name=main_sheet,
-                header=0 if not found_join else df.columns.tolist().index(join_col) if join_col in df.columns else 0
-            )
-            print(f"DEBUG: Loaded faculty join years from main file: orcid={len(faculty_map_by_orcid)} names={len(faculty_map_by_name)}")
+            global faculty_names
+            faculty_names.clear()
+            for name in faculty_map_by_name.keys():
+                if name and isinstance(name, str):
+                    faculty_names.add(name.strip().lower())
+        except Exception:
+            pass
+        print(f"✅ DEBUG: Populated faculty cache EARLY with {len(faculty_cache)} ORCIDs")
+        print(f"   Cache keys: {list(faculty_cache.keys())[:5]}")  # Show first 5
             
-            # ✅ POPULATE CACHE EARLY - right after loading faculty years
-            global faculty_cache
-            faculty_cache.clear()
-            for orcid, data in faculty_map_by_orcid.items():
-                faculty_cache[str(orcid)] = {
-                    'join_year': int(data.get('join_year')) if data.get('join_year') is not None else None,
-                    'join_month': int(data.get('join_month')) if data.get('join_month') is not None else None
-                }
-            # Populate faculty_names from mapping by name (lowercased)
+    except Exception as e:
+        print(f"DEBUG: Failed to load faculty join years from main file: {e}")
+
+    # Optionally load a separate faculty file mapping (form field 'faculty_file') to override
+    if faculty_bytes:
+        try:
+            from paper_count import LoadFacultyJoinYears
+            faculty_map_by_orcid, faculty_map_by_name, faculty_df_info = LoadFacultyJoinYears(faculty_bytes)
+            print(f"DEBUG: Loaded faculty mapping from separate file: orcid={len(faculty_map_by_orcid)} names={len(faculty_map_by_name)}")
             try:
-                global faculty_names
-                faculty_names.clear()
+                # also merge into faculty_names
                 for name in faculty_map_by_name.keys():
                     if name and isinstance(name, str):
                         faculty_names.add(name.strip().lower())
             except Exception:
                 pass
-            print(f"✅ DEBUG: Populated faculty cache EARLY with {len(faculty_cache)} ORCIDs")
-            print(f"   Cache keys: {list(faculty_cache.keys())[:5]}")  # Show first 5
-            
         except Exception as e:
-            print(f"DEBUG: Failed to load faculty join years from main file: {e}")
+            print(f"DEBUG: Failed to load separate faculty mapping file: {e}")
+
+    # Prepare aggregated lists
+    journal_rows = []
+    book_rows = []
+    chapter_rows = []
+    profiles_rows = []  # for fallbacks: name/scholar -> citation counts
+    failed_orcids = []
+
+    # throttling / retry config for per-ORCID calls
+    per_orcid_max_retries = 4
+    per_orcid_retry_delay = 6  # seconds base for exponential backoff
+
+    total_orcids = 0
+    succeeded_orcids = 0
+
+    # Build list of rows to process: include rows that have ORCID, or scholar id/url, or a name (for fallback)
+    rows_to_process = []
+    for idx, row in df.iterrows():
+        orcid = row.get(orcid_col) if orcid_col in df.columns else None
+        scholar_val = row.get(scholar_col) if (scholar_col and scholar_col in df.columns) else None
+        prof_name = row.get(name_col) if name_col else None
+        # Skip rows with no identifiers and no name
+        if (not orcid or (isinstance(orcid, float) and pd.isna(orcid))) and (not scholar_val or (isinstance(scholar_val, float) and pd.isna(scholar_val))) and (not prof_name or (isinstance(prof_name, float) and pd.isna(prof_name))):
+            continue
+        orcid_id = row.get('_orcid') or ''
+        if orcid_id and orcid_id not in valid_orcids:
+            # A typo'd iD can never succeed: report it instead of retrying it
+            failed_orcids.append({'ORCID': str(orcid), 'Error': f'Invalid ORCID iD {orcid_id!r} (format or checksum check failed)'})
+            continue
 
-        # Optionally load a separate faculty file mapping (form field 'faculty_file') to override
-        faculty_file = request.files.get('faculty_file')
-        if faculty_file:
+        # Use pre-parsed join year/month if available (faster and more robust)
+        join_val = row.get(join_col) if join_col else None
+        join_year = None
+        join_month = None
+        if '_parsed_join_year' in df.columns:
             try:
-                from paper_count import LoadFacultyJoinYears
-                faculty_bytes = faculty_file.read()
-                faculty_map_by_orcid, faculty_map_by_name, faculty_df_info = LoadFacultyJoinYears(faculty_bytes)
-                print(f"DEBUG: Loaded faculty mapping from separate file: orcid={len(faculty_map_by_orcid)} names={len(faculty_map_by_name)}")
-                try:
-                    # also merge into faculty_names
-                    for name in faculty_map_by_name.keys():
-                        if name and isinstance(name, str):
-                            faculty_names.add(name.strip().lower())
-                except Exception:
-                    pass
-            except Exception as e:
-                print(f"DEBUG: Failed to load separate faculty mapping file: {e}")
-
-        # Prepare aggregated lists
-        journal_rows = []
-        book_rows = []
-        chapter_rows = []
-        profiles_rows = []  # for fallbacks: name/scholar -> citation counts
-        failed_orcids = []
-
-        # throttling / retry config for per-ORCID calls
-        per_orcid_max_retries = 4
-        per_orcid_retry_delay = 6  # seconds base for exponential backoff
-        per_orcid_min_sleep = 0.2  # small sleep inside worker to avoid tight loops
-
-        total_orcids = 0
-        succeeded_orcids = 0
-
-        # Build list of rows to process: include rows that have ORCID, or scholar id/url, or a name (for fallback)
-        rows_to_process = []
-        for idx, row in df.iterrows():
-            orcid = row.get(orcid_col) if orcid_col in df.columns else None
-            scholar_val = row.get(scholar_col) if (scholar_col and scholar_col in df.columns) else None
-            prof_name = row.get(name_col) if name_col else None
-            # Skip rows with no identifiers and no name
-            if (not orcid or (isinstance(orcid, float) and pd.isna(orcid))) and (not scholar_val or (isinstance(scholar_val, float) and pd.isna(scholar_val))) and (not prof_name or (isinstance(prof_name, float) and pd.isna(prof_name))):
-                continue
-
-            # Use pre-parsed join year/month if available (faster and more robust)
-            join_val = row.get(join_col) if join_col else None
-            join_year = None
-            join_month = None
-            if '_parsed_join_year' in df.columns:
-                try:
-                    parsed_year = df.at[idx, '_parsed_join_year']
-                    parsed_month = df.at[idx, '_parsed_join_month']
-                    if not pd.isna(parsed_year):
-                        join_year = int(parsed_year)
-                    if not pd.isna(parsed_month):
-                        join_month = int(parsed_month)
-                    if join_year is not None:
-                        print(f"DEBUG: Using parsed join year for prof={prof_name!r}: join_val={join_val!r} -> join_year={join_year} join_month={join_month}")
-                except Exception:
-                    # fall back to per-row parsing
-                    try:
-                        if join_val is not None and not pd.isna(join_val):
-                            ts = pd.to_datetime(join_val, errors='coerce')
-                            if not pd.isna(ts):
-                                join_year = int(ts.year)
-                                join_month = int(ts.month)
-                                print(f"DEBUG: Fallback parsed join_val={join_val!r} -> join_year={join_year} join_month={join_month} for prof {prof_name!r}")
-                    except Exception:
-                        pass
-            else:
-                # No pre-parsed column present; parse per-row
+                parsed_year = df.at[idx, '_parsed_join_year']
+                parsed_month = df.at[idx, '_parsed_join_month']
+                if not pd.isna(parsed_year):
+                    join_year = int(parsed_year)
+                if not pd.isna(parsed_month):
+                    join_month = int(parsed_month)
+                if join_year is not None:
+                    print(f"DEBUG: Using parsed join year for prof={prof_name!r}: join_val={join_val!r} -> join_year={join_year} join_month={join_month}")
+            except Exception:
+                # fall back to per-row parsing
                 try:
                     if join_val is not None and not pd.isna(join_val):
                         ts = pd.to_datetime(join_val, errors='coerce')
                         if not pd.isna(ts):
                             join_year = int(ts.year)
                             join_month = int(ts.month)
-                            print(f"DEBUG: Parsed join_val={join_val!r} -> join_year={join_year} join_month={join_month} for prof {prof_name!r}")
+                            print(f"DEBUG: Fallback parsed join_val={join_val!r} -> join_year={join_year} join_month={join_month} for prof {prof_name!r}")
                 except Exception:
                     pass
-            # If join date wasn't provided or parsing failed, log that explicitly
-            if join_year is None:
-                print(f"DEBUG: No valid join_year extracted for prof={prof_name!r}; join_val={join_val!r}")
-                # Try faculty mapping (by ORCID or by name)
+        else:
+            # No pre-parsed column present; parse per-row
+            try:
+                if join_val is not None and not pd.isna(join_val):
+                    ts = pd.to_datetime(join_val, errors='coerce')
+                    if not pd.isna(ts):
+                        join_year = int(ts.year)
+                        join_month = int(ts.month)
+                        print(f"DEBUG: Parsed join_val={join_val!r} -> join_year={join_year} join_month={join_month} for prof {prof_name!r}")
+            except Exception:
+                pass
+        # If join date wasn't provided or parsing failed, log that explicitly
+        if join_year is None:
+            print(f"DEBUG: No valid join_year extracted for prof={prof_name!r}; join_val={join_val!r}")
+            # Try faculty mapping (by ORCID or by name)
+            try:
+                # Try ORCID lookup first
+                orcid_lookup = None
+                if orcid_col in df.columns:
+                    raw_orcid = row.get(orcid_col)
+                    if raw_orcid is not None and not (isinstance(raw_orcid, float) and pd.isna(raw_orcid)):
+                        orcid_lookup = str(raw_orcid).strip()
+                if orcid_lookup and orcid_lookup in faculty_map_by_orcid:
+                    entry = faculty_map_by_orcid[orcid_lookup]
+                    join_year = entry.get('join_year')
+                    join_month = entry.get('join_month')
+                    print(f"DEBUG: Filled join_year from faculty_map_by_orcid for prof={prof_name!r}: {join_year}")
+                elif prof_name and prof_name.strip().lower() in faculty_map_by_name:
+                    entry = faculty_map_by_name[prof_name.strip().lower()]
+                    join_year = entry.get('join_year')
+                    join_month = entry.get('join_month')
+                    print(f"DEBUG: Filled join_year from faculty_map_by_name for prof={prof_name!r}: {join_year}")
+            except Exception as e:
+                print(f"DEBUG: faculty map lookup failed: {e}")
+        rows_to_process.append({
+            'row': row,
+            'orcid': orcid_id,
+            'prof_name': prof_name,
+            'join_year': join_year,
+            'join_month': join_month,
+            'scholar_val': scholar_val
+        })
+
+    total_orcids = len(rows_to_process)
+
+    # Effective start/end datetimes for every entry
+    # Priority: user-provided dates > defaults (ignore join_year for date range)
+    batch_start_dt = user_start_date_dt if user_start_date_dt is not None else _dt.datetime(2000, 1, 1)
+    batch_end_dt = user_end_date_dt if user_end_date_dt is not None else _dt.datetime(2050, 12, 31)
+
+    # Worker function to process a single row (suitable for threading)
+    def _process_single(entry):
+        import time, random
+        # Rows not started before a cancel or deadline are reported as not reached
+        http_client.check_budget()
+        row = entry['row']
+        prof_name = entry['prof_name']
+        join_year = entry['join_year']
+        join_month = entry['join_month']
+        scholar_val = entry.get('scholar_val')
+
+        orcid_str = entry['orcid']
+
+        start_dt = batch_start_dt
+        end_dt = batch_end_dt
+
+        # If ORCID is present, fetch publications as before. Otherwise attempt fallbacks.
+        if orcid_str:
+            print(f"Processing ORCID: {orcid_str}")
+            pubs = None
+            last_error = None
+            # Stage 1 already saw a permanent failure (bad iD, deactivated record): go straight to fallback
+            stage1_error = orcid_errors.get(orcid_str)
+            attempts = 0 if stage1_error is not None else per_orcid_max_retries
+            if stage1_error is not None:
+                last_error = str(stage1_error)
+            for attempt in range(attempts):
                 try:
-                    # Try ORCID lookup first
-                    orcid_lookup = None
-                    if orcid_col in df.columns:
-                        raw_orcid = row.get(orcid_col)
-                        if raw_orcid is not None and not (isinstance(raw_orcid, float) and pd.isna(raw_orcid)):
-                            orcid_lookup = str(raw_orcid).strip()
-                    if orcid_lookup and orcid_lookup in faculty_map_by_orcid:
-                        entry = faculty_map_by_orcid[orcid_lookup]
-                        join_year = entry.get('join_year')
-                        join_month = entry.get('join_month')
-                        print(f"DEBUG: Filled join_year from faculty_map_by_orcid for prof={prof_name!r}: {join_year}")
-                    elif prof_name and prof_name.strip().lower() in faculty_map_by_name:
-                        entry = faculty_map_by_name[prof_name.strip().lower()]
-                        join_year = entry.get('join_year')
-                        join_month = entry.get('join_month')
-                        print(f"DEBUG: Filled join_year from faculty_map_by_name for prof={prof_name!r}: {join_year}")
+                    # Use the already computed start_dt and end_dt from outside the retry loop
+                    print(f"DEBUG: Calling ORCID fetch for orcid={orcid_str!r} prof={prof_name!r} start_dt={start_dt} end_dt={end_dt}")
+                    # Use lower-level function that accepts full datetimes so we preserve month/day if user provided them
+                    # First attempt reuses the profile fetched in stage 1; retries refetch
+                    profile = orcid_profiles.get(orcid_str) if attempt == 0 else None
+                    pubs = _get_publications_from_orcid(orcid_str, start_dt, end_dt, profile=profile, raise_errors=True)
+                except http_client.RateLimitedError as e:
+                    # The ORCID limiter is already paused for Retry-After; the next call waits it out
+                    last_error = str(e)
+                    print(f"Attempt {attempt+1} rate limited for {orcid_str}: {last_error} (Retry-After: {e.retry_after})")
+                    continue
+                except http_client.RetryableFetchError as e:
+                    last_error = str(e)
+                    if attempt < per_orcid_max_retries - 1:
+                        sleep_time = per_orcid_retry_delay * (attempt + 1) + random.uniform(0, 0.5)
+                        print(f"Attempt {attempt+1} failed for {orcid_str}: {last_error}. Retrying in {sleep_time:.1f}s...")
+                        time.sleep(sleep_time)
+                    continue
                 except Exception as e:
-                    print(f"DEBUG: faculty map lookup failed: {e}")
-            rows_to_process.append({
-                'row': row,
+                    # Permanent: repeating the same call cannot help
+                    last_error = str(e)
+                    print(f"ORCID fetch for {orcid_str} failed permanently: {last_error}")
+                    break
+
+                # A valid record with nothing in range is an answer, not a failure to retry
+                if not (pubs.get('journal') or pubs.get('book') or pubs.get('chapter')):
+                    last_error = 'ORCID record has no displayable data'
+                    break
+
+                print(f"Success fetching ORCID {orcid_str} on attempt {attempt+1}")
+                return {
+                    'orcid': orcid_str,
+                    'prof_name': prof_name,
+                    'join_year': join_year,
+                    'join_month': join_month,
+                    'pubs': pubs,
+                    'error': None,
+                    'effective_start_year': int(start_dt.year) if start_dt is not None else None,
+                    'effective_end_year': int(end_dt.year) if end_dt is not None else None
+                }
+
+            # ORCID failed or has no data: try fallback search
+            print(f"ORCID {orcid_str} failed or has no displayable data. Attempting fallback (scholar/name)...")
+            if scholar_val and not (isinstance(scholar_val, float) and pd.isna(scholar_val)):
+                sc_val = str(scholar_val).strip()
+                print(f"Attempting Google Scholar scrape for {prof_name}: {sc_val}")
+                cit = _get_scholar_citation_count(sc_val)
+                if cit is not None:
+                    print(f"Success: Found {cit} citations via Google Scholar for {prof_name}")
+                    return {
+                        'orcid': orcid_str,
+                        'prof_name': prof_name,
+                        'join_year': join_year,
+                        'join_month': join_month,
+                        'pubs': None,
+                        'profile_citations': cit,
+                        'profile_source': 'google_scholar',
+                        'profile_works_count': None,
+                        'profile_h_index': None,
+                        'profile_i10_index': None,
+                        'error': None,
+                        'used_fallback': True,
+                        'effective_start_year': int(start_dt.year) if start_dt is not None else None,
+                        'effective_end_year': int(end_dt.year) if end_dt is not None else None
+                    }
+                print(f"Google Scholar scrape failed for {prof_name}")
+
+            # Try OpenAlex author search by name
+            if prof_name and str(prof_name).strip():
+                print(f"Attempting OpenAlex search for {prof_name}")
+                oa = _search_openalex_author_by_name(prof_name)
+                if oa:
+                    print(f"Success: Found OpenAlex author for {prof_name}")
+                    return {
+                        'orcid': orcid_str,
+                        'prof_name': prof_name,
+                        'join_year': join_year,
+                        'join_month': join_month,
+                        'pubs': None,
+                        'profile_citations': oa.get('cited_by_count'),
+                        'profile_source': 'openalex',
+                        'profile_openalex_id': oa.get('id'),
+                        'profile_works_count': oa.get('works_count'),
+                        'profile_h_index': oa.get('h_index'),
+                        'profile_i10_index': oa.get('i10_index'),
+                        'error': None,
+                        'used_fallback': True,
+                        'effective_start_year': int(start_dt.year) if start_dt is not None else None,
+                        'effective_end_year': int(end_dt.year) if end_dt is not None else None
+                    }
+                print(f"OpenAlex search failed for {prof_name}")
+
+            # Fallback also failed - record error
+            return {
+                'orcid': orcid_str,
                 'prof_name': prof_name,
                 'join_year': join_year,
                 'join_month': join_month,
-                'scholar_val': scholar_val
-            })
-
-        total_orcids = len(rows_to_process)
-
-        # Worker function to process a single row (suitable for threading)
-        def _process_single(entry):
-            import time, random
-            row = entry['row']
-            prof_name = entry['prof_name']
-            join_year = entry['join_year']
-            join_month = entry['join_month']
-            scholar_val = entry.get('scholar_val')
-
-            orcid = row.get(orcid_col) if orcid_col in df.columns else None
-            orcid_str = ''
-            if orcid is not None and not (isinstance(orcid, float) and pd.isna(orcid)):
-                orcid_str = str(orcid).strip()
-                try:
-                    if 'orcid.org' in orcid_str.lower():
-                        parts = orcid_str.replace('http://', '').replace('https://', '').split('/')
-                        orcid_str = parts[-1] if parts[-1] else parts[-2]
-                    orcid_str = orcid_str.strip().strip('<>').strip('"').strip("'")
-                except Exception:
-                    pass
-
-            # Determine effective start/end datetimes for this entry
-            # Priority: user-provided dates > defaults (ignore join_year for date range)
-            import datetime as _dt
-            try:
-                if user_start_date_dt is not None:
-                    start_dt = user_start_date_dt
-                else:
-                    start_dt = _dt.datetime(2000, 1, 1)
-
-                if user_end_date_dt is not None:
-                    end_dt = user_end_date_dt
-                else:
-                    end_dt = _dt.datetime(2050, 12, 31)
-            except Exception:
-                start_dt = _dt.datetime(2000, 1, 1)
-                end_dt = _dt.datetime(2050, 12, 31)
-
-            # If ORCID is present, fetch publications as before. Otherwise attempt fallbacks.
-            if orcid_str:
-                print(f"Processing ORCID: {orcid_str}")
-                pubs = None
-                last_error = None
-                orcid_has_data = False
-                from datetime import datetime, timezone
-                for attempt in range(per_orcid_max_retries):
-                    try:
-                        # Use the already computed start_dt and end_dt from outside the retry loop
-                        print(f"DEBUG: Calling ORCID fetch for orcid={orcid_str!r} prof={prof_name!r} start_dt={start_dt} end_dt={end_dt}")
-                        # Use lower-level function that accepts full datetimes so we preserve month/day if user provided them
-                        pubs = _get_publications_from_orcid(orcid_str, start_dt, end_dt)
-                        if pubs is None:
-                            raise ValueError('ORCID call returned None')
-                        
-                        # Check if publications dict has any actual data (not empty across all categories)
-                        has_journal = bool(pubs.get('journal'))
-                        has_book = bool(pubs.get('book'))
-                        has_chapter = bool(pubs.get('chapter'))
-                        orcid_has_data = has_journal or has_book or has_chapter
-                        
-                        if not orcid_has_data:
-                            raise ValueError('ORCID record has no displayable data')
-                        
-                        time.sleep(per_orcid_min_sleep + random.uniform(0, 0.05))
-                        print(f"Success fetching ORCID {orcid_str} on attempt {attempt+1}")
-                        return {
-                            'orcid': orcid_str,
-                            'prof_name': prof_name,
-                            'join_year': join_year,
-                            'join_month': join_month,
-                            'pubs': pubs,
-                            'error': None,
-                            'effective_start_year': int(start_dt.year) if start_dt is not None else None,
-                            'effective_end_year': int(end_dt.year) if end_dt is not None else None
-                        }
-                    except Exception as e:
-                        last_error = str(e)
-                        sleep_time = per_orcid_retry_delay * (attempt + 1) + random.uniform(0, 0.5)
-                        print(f"Attempt {attempt+1} failed for {orcid_str}: {last_error}. Retrying in {sleep_time:.1f}s...")
-                        if attempt < per_orcid_max_retries - 1:
-                            time.sleep(sleep_time)
-                        else:
-                            # ORCID failed or has no data: try fallback search
-                            print(f"ORCID {orcid_str} failed or has no displayable data. Attempting fallback (scholar/name)...")
-                            if scholar_val and not (isinstance(scholar_val, float) and pd.isna(scholar_val)):
-                                sc_val = str(scholar_val).strip()
-                                print(f"Attempting Google Scholar scrape for {prof_name}: {sc_val}")
-                                cit = _get_scholar_citation_count(sc_val)
-                                if cit is not None:
-                                    print(f"Success: Found {cit} citations via Google Scholar for {prof_name}")
-                                    return {
-                                        'orcid': orcid_str,
+                'pubs': None,
+                'error': last_error or 'Unknown error',
+                'effective_start_year': int(start_dt.year) if start_dt is not None else None,
+                'effective_end_year': int(end_dt.year) if end_dt is not None else None
+            }
+        else:
+            # No ORCID: try Google Scholar ID (if provided), then OpenAlex name search
+            print(f"No ORCID for '{prof_name}'; attempting fallback (scholar/name)")
+            # Try scholar profile first
+            if scholar_val and not (isinstance(scholar_val, float) and pd.isna(scholar_val)):
+                sc_val = str(scholar_val).strip()
+                print(f"Attempting Google Scholar scrape for {prof_name}: {sc_val}")
+                cit = _get_scholar_citation_count(sc_val)
+                if cit is not None:
+                    print(f"Success: Found {cit} citations via Google Scholar for {prof_name}")
+                    return {
+                        'orcid': None,
+                        'prof_name': prof_name,
+                        'join_year': join_year,
+                        'join_month': join_month,
+                        'pubs': None,
+                        'profile_citations': cit,
+                        'profile_source': 'google_scholar',
+                        'profile_works_count': None,
+                        'profile_h_index': None,
+                        'profile_i10_index': None,
+                        'error': None
+                    }
+                print(f"Google Scholar scrape failed for {prof_name}")
+            # Try OpenAlex author search by name
+            if prof_name and str(prof_name).strip():
+                print(f"Attempting OpenAlex search for {prof_name}")
+                oa = _search_openalex_author_by_name(prof_name)
+                if oa:
+                    print(f"Success: Found OpenAlex author for {prof_name}")
+                    return {
+                                        'orcid': None,
                                         'prof_name': prof_name,
                                         'join_year': join_year,
                                         'join_month': join_month,
                                         'pubs': None,
-                                        'profile_citations': cit,
-                                        'profile_source': 'google_scholar',
-                                        'profile_works_count': None,
-                                        'profile_h_index': None,
-                                        'profile_i10_index': None,
+                                        'profile_citations': oa.get('cited_by_count'),
+                                        'profile_source': 'openalex',
+                                        'profile_openalex_id': oa.get('id'),
+                                        'profile_works_count': oa.get('works_count'),
+                                        'profile_h_index': oa.get('h_index'),
+                                        'profile_i10_index': oa.get('i10_index'),
                                         'error': None,
-                                        'used_fallback': True,
                                         'effective_start_year': int(start_dt.year) if start_dt is not None else None,
                                         'effective_end_year': int(end_dt.year) if end_dt is not None else None
                                     }
-                                print(f"Google Scholar scrape failed for {prof_name}")
-                            
-                            # Try OpenAlex author search by name
-                            if prof_name and str(prof_name).strip():
-                                print(f"Attempting OpenAlex search for {prof_name}")
-                                oa = _search_openalex_author_by_name(prof_name)
-                                if oa:
-                                    print(f"Success: Found OpenAlex author for {prof_name}")
-                                    return {
-                                            'orcid': orcid_str,
-                                            'prof_name': prof_name,
-                                            'join_year': join_year,
-                                            'join_month': join_month,
-                                            'pubs': None,
-                                            'profile_citations': oa.get('cited_by_count'),
-                                            'profile_source': 'openalex',
-                                            'profile_openalex_id': oa.get('id'),
-                                            'profile_works_count': oa.get('works_count'),
-                                            'profile_h_index': oa.get('h_index'),
-                                            'profile_i10_index': oa.get('i10_index'),
-                                            'error': None,
-                                            'used_fallback': True,
-                                            'effective_start_year': int(start_dt.year) if start_dt is not None else None,
-                                            'effective_end_year': int(end_dt.year) if end_dt is not None else None
-                                        }
-                                print(f"OpenAlex search failed for {prof_name}")
-                            
-                            # Fallback also failed - record error
-                                return {
-                                    'orcid': orcid_str,
-                                    'prof_name': prof_name,
-                                    'join_year': join_year,
-                                    'join_month': join_month,
-                                    'pubs': None,
-                                    'error': last_error or 'Unknown error',
-                                    'effective_start_year': int(start_dt.year) if start_dt is not None else None,
-                                    'effective_end_year': int(end_dt.year) if end_dt is not None else None
-                                }
-            else:
-                # No ORCID: try Google Scholar ID (if provided), then OpenAlex name search
-                print(f"No ORCID for '{prof_name}'; attempting fallback (scholar/name)")
-                # Try scholar profile first
-                if scholar_val and not (isinstance(scholar_val, float) and pd.isna(scholar_val)):
-                    sc_val = str(scholar_val).strip()
-                    print(f"Attempting Google Scholar scrape for {prof_name}: {sc_val}")
-                    cit = _get_scholar_citation_count(sc_val)
-                    if cit is not None:
-                        print(f"Success: Found {cit} citations via Google Scholar for {prof_name}")
-                        return {
-                            'orcid': None,
-                            'prof_name': prof_name,
-                            'join_year': join_year,
-                            'join_month': join_month,
-                            'pubs': None,
-                            'profile_citations': cit,
-                            'profile_source': 'google_scholar',
-                            'profile_works_count': None,
-                            'profile_h_index': None,
-                            'profile_i10_index': None,
-                            'error': None
-                        }
-                    print(f"Google Scholar scrape failed for {prof_name}")
-                # Try OpenAlex author search by name
-                if prof_name and str(prof_name).strip():
-                    print(f"Attempting OpenAlex search for {prof_name}")
-                    oa = _search_openalex_author_by_name(prof_name)
-                    if oa:
-                        print(f"Success: Found OpenAlex author for {prof_name}")
-                        return {
-                                            'orcid': None,
-                                            'prof_name': prof_name,
-                                            'join_year': join_year,
-                                            'join_month': join_month,
-                                            'pubs': None,
-                                            'profile_citations': oa.get('cited_by_count'),
-                                            'profile_source': 'openalex',
-                                            'profile_openalex_id': oa.get('id'),
-                                            'profile_works_count': oa.get('works_count'),
-                                            'profile_h_index': oa.get('h_index'),
-                                            'profile_i10_index': oa.get('i10_index'),
-                                            'error': None,
-                                            'effective_start_year': int(start_dt.year) if start_dt is not None else None,
-                                            'effective_end_year': int(end_dt.year) if end_dt is not None else None
-                                        }
-                    print(f"OpenAlex search failed for {prof_name}")
-                # nothing found
-                print(f"No fallback source found for {prof_name}")
-                return {
-                    'orcid': None,
-                    'prof_name': prof_name,
-                    'join_year': join_year,
-                    'join_month': join_month,
-                    'pubs': None,
-                    'profile_citations': None,
-                    'profile_source': None,
-                    'error': 'No ORCID and fallback search returned no results'
-                }
+                print(f"OpenAlex search failed for {prof_name}")
+            # nothing found
+            print(f"No fallback source found for {prof_name}")
+            return {
+                'orcid': None,
+                'prof_name': prof_name,
+                'join_year': join_year,
+                'join_month': join_month,
+                'pubs': None,
+                'profile_citations': None,
+                'profile_source': None,
+                'error': 'No ORCID and fallback search returned no results'
+            }
+
+    # Process up to 5 ORCIDs concurrently
+    import concurrent.futures
+    max_workers = http_client.WORKER_COUNT
 
-        # Process up to 5 ORCIDs concurrently
-        import concurrent.futures
-        max_workers = 5
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_entry = {executor.submit(_process_single, entry): entry for entry in rows_to_process}
-            for fut in concurrent.futures.as_completed(future_to_entry):
-                res = None
-                entry = future_to_entry.get(fut)
+    # Rows sharing an ORCID (one professor listed under two departments) are processed once.
+    entry_groups = {}
+    for i, entry in enumerate(rows_to_process):
+        entry_groups.setdefault(entry['orcid'] or f'row-{i}', []).append(entry)
+
+    # Results checkpointed by an earlier, interrupted run of this batch are reused as they are
+    if checkpoint_store is None:
+        checkpoint_store = checkpoints.get_store()
+    checkpointed = {}
+    if checkpoint_store is not None:
+        try:
+            checkpointed = {k: v for k, v in checkpoint_store.load(batch).items() if k in entry_groups}
+        except Exception as e:
+            print(f"❌ Checkpoint read error: {e}")
+    if checkpointed:
+        print(f"DEBUG: Resuming batch: {len(checkpointed)} of {len(entry_groups)} results restored from checkpoints")
+    pending_groups = {k: group for k, group in entry_groups.items() if k not in checkpointed}
+    # Slice mode: the groups past max_rows are left to later calls
+    deferred = {}
+    if max_rows is not None:
+        keys = list(pending_groups)
+        deferred = {k: pending_groups[k] for k in keys[max_rows:]}
+        pending_groups = {k: pending_groups[k] for k in keys[:max_rows]}
+
+    # Stages 1-3: fetch every distinct ORCID's work summaries, then enrich the
+    # global set of their DOIs once (co-authored papers appear once).
+    # Works are fetched for all years and cached per ORCID; the batch range is
+    # applied locally in stage 4, so ORCIDs cached by an earlier run with any
+    # range are not fetched again.
+    # orcid_errors holds ORCIDs whose fetch failed permanently; not retried in stage 4
+    unique_orcids = [group[0]['orcid'] for group in pending_groups.values() if group[0]['orcid']]
+    stale_orcids = [o for o in unique_orcids if _lookup_orcid_works(o) is None]
+    print(f"DEBUG: {len(unique_orcids) - len(stale_orcids)} of {len(unique_orcids)} ORCIDs served from the works cache")
+    if progress:
+        progress('stage', stage='fetching', orcids=len(stale_orcids), cached=len(unique_orcids) - len(stale_orcids))
+    orcid_profiles, orcid_errors = None, {}
+    try:
+        if engine == 'async':
+            try:
+                import async_engine
+                orcid_profiles, orcid_errors = async_engine.run_fetch_and_enrich(stale_orcids)
+            except ImportError as e:
+                print(f"❌ Async engine unavailable ({e}); using the thread pool")
+        if orcid_profiles is None:
+            orcid_profiles, orcid_errors = _fetch_and_enrich_threaded(stale_orcids, None, None, max_workers)
+    except http_client.BudgetExceeded as e:
+        # Stage 4 reports every row that needed these profiles as not reached
+        print(f"Batch stopped while fetching ORCID records: {e.reason}")
+        orcid_profiles, orcid_errors = {}, {}
+
+    # (entry, reason) for rows left unprocessed when the budget ran out
+    not_reached = []
+
+    def _stage4_results(executor):
+        """Yield (entries, result, crash) per group: checkpointed results first, then each one as it completes."""
+        for key, result in checkpointed.items():
+            yield entry_groups[key], result, None
+        future_to_key = {executor.submit(contextvars.copy_context().run, _process_single, group[0]): key
+                         for key, group in pending_groups.items()}
+        for fut in concurrent.futures.as_completed(future_to_key):
+            key = future_to_key[fut]
+            try:
+                result = fut.result()
+            except http_client.BudgetExceeded as e:
+                not_reached.extend((entry, e.reason) for entry in pending_groups[key])
+                if progress:
+                    progress('orcid', orcid=pending_groups[key][0]['orcid'] or None,
+                             name=pending_groups[key][0]['prof_name'], outcome='not_reached', error=e.reason)
+                continue
+            except Exception as e:
+                if checkpoint_store is not None and max_rows is not None:
+                    # Slice mode must make progress: the crash is reported once, not retried by every slice
+                    try:
+                        checkpoint_store.save(batch, key, {'orcid': pending_groups[key][0]['orcid'] or None,
+                                                           'prof_name': pending_groups[key][0]['prof_name'],
+                                                           'error': f'Worker crash: {e}'})
+                    except Exception as store_error:
+                        print(f"❌ Checkpoint write error for {key}: {store_error}")
+                yield pending_groups[key], None, e
+                continue
+            # Errors are not checkpointed, so a resumed batch retries them, except in slice mode
+            if (checkpoint_store is not None and result is not None
+                    and (max_rows is not None or not result.get('error'))):
                 try:
-                    res = fut.result()
+                    checkpoint_store.save(batch, key, result)
                 except Exception as e:
+                    print(f"❌ Checkpoint write error for {key}: {e}")
+            yield pending_groups[key], result, None
+
+    # Stage 4: fan the enriched records back out to each professor's rows.
+    if progress:
+        progress('stage', stage='processing')
+        progress('start', total=len(entry_groups), restored=len(checkpointed))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for entries, group_res, crash in _stage4_results(executor):
+            if progress:
+                if crash is not None or group_res is None or group_res.get('error'):
+                    outcome = 'failed'
+                elif group_res.get('pubs'):
+                    outcome = 'succeeded'
+                else:
+                    outcome = 'fallback'
+                progress('orcid', orcid=entries[0]['orcid'] or None, name=entries[0]['prof_name'], outcome=outcome,
+                         error=str(crash) if crash is not None else (group_res or {}).get('error'),
+                         source=(group_res or {}).get('profile_source'))
+            for entry in entries:
+                if crash is not None:
                     # Shouldn't usually happen because worker handles errors, but record if it does
                     orig_orcid = entry['row'].get(orcid_col) if entry else 'unknown'
-                    failed_orcids.append({'ORCID': str(orig_orcid), 'Error': f'Worker crash: {e}'})
-                    print(f"Worker crash for {orig_orcid}: {e}")
+                    failed_orcids.append({'ORCID': str(orig_orcid), 'Error': f'Worker crash: {crash}'})
+                    print(f"Worker crash for {orig_orcid}: {crash}")
                     continue
 
+                res = group_res
                 if res is None:
                     continue
+                if entry is not entries[0]:
+                    # Same ORCID result, reported under this row's name and join date
+                    res = dict(res, prof_name=entry['prof_name'], join_year=entry['join_year'], join_month=entry['join_month'])
 
                 # If worker reported an error
                 if res.get('error'):
@@ -913,246 +1306,321 @@ def upload():
                         'Error': None
                     })
 
-        # Normalize, deduplicate and sort publication rows before writing output
-        from statistics import mean
-        from datetime import datetime
-
-        def _normalize_row(p):
-            # produce a normalized copy with canonical keys: 'All Authors', 'Citation Count', 'Publication Date', 'Article DOI', 'Article Title'
-            r = dict(p)
-            # Normalize DOI
-            doi = r.get('Article DOI') or r.get('DOI') or r.get('doi') or r.get('ArticleDOI')
-            if doi:
-                doi = str(doi).strip()
-                doi = doi.replace('https://doi.org/', '').replace('http://doi.org/', '')
-                r['Article DOI'] = doi
-            else:
-                r['Article DOI'] = None
+    # Slice mode: the call that finishes the last rows writes the workbook, from the checkpoints
+    if max_rows is not None and (deferred or not_reached):
+        print(f"DEBUG: Slice done; {len(deferred)} ORCIDs/rows deferred, {len(not_reached)} rows not reached")
+        return None
 
-            # Normalize title
-            title = r.get('Article Title') or r.get('Title') or r.get('Chapter Title') or r.get('Book Title')
-            r['Article Title'] = title
+    if progress:
+        progress('stage', stage='writing')
+
+    # Normalize, deduplicate and sort publication rows before writing output
+    from statistics import mean
+    from datetime import datetime
+
+    def _normalize_row(p):
+        # produce a normalized copy with canonical keys: 'All Authors', 'Citation Count', 'Publication Date', 'Article DOI', 'Article Title'
+        r = dict(p)
+        # Normalize DOI
+        doi = r.get('Article DOI') or r.get('DOI') or r.get('doi') or r.get('ArticleDOI')
+        if doi:
+            doi = str(doi).strip()
+            doi = doi.replace('https://doi.org/', '').replace('http://doi.org/', '')
+            r['Article DOI'] = doi
+        else:
+            r['Article DOI'] = None
+
+        # Normalize title
+        title = r.get('Article Title') or r.get('Title') or r.get('Chapter Title') or r.get('Book Title')
+        r['Article Title'] = title
+
+        # Normalize authors
+        authors = r.get('All Authors') or r.get('authors') or r.get('Authors') or r.get('authors_str')
+        if not authors:
+            # try authors_list
+            a_list = r.get('authors_list') or r.get('Authors List') or []
+            try:
+                names = []
+                for a in a_list:
+                    if isinstance(a, dict):
+                        n = a.get('name') or a.get('full_name')
+                        if n:
+                            names.append(str(n).strip())
+                    elif isinstance(a, str):
+                        names.append(a.strip())
+                if names:
+                    authors = '; '.join(dict.fromkeys(names))
+            except Exception:
+                authors = None
+        if authors:
+            # if comma-separated, convert to semicolon to be consistent
+            if isinstance(authors, str):
+                authors = authors.replace(', ', '; ')
+            r['All Authors'] = authors
+        else:
+            r['All Authors'] = None
 
-            # Normalize authors
-            authors = r.get('All Authors') or r.get('authors') or r.get('Authors') or r.get('authors_str')
-            if not authors:
-                # try authors_list
-                a_list = r.get('authors_list') or r.get('Authors List') or []
+        # Normalize citation count (collect many possible keys)
+        counts = []
+        for k in ('Citation Count', 'citation_count', 'cited_by_count', 'Cited By Count'):
+            if k in r and r.get(k) is not None:
                 try:
-                    names = []
-                    for a in a_list:
-                        if isinstance(a, dict):
-                            n = a.get('name') or a.get('full_name')
-                            if n:
-                                names.append(str(n).strip())
-                        elif isinstance(a, str):
-                            names.append(a.strip())
-                    if names:
-                        authors = '; '.join(dict.fromkeys(names))
+                    counts.append(int(r.get(k)))
                 except Exception:
-                    authors = None
-            if authors:
-                # if comma-separated, convert to semicolon to be consistent
-                if isinstance(authors, str):
-                    authors = authors.replace(', ', '; ')
-                r['All Authors'] = authors
-            else:
-                r['All Authors'] = None
-
-            # Normalize citation count (collect many possible keys)
-            counts = []
-            for k in ('Citation Count', 'citation_count', 'cited_by_count', 'Cited By Count'):
-                if k in r and r.get(k) is not None:
                     try:
-                        counts.append(int(r.get(k)))
+                        counts.append(int(float(r.get(k))))
                     except Exception:
-                        try:
-                            counts.append(int(float(r.get(k))))
-                        except Exception:
-                            pass
-            if counts:
-                # use mean as requested
-                try:
-                    r['Citation Count'] = int(round(mean(counts)))
-                except Exception:
-                    r['Citation Count'] = counts[0]
+                        pass
+        if counts:
+            # use mean as requested
+            try:
+                r['Citation Count'] = int(round(mean(counts)))
+            except Exception:
+                r['Citation Count'] = counts[0]
+        else:
+            r['Citation Count'] = 0
+
+        # Normalize publication date to ISO date string where possible
+        pub_date_raw = r.get('Publication Date') or r.get('publication_date') or r.get('Year') or r.get('year')
+        pub_dt = None
+        if pub_date_raw:
+            try:
+                # If it's already a datetime-like or timestamp, pandas will parse; try pd.to_datetime
+                pub_dt = pd.to_datetime(pub_date_raw, errors='coerce')
+            except Exception:
+                pub_dt = None
+        if pub_dt is not None and not pd.isna(pub_dt):
+            # store ISO date string
+            try:
+                r['Publication Date'] = pub_dt.strftime('%Y-%m-%d')
+            except Exception:
+                r['Publication Date'] = str(pub_dt)
+        else:
+            # Try to coerce year-only values
+            try:
+                y = int(str(pub_date_raw)[:4])
+                r['Publication Date'] = f"{y}-01-01"
+            except Exception:
+                r['Publication Date'] = None
+
+        return r
+
+    def _dedupe_rows(rows):
+        # dedupe using DOI if present, otherwise use normalized title
+        keyed = {}
+        for p in rows:
+            r = _normalize_row(p)
+            key = None
+            if r.get('Article DOI'):
+                key = ('doi', r.get('Article DOI').lower())
             else:
-                r['Citation Count'] = 0
+                t = r.get('Article Title') or ''
+                key = ('title', (str(t).strip().lower()))
 
-            # Normalize publication date to ISO date string where possible
-            pub_date_raw = r.get('Publication Date') or r.get('publication_date') or r.get('Year') or r.get('year')
-            pub_dt = None
-            if pub_date_raw:
+            if key in keyed:
+                existing = keyed[key]
+                # merge citation counts
                 try:
-                    # If it's already a datetime-like or timestamp, pandas will parse; try pd.to_datetime
-                    pub_dt = pd.to_datetime(pub_date_raw, errors='coerce')
+                    existing_counts = existing.get('_merged_counts', [])
+                    existing_counts.append(r.get('Citation Count') or 0)
+                    existing['_merged_counts'] = existing_counts
                 except Exception:
-                    pub_dt = None
-            if pub_dt is not None and not pd.isna(pub_dt):
-                # store ISO date string
+                    pass
+                # merge authors
+                a1 = existing.get('All Authors') or ''
+                a2 = r.get('All Authors') or ''
+                merged_authors = []
+                for s in (a1, a2):
+                    if s:
+                        for name in [n.strip() for n in s.split(';') if n.strip()]:
+                            if name not in merged_authors:
+                                merged_authors.append(name)
+                if merged_authors:
+                    existing['All Authors'] = '; '.join(merged_authors)
+                # choose latest publication date
                 try:
-                    r['Publication Date'] = pub_dt.strftime('%Y-%m-%d')
+                    d1 = pd.to_datetime(existing.get('Publication Date'), errors='coerce')
+                    d2 = pd.to_datetime(r.get('Publication Date'), errors='coerce')
+                    if d2 is not None and not pd.isna(d2) and (d1 is None or pd.isna(d1) or d2 > d1):
+                        existing['Publication Date'] = r.get('Publication Date')
                 except Exception:
-                    r['Publication Date'] = str(pub_dt)
+                    pass
+                # keep other non-null fields from existing
+                keyed[key] = existing
             else:
-                # Try to coerce year-only values
+                # initialize merged counts field
+                new = dict(r)
+                new['_merged_counts'] = [new.get('Citation Count') or 0]
+                keyed[key] = new
+
+        # finalize merged results
+        out = []
+        for k, v in keyed.items():
+            counts = v.pop('_merged_counts', [])
+            if counts:
                 try:
-                    y = int(str(pub_date_raw)[:4])
-                    r['Publication Date'] = f"{y}-01-01"
+                    v['Citation Count'] = int(round(mean([c for c in counts if isinstance(c, (int, float))])))
                 except Exception:
-                    r['Publication Date'] = None
-
-            return r
-
-        def _dedupe_rows(rows):
-            # dedupe using DOI if present, otherwise use normalized title
-            keyed = {}
-            for p in rows:
-                r = _normalize_row(p)
-                key = None
-                if r.get('Article DOI'):
-                    key = ('doi', r.get('Article DOI').lower())
-                else:
-                    t = r.get('Article Title') or ''
-                    key = ('title', (str(t).strip().lower()))
-
-                if key in keyed:
-                    existing = keyed[key]
-                    # merge citation counts
-                    try:
-                        existing_counts = existing.get('_merged_counts', [])
-                        existing_counts.append(r.get('Citation Count') or 0)
-                        existing['_merged_counts'] = existing_counts
-                    except Exception:
-                        pass
-                    # merge authors
-                    a1 = existing.get('All Authors') or ''
-                    a2 = r.get('All Authors') or ''
-                    merged_authors = []
-                    for s in (a1, a2):
-                        if s:
-                            for name in [n.strip() for n in s.split(';') if n.strip()]:
-                                if name not in merged_authors:
-                                    merged_authors.append(name)
-                    if merged_authors:
-                        existing['All Authors'] = '; '.join(merged_authors)
-                    # choose latest publication date
-                    try:
-                        d1 = pd.to_datetime(existing.get('Publication Date'), errors='coerce')
-                        d2 = pd.to_datetime(r.get('Publication Date'), errors='coerce')
-                        if d2 is not None and not pd.isna(d2) and (d1 is None or pd.isna(d1) or d2 > d1):
-                            existing['Publication Date'] = r.get('Publication Date')
-                    except Exception:
-                        pass
-                    # keep other non-null fields from existing
-                    keyed[key] = existing
-                else:
-                    # initialize merged counts field
-                    new = dict(r)
-                    new['_merged_counts'] = [new.get('Citation Count') or 0]
-                    keyed[key] = new
-
-            # finalize merged results
-            out = []
-            for k, v in keyed.items():
-                counts = v.pop('_merged_counts', [])
-                if counts:
-                    try:
-                        v['Citation Count'] = int(round(mean([c for c in counts if isinstance(c, (int, float))])))
-                    except Exception:
-                        v['Citation Count'] = counts[0] if counts else 0
-                else:
-                    v['Citation Count'] = 0
-                out.append(v)
-            return out
+                    v['Citation Count'] = counts[0] if counts else 0
+            else:
+                v['Citation Count'] = 0
+            out.append(v)
+        return out
 
-        # Build output Excel in a temporary file
-        import tempfile
-        out_fd, out_path = tempfile.mkstemp(suffix='.xlsx')
-        try:
-            import os
-            os.close(out_fd)
-            with pd.ExcelWriter(out_path, engine='openpyxl') as writer:
-                # Desired display order for publication sheets. Keep any other columns after these.
-                desired_cols = [
-                    'All Authors',
-                    'Authors in School',
-                    'Professor ORCID',
-                    'Article Title',
-                    'Article DOI',
-                    'Journal Title',
-                    'Publication Date',
-                    'Citation Count'
-                ]
-
-                def _reorder_df_preserve(df):
-                    # Put desired columns first (if present), then any remaining columns
-                    cols = [c for c in desired_cols if c in df.columns]
-                    cols += [c for c in df.columns if c not in cols]
-                    return df[cols]
-
-                # Journal sheet - normalize, dedupe and sort newest-first
-                journal_clean = _dedupe_rows(journal_rows)
-                df_j = pd.DataFrame(journal_clean)
-                if not df_j.empty:
-                    # Remove internal columns not desired in output
-                    df_j = df_j.drop(columns=['Professor Name', 'Join Year', 'Join Month', '_merged_counts'], errors='ignore')
-                    # ensure Publication Date is datetime for sorting
-                    if 'Publication Date' in df_j.columns:
-                        df_j['__pub_dt'] = pd.to_datetime(df_j['Publication Date'], errors='coerce')
-                        df_j = df_j.sort_values(by='__pub_dt', ascending=False).drop(columns=['__pub_dt'])
-                    df_j = _reorder_df_preserve(df_j)
-                df_j.to_excel(writer, sheet_name='Journal', index=False)
-
-                # Book sheet - normalize, dedupe and sort newest-first
-                book_clean = _dedupe_rows(book_rows)
-                df_b = pd.DataFrame(book_clean)
-                if not df_b.empty:
-                    df_b = df_b.drop(columns=['Professor Name', 'Join Year', 'Join Month', '_merged_counts'], errors='ignore')
-                    if 'Publication Date' in df_b.columns:
-                        df_b['__pub_dt'] = pd.to_datetime(df_b['Publication Date'], errors='coerce')
-                        df_b = df_b.sort_values(by='__pub_dt', ascending=False).drop(columns=['__pub_dt'])
-                    df_b = _reorder_df_preserve(df_b)
-                df_b.to_excel(writer, sheet_name='Book', index=False)
-
-                # Chapter sheet - normalize, dedupe and sort newest-first
-                chapter_clean = _dedupe_rows(chapter_rows)
-                df_c = pd.DataFrame(chapter_clean)
-                if not df_c.empty:
-                    df_c = df_c.drop(columns=['Professor Name', 'Join Year', 'Join Month', '_merged_counts'], errors='ignore')
-                    if 'Publication Date' in df_c.columns:
-                        df_c['__pub_dt'] = pd.to_datetime(df_c['Publication Date'], errors='coerce')
-                        df_c = df_c.sort_values(by='__pub_dt', ascending=False).drop(columns=['__pub_dt'])
-                    df_c = _reorder_df_preserve(df_c)
-                df_c.to_excel(writer, sheet_name='Chapter', index=False)
-
-                # Profiles sheet removed as per user request (no longer writing profiles_rows)
-                # write errors sheet so user can re-run or inspect failures
-                if failed_orcids:
-                    pd.DataFrame(failed_orcids).to_excel(writer, sheet_name='Errors', index=False)
-
-            # Faculty cache was already populated early above when we loaded faculty join years
-            print(f"✅ Faculty cache ready with {len(faculty_cache)} ORCIDs for single ORCID search")
-            print(f"✅ Done! Successfully processed {succeeded_orcids} out of {total_orcids} entries.")
-            
-            # send file for download
-            return send_file(out_path, as_attachment=True, download_name='publications_output.xlsx')
-        finally:
+    # Build output Excel in a temporary file
+    import tempfile
+    out_fd, out_path = tempfile.mkstemp(suffix='.xlsx')
+    try:
+        import os
+        os.close(out_fd)
+        with pd.ExcelWriter(out_path, engine='openpyxl') as writer:
+            # Desired display order for publication sheets. Keep any other columns after these.
+            desired_cols = [
+                'All Authors',
+                'Authors in School',
+                'Professor ORCID',
+                'Article Title',
+                'Article DOI',
+                'Journal Title',
+                'Publication Date',
+                'Citation Count'
+            ]
+
+            def _reorder_df_preserve(df):
+                # Put desired columns first (if present), then any remaining columns
+                cols = [c for c in desired_cols if c in df.columns]
+                cols += [c for c in df.columns if c not in cols]
+                return df[cols]
+
+            # Journal sheet - normalize, dedupe and sort newest-first
+            journal_clean = _dedupe_rows(journal_rows)
+            df_j = pd.DataFrame(journal_clean)
+            if not df_j.empty:
+                # Remove internal columns not desired in output
+                df_j = df_j.drop(columns=['Professor Name', 'Join Year', 'Join Month', '_merged_counts'], errors='ignore')
+                # ensure Publication Date is datetime for sorting
+                if 'Publication Date' in df_j.columns:
+                    df_j['__pub_dt'] = pd.to_datetime(df_j['Publication Date'], errors='coerce')
+                    df_j = df_j.sort_values(by='__pub_dt', ascending=False).drop(columns=['__pub_dt'])
+                df_j = _reorder_df_preserve(df_j)
+            df_j.to_excel(writer, sheet_name='Journal', index=False)
+
+            # Book sheet - normalize, dedupe and sort newest-first
+            book_clean = _dedupe_rows(book_rows)
+            df_b = pd.DataFrame(book_clean)
+            if not df_b.empty:
+                df_b = df_b.drop(columns=['Professor Name', 'Join Year', 'Join Month', '_merged_counts'], errors='ignore')
+                if 'Publication Date' in df_b.columns:
+                    df_b['__pub_dt'] = pd.to_datetime(df_b['Publication Date'], errors='coerce')
+                    df_b = df_b.sort_values(by='__pub_dt', ascending=False).drop(columns=['__pub_dt'])
+                df_b = _reorder_df_preserve(df_b)
+            df_b.to_excel(writer, sheet_name='Book', index=False)
+
+            # Chapter sheet - normalize, dedupe and sort newest-first
+            chapter_clean = _dedupe_rows(chapter_rows)
+            df_c = pd.DataFrame(chapter_clean)
+            if not df_c.empty:
+                df_c = df_c.drop(columns=['Professor Name', 'Join Year', 'Join Month', '_merged_counts'], errors='ignore')
+                if 'Publication Date' in df_c.columns:
+                    df_c['__pub_dt'] = pd.to_datetime(df_c['Publication Date'], errors='coerce')
+                    df_c = df_c.sort_values(by='__pub_dt', ascending=False).drop(columns=['__pub_dt'])
+                df_c = _reorder_df_preserve(df_c)
+            df_c.to_excel(writer, sheet_name='Chapter', index=False)
+
+            # Profiles sheet removed as per user request (no longer writing profiles_rows)
+            # write errors sheet so user can re-run or inspect failures
+            if failed_orcids:
+                pd.DataFrame(failed_orcids).to_excel(writer, sheet_name='Errors', index=False)
+
+            # Partial workbook: flag the rows a cancel or deadline stopped before they were processed
+            if not_reached:
+                pd.DataFrame([{
+                    'Professor Name': entry['prof_name'],
+                    'ORCID': entry['orcid'] or None,
+                    'Reason': 'Job cancelled' if reason == 'cancelled' else 'Deadline reached',
+                } for entry, reason in not_reached]).to_excel(writer, sheet_name='Not Reached', index=False)
+
+        # Faculty cache was already populated early above when we loaded faculty join years
+        print(f"✅ Faculty cache ready with {len(faculty_cache)} ORCIDs for single ORCID search")
+        print(f"✅ Done! Successfully processed {succeeded_orcids} out of {total_orcids} entries.")
+        if not_reached:
+            print(f"Partial workbook: {len(not_reached)} rows not reached")
+        elif checkpoint_store is not None:
+            # A partial batch keeps its checkpoints so that a rerun finishes the remaining rows
             try:
-                # remove file after sending is handled by Flask/wsgi; if not, ensure cleanup (best-effort)
-                pass
-            except Exception:
-                pass
+                checkpoint_store.clear(batch)
+            except Exception as e:
+                print(f"❌ Checkpoint cleanup error: {e}")
+            
+        return out_path
+    except Exception:
+        os.remove(out_path)
+        raise
+
+
+def process_upload_slice(token=None, file_bytes=None, faculty_bytes=None, params=None, max_rows=10, seconds=8.0,
+                         store=None):
+    """Run one bounded slice of a batch upload, for hosts that cap the time of a request.
+
+    Without a token a batch is started from file_bytes/faculty_bytes and the
+    process_upload keyword arguments in params: the upload is kept in the
+    checkpoint store (store, else checkpoints.get_store()) and its key is
+    the continuation token.  Each call processes at most max_rows unfinished
+    ORCIDs/rows and stops making API calls after `seconds`; their results
+    are checkpointed.  The call that leaves no rows assembles the workbook
+    from the checkpoints.
+
+    Returns (token, out_path, status), where out_path is None while rows
+    remain and status is {'total', 'completed', 'remaining', 'processed'}
+    (processed: finished by this call), or None for an unknown or expired
+    token.
+    """
+    import checkpoints
+    if store is None:
+        store = checkpoints.get_store()
+    if store is None:
+        raise UploadError('Chunked uploads need a checkpoint store; CHECKPOINT_PATH is off or unusable')
+    if token is None:
+        params = dict(params or {})
+        token = checkpoints.batch_key(file_bytes, faculty_bytes, sheet_name=params.get('sheet_name', 0),
+                                      start_year=params.get('start_year'), end_year=params.get('end_year'))
+        store.save_input(token, file_bytes, faculty_bytes, params)
+    else:
+        saved = store.load_input(token)
+        if saved is None:
+            return None
+        file_bytes, faculty_bytes, params = saved
+    already = len(store.load(token))
+
+    status = {'total': 0, 'completed': 0}
+
+    def progress(event, **data):
+        if event == 'start':
+            status['total'] = data['total']
+        elif event == 'orcid' and data['outcome'] != 'not_reached':
+            status['completed'] += 1
+
+    try:
+        out_path = process_upload(file_bytes, faculty_bytes=faculty_bytes, progress=progress,
+                                  budget=http_client.Budget(seconds), max_rows=max_rows, checkpoint_store=store,
+                                  **params)
+    except UploadError:
+        # The sheet itself is unusable: nothing to continue
+        store.clear(token)
+        raise
+    except http_client.BudgetExceeded:
+        # Out of time outside the per-row stages; the next call carries on from the checkpoints
+        out_path = None
+    status['remaining'] = status['total'] - status['completed']
+    status['processed'] = status['completed'] - already
+    return token, out_path, status
 
-    except Exception as e:
-        flash(f'Failed to process uploaded file: {e}', 'danger')
-        return redirect(url_for('index'))
 
 
 # Optimized the single search logic to aggregate data from multiple sources (ORCID, Google Scholar, CrossRef, OpenAlex).
 # Added deduplication logic to ensure no duplicate entries are returned.
 
-def search_publications(prof_name, start_date, end_date):
+def search_publications(prof_name, start_date, end_date, return_status=False):
     """
     Search for publications by professor name across multiple sources:
     - ORCID
@@ -1160,31 +1628,24 @@ def search_publications(prof_name, start_date, end_date):
     - CrossRef
     - OpenAlex
 
-    Deduplicate results based on DOI or title.
+    The sources are queried concurrently, each with a deadline.
+    Deduplicate results based on DOI or title.  With return_status=True
+    the result is (publications, source_status).
     """
-    from paper_count import _search_google_scholar, _search_crossref, _search_orcid_by_name, _search_openalex, _deduplicate_publications
-
-    all_publications = []
+    from paper_count import _search_google_scholar, _search_crossref, _search_orcid_by_name, _search_openalex, _deduplicate_publications, SearchSourcesConcurrently
 
-    # Search ORCID
-    orcid_pubs = _search_orcid_by_name(prof_name, start_date, end_date)
-    all_publications.extend(orcid_pubs)
-
-    # Search Google Scholar
-    gs_pubs = _search_google_scholar(prof_name, start_date, end_date)
-    all_publications.extend(gs_pubs)
-
-    # Search CrossRef
-    cr_pubs = _search_crossref(prof_name, start_date, end_date)
-    all_publications.extend(cr_pubs)
-
-    # Search OpenAlex
-    oa_pubs = _search_openalex(prof_name, start_date, end_date)
-    all_publications.extend(oa_pubs)
+    all_publications, source_status = SearchSourcesConcurrently(prof_name, start_date, end_date, [
+        ("ORCID", _search_orcid_by_name),
+        ("Google Scholar", _search_google_scholar),
+        ("CrossRef", _search_crossref),
+        ("OpenAlex", _search_openalex),
+    ])
 
     # Deduplicate publications
     deduplicated_publications = _deduplicate_publications(all_publications)
 
+    if return_status:
+        return deduplicated_publications, source_status
     return deduplicated_publications
 
 @app.route('/search', methods=['POST'])
@@ -1198,7 +1659,7 @@ def search():
     end_date = f"{end_year}-12-31"
     if not prof_name:
         return {'error': 'Please enter a professor name.'}, 400
-    results = search_publications(prof_name, start_date, end_date)
+    results, source_status = search_publications(prof_name, start_date, end_date, return_status=True)
     global faculty_names
     for pub in results:
         ntu_authors = set()
@@ -1236,7 +1697,26 @@ def search():
         if not pub.get('Journal Title'):
             jt = pub.get('journal') or pub.get('Journal') or pub.get('container_title') or pub.get('Container Title')
             pub['Journal Title'] = jt if jt else ''
-    return {'results': results}
+    return {'results': results, 'sources': source_status}
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Citation cache hit/miss/stale counters for this worker process."""
+    import doi_store
+    return {'citation_cache': doi_store.get_cache_stats()}
+
+def _start_job_workers():
+    """Start this process's job workers, so queued and requeued jobs run without waiting for a request."""
+    import jobs
+    if jobs.WORKER_COUNT <= 0:
+        return
+    try:
+        jobs.get_queue().start_workers(process_upload)
+    except Exception as e:
+        print(f"❌ Could not start job workers: {e}")
+
+
+_start_job_workers()
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,314 @@
+"""
+Asyncio fetch engine for batch uploads.
+
+An alternative to the thread pool for the fetch-and-enrich stages of
+/upload.  Every ORCID record, bulk works call, OpenAlex author listing and DOI batch
+(CrossRef, OpenAlex, Semantic Scholar) is issued from one event loop with
+httpx.AsyncClient, so hundreds of requests can be in flight at once.  Each
+host is bounded by a semaphore and paced by the same token buckets as
+http_client.  Responses go through the same parsers as the synchronous
+fetchers, so both engines fill the same DOI caches.
+
+Select it with engine=async on /upload, or from the command line:
+    python async_engine.py faculty.xlsx -o publications_output.xlsx --start-year 2018 --end-year 2024
+"""
+import asyncio
+import os
+from urllib.parse import urlparse
+
+import http_client
+import paper_count as pc
+
+# Requests in flight at once per host; the token buckets still set the rate
+HOST_CONCURRENCY = int(os.environ.get('ASYNC_HOST_CONCURRENCY', 100))
+
+ORCID_API = pc.ORCID_API
+OPENALEX_WORKS_URL = "https://api.openalex.org/works"
+CROSSREF_WORKS_URL = "https://api.crossref.org/works"
+
+
+class AsyncFetcher:
+    """httpx.AsyncClient wrapper with per-host semaphores, shared rate limits and typed failures."""
+
+    def __init__(self, client):
+        self.client = client
+        self._semaphores = {}
+
+    def _semaphore(self, host):
+        sem = self._semaphores.get(host)
+        if sem is None:
+            sem = self._semaphores[host] = asyncio.Semaphore(HOST_CONCURRENCY)
+        return sem
+
+    async def request(self, method, url, **kwargs):
+        import httpx
+        host = urlparse(url).hostname
+        limiter = http_client.get_limiter(host)
+        http_client.check_budget()
+        async with self._semaphore(host):
+            if limiter is not None:
+                wait = limiter.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            http_client.check_budget()
+            http_client.count_request()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                raise http_client.RetryableFetchError(f"{method} {url}: {e}") from e
+        http_client.honor_retry_after(limiter, response)
+        return response
+
+    async def fetch_json(self, method, url, what, **kwargs):
+        """Return the JSON body of a 200 answer, or raise the matching http_client.FetchError."""
+        response = await self.request(method, url, **kwargs)
+        http_client.raise_for_outcome(response, what)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise http_client.PermanentFetchError(f"{what}: invalid JSON", response.status_code) from e
+
+
+async def _openalex_listing(fetcher, filter_str):
+    """Every OpenAlex work matching filter_str, walking cursor pages (see pc._iter_openalex_works)."""
+    works, cursor = [], "*"
+    while cursor:
+        try:
+            data = await fetcher.fetch_json('GET', OPENALEX_WORKS_URL, f"OpenAlex listing {filter_str}",
+                                            params=pc._openalex_listing_params(filter_str, cursor))
+        except http_client.FetchError as e:
+            print(f"❌ {e}")
+            break
+        results = data.get("results", []) or []
+        works.extend(results)
+        cursor = (data.get("meta") or {}).get("next_cursor") if results else None
+    return works
+
+
+async def _crossref_listing(fetcher, params, select):
+    """Every CrossRef work matching params, walking deep-paging cursors (see pc._iter_crossref_works)."""
+    items, cursor = [], "*"
+    while cursor:
+        try:
+            data = await fetcher.fetch_json('GET', CROSSREF_WORKS_URL, f"CrossRef listing {params}",
+                                            params=pc._crossref_page_params(params, cursor, select))
+        except http_client.FetchError as e:
+            print(f"❌ {e}")
+            break
+        message = data.get("message", {}) or {}
+        page = message.get("items", []) or []
+        items.extend(page)
+        cursor = message.get("next-cursor") if page else None
+    return items
+
+
+def _reraise_stops(results):
+    """Re-raise a budget stop or a cancellation that gather(return_exceptions=True) caught.
+
+    Those end the batch; only the other exceptions are per-call failures.
+    """
+    for result in results:
+        if isinstance(result, (http_client.BudgetExceeded, asyncio.CancelledError)):
+            raise result
+
+
+async def _orcid_contributors(fetcher, orcid_id, works, from_year=None, to_year=None, put_codes=None):
+    """Async FetchORCIDWorkContributors: every bulk /works/{put-codes} chunk at once."""
+    contributors = {}
+
+    async def one(chunk):
+        try:
+            data = await fetcher.fetch_json('GET', f"{ORCID_API}/{orcid_id}/works/{','.join(chunk)}",
+                                            f"ORCID bulk works for {orcid_id}", headers={"accept": "application/json"})
+        except http_client.FetchError as e:
+            print(f"❌ {e}")
+            return
+        pc._absorb_orcid_bulk_works(data, contributors)
+
+    chunks = pc._orcid_put_code_chunks(works, from_year, to_year, only=put_codes)
+    await asyncio.gather(*(one(chunk) for chunk in chunks))
+    return contributors
+
+
+def _remember_crossref_works(items):
+    for item in items:
+        if item.get("DOI"):
+            pc._remember_crossref_work(item)
+
+
+async def _orcid_profile(fetcher, orcid_id, from_year=None, to_year=None):
+    """Async FetchORCIDProfile(raise_errors=True).
+
+    The ORCID record comes first; when it has new or modified works, their
+    bulk contributor lists and the OpenAlex and CrossRef listings run side by side.
+    """
+    profile = {"orcid": orcid_id, "name": None, "works": None, "contributors": {}, "openalex": {"doi": {}, "title": {}}}
+    record = await fetcher.fetch_json('GET', f"{ORCID_API}/{orcid_id}/record", f"ORCID record for {orcid_id}",
+                                      headers={"accept": "application/json"})
+    await asyncio.to_thread(pc._apply_orcid_record, profile, record)
+    if not profile["changed"]:
+        print(f"ORCID {orcid_id} unchanged since it was cached; reusing its works")
+        return profile
+    contributors, listing, crossref_items = await asyncio.gather(
+        _orcid_contributors(fetcher, orcid_id, profile["works"], from_year, to_year, profile["changed"]),
+        _openalex_listing(fetcher, pc._openalex_orcid_filter(orcid_id, from_year, to_year)),
+        _crossref_listing(fetcher, pc._crossref_orcid_params(orcid_id, from_year, to_year), pc.CROSSREF_WORK_FIELDS),
+        return_exceptions=True,
+    )
+    _reraise_stops((contributors, listing, crossref_items))
+    if isinstance(contributors, BaseException):
+        print(f"❌ ORCID bulk works failed for {orcid_id}: {contributors}")
+    else:
+        profile["contributors"] = contributors
+    if isinstance(listing, BaseException):
+        print(f"❌ OpenAlex ORCID listing failed for {orcid_id}: {listing}")
+    else:
+        profile["openalex"] = pc._index_openalex_works(listing)
+    if isinstance(crossref_items, BaseException):
+        print(f"❌ CrossRef ORCID listing failed for {orcid_id}: {crossref_items}")
+    else:
+        await asyncio.to_thread(_remember_crossref_works, crossref_items)
+    return profile
+
+
+async def _run_batches(chunks, call, absorb, label):
+    """Send every chunk concurrently and absorb each answer; return the DOI keys of failed chunks."""
+    failed = []
+
+    async def one(chunk):
+        try:
+            payload = await call(chunk)
+        except Exception as e:
+            print(f"❌ {label} batch error: {e}; {len(chunk)} DOIs left for single lookups")
+            failed.extend(chunk)
+            return
+        await asyncio.to_thread(absorb, chunk, payload)
+
+    await asyncio.gather(*(one(chunk) for chunk in chunks))
+    return failed
+
+
+def _pending_crossref_openalex(dois, counted):
+    crossref = pc._pending_dois(dois, lambda key: pc._lookup_record(pc._crossref_records, 'crossref', key)[0])
+    openalex = pc._pending_dois(counted, lambda key: pc._lookup_citation(key, 'openalex')[0])
+    return crossref, openalex
+
+
+def _pending_semantic_scholar(dois):
+    # _dois_without_openalex_count may still fetch the DOIs the OpenAlex batches missed
+    return pc._pending_dois(pc._dois_without_openalex_count(dois),
+                            lambda key: pc._lookup_citation(key, 'semanticscholar')[0])
+
+
+async def prefetch_doi_metadata(fetcher, dois, citation_dois=None):
+    """Async PrefetchDOIMetadata: CrossRef and OpenAlex batches in parallel, then Semantic Scholar.
+
+    citation_dois only need their citation counts (see PrefetchDOIMetadata).
+    Cache lookups and absorbing answers hit SQLite, so they run in worker
+    threads rather than on the event loop.
+    """
+    dois = [d for d in dict.fromkeys(d for d in (dois or []) if d)]
+    counted = [d for d in dict.fromkeys(dois + [d for d in (citation_dois or []) if d])]
+    if not counted:
+        return
+    crossref, openalex = await asyncio.to_thread(_pending_crossref_openalex, dois, counted)
+    cr_chunks, cr_singles = pc._split_batchable(crossref, pc.CROSSREF_BATCH_SIZE)
+    oa_chunks, oa_singles = pc._split_batchable(openalex, pc.OPENALEX_BATCH_SIZE)
+    cr_failed, oa_failed = await asyncio.gather(
+        _run_batches(
+            cr_chunks,
+            lambda chunk: fetcher.fetch_json('GET', CROSSREF_WORKS_URL, "CrossRef batch",
+                                             params=pc._crossref_batch_params(chunk)),
+            lambda chunk, data: pc._absorb_crossref_batch(chunk, data.get("message", {}).get("items", []) or []),
+            "CrossRef"),
+        _run_batches(
+            oa_chunks,
+            lambda chunk: fetcher.fetch_json('GET', OPENALEX_WORKS_URL, "OpenAlex batch",
+                                             params=pc._openalex_batch_params(chunk)),
+            lambda chunk, data: pc._absorb_openalex_batch(chunk, data.get("results", []) or []),
+            "OpenAlex"),
+    )
+    # Unbatchable DOIs and failed chunks are rare: resolve them with the synchronous single lookups
+    leftovers = [asyncio.to_thread(pc._get_crossref_record, doi) for doi in cr_singles + [crossref[k] for k in cr_failed]]
+    leftovers += [asyncio.to_thread(pc._fetch_openalex_work, doi) for doi in oa_singles + [openalex[k] for k in oa_failed]]
+    _reraise_stops(await asyncio.gather(*leftovers, return_exceptions=True))
+
+    s2 = await asyncio.to_thread(_pending_semantic_scholar, counted)
+    keys = list(s2)
+    await _run_batches(
+        [keys[i:i + pc.SEMANTIC_SCHOLAR_BATCH_SIZE] for i in range(0, len(keys), pc.SEMANTIC_SCHOLAR_BATCH_SIZE)],
+        lambda chunk: fetcher.fetch_json('POST', pc.SEMANTIC_SCHOLAR_BATCH_URL, "Semantic Scholar batch",
+                                         params={"fields": "citationCount,year"},
+                                         json={"ids": [f"DOI:{k}" for k in chunk]}),
+        lambda chunk, papers: pc._absorb_semantic_scholar_batch(chunk, papers or []),
+        "Semantic Scholar")
+
+
+async def fetch_and_enrich(orcids, from_year=None, to_year=None):
+    """Fetch every ORCID profile, then enrich the union of their in-range DOIs once.
+
+    Returns (profiles, errors) like the thread-pool stages of app.process_upload:
+    profiles maps ORCID -> FetchORCIDProfile-shaped dict, errors maps ORCID ->
+    PermanentFetchError.  ORCIDs that failed with a retryable error are in
+    neither and get retried per row.
+    """
+    import httpx
+    connect_timeout, read_timeout = http_client.DEFAULT_TIMEOUT
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=HOST_CONCURRENCY),
+        headers={'User-Agent': http_client._user_agent(), 'Accept-Encoding': 'gzip, deflate'},
+        follow_redirects=True,
+    ) as client:
+        fetcher = AsyncFetcher(client)
+        results = await asyncio.gather(
+            *(_orcid_profile(fetcher, o, from_year, to_year) for o in orcids), return_exceptions=True)
+        _reraise_stops(results)
+        profiles, errors = {}, {}
+        for orcid_id, result in zip(orcids, results):
+            if isinstance(result, http_client.PermanentFetchError):
+                print(f"Stage 1 fetch failed permanently for {orcid_id}: {result}")
+                errors[orcid_id] = result
+            elif isinstance(result, BaseException):
+                print(f"Stage 1 fetch failed for {orcid_id}: {result}")
+            else:
+                profiles[orcid_id] = result
+        dois, reused_dois = set(), set()
+        for profile in profiles.values():
+            dois.update(pc._profile_dois(profile))
+            reused_dois.update(pc._profile_reused_dois(profile))
+        print(f"DEBUG: Enriching {len(dois)} unique DOIs across {len(profiles)} ORCID profiles (async)")
+        await prefetch_doi_metadata(fetcher, sorted(dois), citation_dois=sorted(reused_dois - dois))
+        for profile in profiles.values():
+            profile["enriched"] = True
+    return profiles, errors
+
+
+def run_fetch_and_enrich(orcids, from_year=None, to_year=None):
+    """Blocking entry point for callers without an event loop (Flask workers, the CLI)."""
+    return asyncio.run(fetch_and_enrich(list(orcids), from_year, to_year))
+
+
+def main(argv=None):
+    import argparse
+    import shutil
+    parser = argparse.ArgumentParser(description='Build the publications workbook for a faculty sheet.')
+    parser.add_argument('input', help='Excel file with Name / ORCID ID / Join Date columns')
+    parser.add_argument('-o', '--output', default='publications_output.xlsx')
+    parser.add_argument('--sheet', default=0, help='sheet name or index (default: first sheet)')
+    parser.add_argument('--start-year', type=int)
+    parser.add_argument('--end-year', type=int)
+    parser.add_argument('--engine', choices=('async', 'threads'), default='async')
+    args = parser.parse_args(argv)
+
+    from app import process_upload
+    with open(args.input, 'rb') as fh:
+        file_bytes = fh.read()
+    out_path = process_upload(file_bytes, sheet_name=args.sheet, start_year=args.start_year,
+                              end_year=args.end_year, engine=args.engine)
+    shutil.move(out_path, args.output)
+    print(f"✅ Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -23,6 +23,11 @@ def create_distribution_package():
     files_to_include = [
         'app.py',
         'paper_count.py',
+        'doi_store.py',
+        'http_client.py',
+        'async_engine.py',
+        'jobs.py',
+        'checkpoints.py',
         'paper.py',
         'run.py',
         'run.sh',
@@ -0,0 +1,229 @@
+"""
+Durable checkpoints of batch upload results.
+
+process_upload saves every ORCID (or name-only row) result as soon as it is
+complete, under a batch key hashed from the uploaded workbook and the
+parameters that shape the results.  When the same batch runs again after a
+worker restart, a requeued job or a rate-limit abort, the checkpointed
+results are reused and only the remaining rows are fetched.  A batch's
+checkpoints are dropped once its workbook has been written, and ignored
+after CHECKPOINT_TTL seconds.
+
+The same stores back the chunked upload mode for serverless hosts
+(app.process_upload_slice): they also keep the uploaded workbook of an
+unfinished batch, so that each invocation can process the next slice of
+rows and the last one assembles the workbook.
+
+Checkpoints live in a SQLite file (CHECKPOINT_PATH, "off" to disable), or
+with CHECKPOINT_STORE=filesystem in a directory of JSON files, e.g. under
+/tmp on hosts whose application directory is read-only.
+"""
+import base64
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints.sqlite3')
+DEFAULT_DIR = os.path.join(tempfile.gettempdir(), 'orcid-checkpoints')
+DEFAULT_TTL = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    batch TEXT NOT NULL,
+    item TEXT NOT NULL,
+    result TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    PRIMARY KEY (batch, item)
+);
+CREATE TABLE IF NOT EXISTS inputs (
+    batch TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    input BLOB NOT NULL,
+    faculty_input BLOB,
+    saved_at REAL NOT NULL
+);
+"""
+
+
+def batch_key(file_bytes, faculty_bytes=None, **params):
+    """Hash of the uploaded workbook(s) and the result-shaping parameters (sheet, years)."""
+    h = hashlib.sha256()
+    h.update(file_bytes)
+    h.update(b'\0')
+    h.update(faculty_bytes or b'')
+    h.update(b'\0')
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def checkpoint_ttl():
+    try:
+        return int(os.environ.get('CHECKPOINT_TTL', DEFAULT_TTL))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+class SQLiteCheckpointStore:
+    """Checkpointed results per batch key, shared by every thread and worker process."""
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        self._local = threading.local()
+        self._conn()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def load(self, batch):
+        """Return {item: result} for a batch, skipping checkpoints older than checkpoint_ttl()."""
+        rows = self._conn().execute(
+            'SELECT item, result FROM checkpoints WHERE batch = ? AND saved_at >= ?',
+            (batch, time.time() - checkpoint_ttl())).fetchall()
+        return {item: json.loads(result) for item, result in rows}
+
+    def save(self, batch, item, result):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO checkpoints (batch, item, result, saved_at) VALUES (?, ?, ?, ?)',
+            (batch, item, json.dumps(result, default=str), time.time()))
+
+    def save_input(self, batch, file_bytes, faculty_bytes=None, params=None):
+        """Keep a batch's uploaded workbook(s) and process_upload parameters for later slices."""
+        self._conn().execute(
+            'INSERT OR REPLACE INTO inputs (batch, params, input, faculty_input, saved_at) VALUES (?, ?, ?, ?, ?)',
+            (batch, json.dumps(params or {}), file_bytes, faculty_bytes, time.time()))
+
+    def load_input(self, batch):
+        """Return (file_bytes, faculty_bytes, params) saved by save_input, or None (unknown or expired)."""
+        row = self._conn().execute(
+            'SELECT input, faculty_input, params FROM inputs WHERE batch = ? AND saved_at >= ?',
+            (batch, time.time() - checkpoint_ttl())).fetchone()
+        if row is None:
+            return None
+        return bytes(row[0]), bytes(row[1]) if row[1] is not None else None, json.loads(row[2])
+
+    def clear(self, batch):
+        self._conn().execute('DELETE FROM checkpoints WHERE batch = ?', (batch,))
+        self._conn().execute('DELETE FROM inputs WHERE batch = ?', (batch,))
+
+
+class FilesystemCheckpointStore:
+    """Checkpoints as one JSON file per item in a directory per batch key (same interface as SQLiteCheckpointStore)."""
+
+    def __init__(self, root=None):
+        self.root = root or DEFAULT_DIR
+        os.makedirs(self.root, exist_ok=True)
+
+    def _batch_dir(self, batch):
+        # Batch keys are hex digests, but they also arrive in URLs
+        if not batch or not all(c in '0123456789abcdef' for c in batch):
+            raise ValueError(f'Invalid batch key: {batch!r}')
+        return os.path.join(self.root, batch)
+
+    def _write(self, path, data):
+        # Write then rename, so a reader never sees half a file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(data, fh, default=str)
+        os.replace(tmp, path)
+
+    def _fresh_files(self, batch):
+        directory = self._batch_dir(batch)
+        oldest = time.time() - checkpoint_ttl()
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(directory, name)
+            if name.endswith('.json') and name != 'input.json':
+                try:
+                    if os.path.getmtime(path) >= oldest:
+                        yield path
+                except FileNotFoundError:
+                    continue
+
+    def load(self, batch):
+        """Return {item: result} for a batch, skipping checkpoints older than checkpoint_ttl()."""
+        results = {}
+        for path in self._fresh_files(batch):
+            try:
+                with open(path) as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            results[data['item']] = data['result']
+        return results
+
+    def save(self, batch, item, result):
+        directory = self._batch_dir(batch)
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.sha1(item.encode()).hexdigest() + '.json'
+        self._write(os.path.join(directory, name), {'item': item, 'result': result})
+
+    def save_input(self, batch, file_bytes, faculty_bytes=None, params=None):
+        directory = self._batch_dir(batch)
+        os.makedirs(directory, exist_ok=True)
+        self._write(os.path.join(directory, 'input.json'), {
+            'params': params or {},
+            'input': base64.b64encode(file_bytes).decode(),
+            'faculty_input': base64.b64encode(faculty_bytes).decode() if faculty_bytes is not None else None,
+        })
+
+    def load_input(self, batch):
+        path = os.path.join(self._batch_dir(batch), 'input.json')
+        try:
+            if os.path.getmtime(path) < time.time() - checkpoint_ttl():
+                return None
+            with open(path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        faculty = data['faculty_input']
+        return (base64.b64decode(data['input']), base64.b64decode(faculty) if faculty is not None else None,
+                data['params'])
+
+    def clear(self, batch):
+        shutil.rmtree(self._batch_dir(batch), ignore_errors=True)
+
+
+_store = None
+_store_failed = False
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide checkpoint store, or None when checkpointing is disabled/unavailable.
+
+    CHECKPOINT_STORE selects 'sqlite' (default) or 'filesystem'; CHECKPOINT_PATH
+    is the SQLite file or the directory.
+    """
+    global _store, _store_failed
+    if _store is not None or _store_failed:
+        return _store
+    with _store_lock:
+        if _store is None and not _store_failed:
+            filesystem = os.environ.get('CHECKPOINT_STORE', 'sqlite').lower() == 'filesystem'
+            path = os.environ.get('CHECKPOINT_PATH', DEFAULT_DIR if filesystem else DEFAULT_PATH)
+            if not path or path.lower() == 'off':
+                _store_failed = True
+                return None
+            try:
+                _store = FilesystemCheckpointStore(path) if filesystem else SQLiteCheckpointStore(path)
+            except Exception as e:
+                print(f"❌ Checkpoint store unavailable at {path}: {e}")
+                _store_failed = True
+    return _store
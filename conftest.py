@@ -0,0 +1,7 @@
+import os
+
+# Importing app starts its job workers; the tests drive queues themselves
+os.environ.setdefault('JOB_WORKERS', '0')
+
+# test_orcid.py is a manual script against the live ORCID API, not a pytest module
+collect_ignore = ['test_orcid.py']
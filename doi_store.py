@@ -0,0 +1,221 @@
+"""
+Persistent on-disk store for DOI metadata.
+
+Bibliographic fields (authors, affiliations, publisher, container title) do
+not change once a DOI is registered, so they are kept forever.  Citation
+counts move over time and are kept with a TTL that grows with the age of
+the publication; DOIs a source does not know are remembered for a bounded
+time as negative entries (count NULL).  Each ORCID's parsed and enriched
+works (all years) are kept for ORCID_WORKS_TTL so that re-running a sheet
+with another year range is served locally; their citation counts are not,
+they are read from citation_counts when the works are served.
+
+The store is a single SQLite file in WAL mode so that every gunicorn worker
+(and every thread inside it) can read and write it concurrently, and it
+survives restarts.  Set DOI_STORE_PATH to relocate it, or to "off" to
+disable persistence entirely.
+"""
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'doi_store.sqlite3')
+DAY = 24 * 3600
+DEFAULT_CITATION_TTL = 7 * DAY  # publication year unknown
+DEFAULT_NEGATIVE_TTL = 3 * DAY  # 404 / no count from the source
+DEFAULT_ORCID_WORKS_TTL = DAY  # parsed works of one ORCID record
+
+# Citation counts of recent papers change weekly, those of old papers barely
+# move: (maximum age in years, seconds the count stays fresh)
+CITATION_TTL_BY_AGE = (
+    (1, 2 * DAY),
+    (4, 7 * DAY),
+    (9, 30 * DAY),
+)
+OLD_CITATION_TTL = 90 * DAY
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS doi_metadata (
+    doi TEXT NOT NULL,
+    source TEXT NOT NULL,
+    record TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (doi, source)
+);
+CREATE TABLE IF NOT EXISTS citation_counts (
+    doi TEXT NOT NULL,
+    source TEXT NOT NULL,
+    count INTEGER,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (doi, source)
+);
+CREATE TABLE IF NOT EXISTS orcid_works (
+    orcid TEXT PRIMARY KEY,
+    record TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+class DOIStore:
+    """SQLite-backed DOI metadata store with an immutable/volatile split."""
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        self._local = threading.local()
+        # Create the schema eagerly so a bad path fails here, not mid-batch
+        self._conn()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --- immutable bibliographic metadata ---------------------------------
+
+    def get_metadata(self, doi, source):
+        """Return the stored record dict for (doi, source), or None."""
+        row = self._conn().execute(
+            'SELECT record FROM doi_metadata WHERE doi = ? AND source = ?',
+            (doi, source)).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except Exception:
+            return None
+
+    def put_metadata(self, doi, source, record):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO doi_metadata (doi, source, record, fetched_at) VALUES (?, ?, ?, ?)',
+            (doi, source, json.dumps(record), time.time()))
+
+    # --- volatile citation counts -----------------------------------------
+
+    def get_citation(self, doi, source):
+        """Return (count, expires_at) for (doi, source), or None if never stored.
+
+        Expired entries are returned too; the caller decides whether to refetch.
+        """
+        row = self._conn().execute(
+            'SELECT count, expires_at FROM citation_counts WHERE doi = ? AND source = ?',
+            (doi, source)).fetchone()
+        return (row[0], row[1]) if row is not None else None
+
+    def put_citation(self, doi, source, count, ttl):
+        now = time.time()
+        self._conn().execute(
+            'INSERT OR REPLACE INTO citation_counts (doi, source, count, fetched_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+            (doi, source, count, now, now + ttl))
+
+    # --- parsed ORCID records ---------------------------------------------
+
+    def get_orcid_works(self, orcid):
+        """Return (record, fetched_at) for an ORCID's cached works, or None.
+
+        Old entries are returned too; the caller applies orcid_works_ttl().
+        """
+        row = self._conn().execute(
+            'SELECT record, fetched_at FROM orcid_works WHERE orcid = ?', (orcid,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0]), row[1]
+        except Exception:
+            return None
+
+    def put_orcid_works(self, orcid, record):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO orcid_works (orcid, record, fetched_at) VALUES (?, ?, ?)',
+            (orcid, json.dumps(record), time.time()))
+
+
+def _env_seconds(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def citation_ttl(publication_year=None):
+    """Seconds a fetched citation count stays fresh for a work published in publication_year.
+
+    DOI_CITATION_TTL overrides the TTL used when the year is unknown.
+    """
+    try:
+        age = datetime.date.today().year - int(publication_year)
+    except (TypeError, ValueError):
+        return _env_seconds('DOI_CITATION_TTL', DEFAULT_CITATION_TTL)
+    for max_age, ttl in CITATION_TTL_BY_AGE:
+        if age <= max_age:
+            return ttl
+    return OLD_CITATION_TTL
+
+
+def negative_ttl():
+    """Seconds a "source does not know this DOI" answer is trusted (DOI_NEGATIVE_TTL overrides)."""
+    return _env_seconds('DOI_NEGATIVE_TTL', DEFAULT_NEGATIVE_TTL)
+
+
+def orcid_works_ttl():
+    """Seconds an ORCID's cached works are served without refetching (ORCID_WORKS_TTL overrides)."""
+    return _env_seconds('ORCID_WORKS_TTL', DEFAULT_ORCID_WORKS_TTL)
+
+
+# Per-process lookup counters, by source: hit, negative_hit, stale, miss
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_lookup(source, outcome):
+    with _stats_lock:
+        counts = _stats.setdefault(source, {'hit': 0, 'negative_hit': 0, 'stale': 0, 'miss': 0})
+        counts[outcome] += 1
+
+
+def get_cache_stats():
+    """Return citation cache counters and rates per source for tuning the refresh policy."""
+    with _stats_lock:
+        snapshot = {source: dict(counts) for source, counts in _stats.items()}
+    for counts in snapshot.values():
+        total = sum(counts.values())
+        counts['lookups'] = total
+        for outcome in ('hit', 'negative_hit', 'stale', 'miss'):
+            counts[f'{outcome}_rate'] = round(counts[outcome] / total, 4) if total else 0.0
+    return snapshot
+
+
+_store = None
+_store_failed = False
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide DOIStore, or None when persistence is disabled/unavailable."""
+    global _store, _store_failed
+    if _store is not None or _store_failed:
+        return _store
+    with _store_lock:
+        if _store is None and not _store_failed:
+            path = os.environ.get('DOI_STORE_PATH', DEFAULT_PATH)
+            if not path or path.lower() == 'off':
+                _store_failed = True
+                return None
+            try:
+                _store = DOIStore(path)
+            except Exception as e:
+                # e.g. read-only filesystem on serverless hosts: run without persistence
+                print(f"❌ DOI store unavailable at {path}: {e}")
+                _store_failed = True
+    return _store
@@ -0,0 +1,324 @@
+"""
+Shared HTTP client for every outbound API call.
+
+One requests.Session per process, with a keep-alive connection pool per
+external host sized to the upload worker count, gzip negotiation and default
+(connect, read) timeouts so that a stalled socket cannot pin a worker forever.
+Every request first takes a token from its host's rate limiter, which is
+shared by all threads (and concurrent uploads) in the process.
+Call get()/post() exactly like requests.get()/requests.post().
+
+A job can bound all of its requests with a Budget (use_budget): every call
+first checks it and raises BudgetExceeded once the job is cancelled or past
+its deadline.
+"""
+import contextvars
+import email.utils
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Threads used by /upload; every host pool can serve all of them at once
+WORKER_COUNT = int(os.environ.get('UPLOAD_WORKERS', 5))
+POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', WORKER_COUNT * 2))
+DEFAULT_TIMEOUT = (
+    float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5)),
+    float(os.environ.get('HTTP_READ_TIMEOUT', 30)),
+)
+
+HOSTS = (
+    'pub.orcid.org',
+    'api.crossref.org',
+    'api.openalex.org',
+    'api.semanticscholar.org',
+    'scholar.google.com',
+)
+
+# Seconds a host's limiter is paused after a 429 that carries no Retry-After
+RATE_LIMIT_PAUSE = 10
+
+# Polite request rates per host: (requests per second, burst size).
+# Override with HTTP_RATE_LIMITS="api.crossref.org=5,api.openalex.org=8:16".
+DEFAULT_RATE_LIMITS = {
+    'pub.orcid.org': (12, 24),
+    'api.crossref.org': (10, 10),
+    'api.openalex.org': (10, 10),
+    'api.semanticscholar.org': (1, 1),
+    'scholar.google.com': (0.2, 1),
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers that find it empty wait their turn in order."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return how many seconds the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            # Nothing refills while paused
+            refill_from = max(self._last, self._paused_until)
+            self._tokens = min(self.capacity, self._tokens + max(0.0, now - refill_from) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if self._paused_until > now:
+                # Callers queued during a pause keep their order behind it
+                return (self._paused_until - now) + wait
+            return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller of this bucket for `seconds` (e.g. after the host pushed back)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # No burst when the pause ends
+            self._tokens = min(self._tokens, 0.0)
+
+
+def _configured_rate_limits():
+    limits = dict(DEFAULT_RATE_LIMITS)
+    for item in os.environ.get('HTTP_RATE_LIMITS', '').split(','):
+        if '=' not in item:
+            continue
+        host, value = item.split('=', 1)
+        try:
+            rate, _, burst = value.partition(':')
+            limits[host.strip()] = (float(rate), float(burst) if burst else None)
+        except ValueError:
+            print(f"Ignoring malformed HTTP_RATE_LIMITS entry: {item!r}")
+    return limits
+
+
+_limiters = {host: TokenBucket(rate, burst) for host, (rate, burst) in _configured_rate_limits().items()}
+
+
+def get_limiter(url_or_host):
+    """Return the TokenBucket for a URL's host, or None if that host is not rate limited."""
+    host = urlparse(url_or_host).hostname if '://' in url_or_host else url_or_host
+    return _limiters.get(host)
+
+
+def backoff(url_or_host, seconds):
+    """Slow every thread down for a host after a failed or refused request."""
+    limiter = get_limiter(url_or_host)
+    if limiter is not None:
+        limiter.pause(seconds)
+    else:
+        time.sleep(seconds)
+
+
+class FetchError(Exception):
+    """An API call that did not produce a usable answer.
+
+    Subclasses say whether repeating the call can help: RetryableFetchError
+    (5xx, timeouts, dropped connections), RateLimitedError (429, with the
+    server's Retry-After in seconds if it sent one) and PermanentFetchError
+    (any other 4xx, or a body that cannot be parsed).
+    """
+    retryable = False
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RetryableFetchError(FetchError):
+    retryable = True
+
+
+class RateLimitedError(RetryableFetchError):
+    pass
+
+
+class PermanentFetchError(FetchError):
+    pass
+
+
+def retry_after_seconds(response):
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds, or None."""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def honor_retry_after(limiter, response):
+    """After a 429, pause `limiter` for the server's Retry-After (or RATE_LIMIT_PAUSE)."""
+    if response.status_code == 429 and limiter is not None:
+        pause = retry_after_seconds(response)
+        limiter.pause(pause if pause is not None else RATE_LIMIT_PAUSE)
+
+
+def raise_for_outcome(response, what):
+    """Raise the FetchError subclass matching a non-200 response to `what`."""
+    status = response.status_code
+    if status == 200:
+        return
+    message = f"{what}: HTTP {status}"
+    if status == 429:
+        raise RateLimitedError(message, status, retry_after_seconds(response))
+    if status >= 500 or status == 408:
+        raise RetryableFetchError(message, status)
+    raise PermanentFetchError(message, status)
+
+
+class BudgetExceeded(BaseException):
+    """The current job was cancelled or ran past its deadline (reason: 'cancelled' or 'deadline').
+
+    A BaseException, like KeyboardInterrupt, so that the fetchers' broad
+    `except Exception` fallbacks do not swallow it and keep calling APIs.
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Budget:
+    """Cancellation flag and optional wall-clock deadline shared by every request of one job."""
+
+    def __init__(self, seconds=None):
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self._cancelled = threading.Event()
+        self.tripped = None  # reason of the first BudgetExceeded raised
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def exceeded(self):
+        """'cancelled', 'deadline' or None."""
+        if self._cancelled.is_set():
+            return 'cancelled'
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return 'deadline'
+        return None
+
+    def check(self):
+        reason = self.exceeded()
+        if reason:
+            self.tripped = self.tripped or reason
+            raise BudgetExceeded(reason)
+
+
+_budget = contextvars.ContextVar('http_budget', default=None)
+
+
+def use_budget(budget):
+    """Bound the requests of this context (and of threads and tasks started with a copy of it) by `budget`.
+
+    Returns a token for reset_budget().  Thread pools do not copy contexts on
+    their own: submit work as executor.submit(contextvars.copy_context().run, fn, ...).
+    """
+    return _budget.set(budget)
+
+
+def reset_budget(token):
+    _budget.reset(token)
+
+
+def check_budget():
+    """Raise BudgetExceeded if the current job's budget has run out."""
+    budget = _budget.get()
+    if budget is not None:
+        budget.check()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+# Outbound requests sent by this process, for request-rate reporting
+_request_count = 0
+_request_count_lock = threading.Lock()
+
+
+def count_request():
+    global _request_count
+    with _request_count_lock:
+        _request_count += 1
+
+
+def request_count():
+    """Total API requests this process has sent so far (sync and async)."""
+    return _request_count
+
+
+def _user_agent():
+    contact = os.environ.get('API_CONTACT_EMAIL')
+    # CrossRef and OpenAlex route requests that carry a mailto to their polite pool
+    return f"ORCIDPublicationCounter/1.0 (mailto:{contact})" if contact else "ORCIDPublicationCounter/1.0"
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers.update({
+                    'User-Agent': _user_agent(),
+                    'Accept-Encoding': 'gzip, deflate',
+                    'Connection': 'keep-alive',
+                })
+                # A dedicated pool per known host, plus a shared one for anything else
+                default = HTTPAdapter(pool_connections=len(HOSTS), pool_maxsize=POOL_SIZE)
+                session.mount('https://', default)
+                session.mount('http://', default)
+                for host in HOSTS:
+                    session.mount(f'https://{host}/', HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+                _session = session
+    return _session
+
+
+def request(method, url, **kwargs):
+    """Send a request through the pooled session, applying the rate limit and default timeouts.
+
+    A 429 answer pauses the host's limiter for the server's Retry-After, so
+    every thread waits it out instead of adding to the storm.  Raises
+    BudgetExceeded instead of sending when the current job's budget is spent.
+    """
+    if kwargs.get('timeout') is None:
+        kwargs['timeout'] = DEFAULT_TIMEOUT
+    check_budget()
+    limiter = get_limiter(url)
+    if limiter is not None:
+        limiter.acquire()
+        # The limiter may have held us for a while
+        check_budget()
+    count_request()
+    response = get_session().request(method, url, **kwargs)
+    honor_retry_after(limiter, response)
+    return response
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
@@ -0,0 +1,558 @@
+"""
+Persistent background job queue for batch uploads.
+
+/upload runs the whole pipeline inside the HTTP request, which ties up a web
+worker and dies with the reverse proxy's timeout on large sheets.  POST /jobs
+instead stores the uploaded workbook and its parameters in a SQLite queue and
+returns a job id at once; background worker threads claim queued jobs, run
+app.process_upload on them and keep the finished workbook on disk until it is
+downloaded from GET /jobs/<id>/result.
+
+While a job runs, process_upload reports progress to a JobProgress, which
+publishes it on the in-process EventBus; GET /jobs/<id>/events streams those
+events to the browser as Server-Sent Events (stream_events).
+
+A job can be cancelled (JobQueue.cancel) and has an optional wall-clock
+deadline (the 'deadline' parameter in seconds, JOB_DEADLINE by default).
+Both are enforced through an http_client.Budget that every API call checks:
+a cancelled job stops sending requests at once, and a job past its deadline
+finishes with a partial workbook listing the rows it did not reach.
+
+The queue survives restarts: every process running workers registers a
+random token and refreshes it while alive, and jobs still marked running
+under a token that stopped being refreshed are put back in the queue (PIDs
+are not used for this: containers reuse them after a restart).  Finished
+jobs and their result files are deleted after JOB_RETENTION seconds.  Set JOBS_DB_PATH and
+JOBS_RESULT_DIR to relocate the queue and the result files, and JOB_WORKERS
+for the number of worker threads per process.
+"""
+import collections
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+import http_client
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(BASE_DIR, 'jobs.sqlite3')
+DEFAULT_RESULT_DIR = os.path.join(BASE_DIR, 'job_results')
+WORKER_COUNT = int(os.environ.get('JOB_WORKERS', 1))
+# Seconds an idle worker waits before looking for jobs queued by other processes
+IDLE_POLL = 2.0
+# Seconds between progress snapshots on an event stream with no new events
+HEARTBEAT = 5.0
+# Seconds an event stream stays open before it ends and the browser reconnects
+# (EventSource does so by itself), well inside gunicorn's 30 s worker timeout
+STREAM_SECONDS = 20.0
+# Milliseconds the browser waits before reconnecting to an ended stream
+STREAM_RETRY_MS = 500
+# Window (seconds) over which the request rate is measured
+RATE_WINDOW = 10.0
+# Seconds between checks of a running job's cancel flag in the database
+CANCEL_POLL = 2.0
+# Seconds between a worker process's liveness updates, and after which a
+# process that stopped updating is considered gone and its jobs requeued
+WORKER_HEARTBEAT = 10.0
+WORKER_TIMEOUT = 60.0
+DEFAULT_RETENTION = 7 * 24 * 3600
+
+# Identifies this process's workers in the queue, whatever PID it got
+PROCESS_TOKEN = uuid.uuid4().hex
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINAL = (DONE, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    input BLOB NOT NULL,
+    faculty_input BLOB,
+    result_path TEXT,
+    error TEXT,
+    worker_pid INTEGER,
+    worker_token TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    partial INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS workers (
+    token TEXT PRIMARY KEY,
+    pid INTEGER,
+    seen_at REAL NOT NULL
+);
+"""
+# Columns added after the first release, for queues created before them
+_MIGRATIONS = (
+    ('cancel_requested', 'ALTER TABLE jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0'),
+    ('partial', 'ALTER TABLE jobs ADD COLUMN partial INTEGER NOT NULL DEFAULT 0'),
+    ('worker_token', 'ALTER TABLE jobs ADD COLUMN worker_token TEXT'),
+)
+
+# Columns reported by JobQueue.get (never the uploaded bytes)
+_PUBLIC_COLUMNS = ('id', 'status', 'params', 'result_path', 'error', 'created_at', 'started_at', 'finished_at',
+                   'cancel_requested', 'partial')
+
+
+def job_deadline(value=None):
+    """Wall-clock budget in seconds for a job: `value`, else JOB_DEADLINE; None means no deadline."""
+    if value in (None, ''):
+        value = os.environ.get('JOB_DEADLINE')
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if seconds > 0 else None
+
+
+def job_retention():
+    """Seconds finished jobs and their workbooks are kept (JOB_RETENTION overrides)."""
+    try:
+        return int(os.environ.get('JOB_RETENTION', DEFAULT_RETENTION))
+    except ValueError:
+        return DEFAULT_RETENTION
+
+
+class JobQueue:
+    """SQLite-backed FIFO of upload jobs, safe to share between threads and processes."""
+
+    def __init__(self, path=None, result_dir=None, token=None):
+        self.path = path or DEFAULT_PATH
+        self.result_dir = result_dir or DEFAULT_RESULT_DIR
+        self.token = token or PROCESS_TOKEN
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._workers = []
+        self._workers_lock = threading.Lock()
+        self._conn()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for column, statement in _MIGRATIONS:
+                if column not in columns:
+                    try:
+                        conn.execute(statement)
+                    except sqlite3.OperationalError:
+                        pass  # added concurrently by another process
+            self._local.conn = conn
+        return conn
+
+    def submit(self, file_bytes, params=None, faculty_bytes=None):
+        """Queue an upload; params are process_upload keyword arguments.  Returns the job id."""
+        job_id = uuid.uuid4().hex
+        self._conn().execute(
+            'INSERT INTO jobs (id, status, params, input, faculty_input, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, QUEUED, json.dumps(params or {}), file_bytes, faculty_bytes, time.time()))
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Return the job as a dict (status, params, timestamps, error), or None."""
+        row = self._conn().execute(
+            f'SELECT {", ".join(_PUBLIC_COLUMNS)} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(_PUBLIC_COLUMNS, row))
+        job['params'] = json.loads(job['params'])
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        job['partial'] = bool(job['partial'])
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a job: a queued job never starts, a running one stops at its next API call.
+
+        Returns the job's status afterwards, or None for an unknown job.
+        Finished jobs are left alone.
+        """
+        conn = self._conn()
+        cur = conn.execute('UPDATE jobs SET status = ?, finished_at = ?, input = ? WHERE id = ? AND status = ?',
+                           (CANCELLED, time.time(), b'', job_id, QUEUED))
+        if cur.rowcount:
+            bus.publish(job_id, CANCELLED, {'stage': CANCELLED, 'error': None, 'partial': False})
+            return CANCELLED
+        # The worker may run in another process: it polls this flag (JobBudget)
+        conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?', (job_id, RUNNING))
+        with _budgets_lock:
+            budget = _budgets.get(job_id)
+        if budget is not None:
+            budget.cancel()
+        job = self.get(job_id)
+        return job['status'] if job else None
+
+    def cancel_requested(self, job_id):
+        row = self._conn().execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def claim(self):
+        """Mark the oldest queued job as running by this process and return (id, params, input, faculty_input)."""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id, params, input, faculty_input FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1',
+                (QUEUED,)).fetchone()
+            if row is not None:
+                conn.execute('UPDATE jobs SET status = ?, worker_pid = ?, worker_token = ?, started_at = ? WHERE id = ?',
+                             (RUNNING, os.getpid(), self.token, time.time(), row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2], row[3]
+
+    def finish(self, job_id, out_path, status=DONE, partial=False):
+        """Move a finished workbook into the result directory and mark the job done (or cancelled)."""
+        os.makedirs(self.result_dir, exist_ok=True)
+        result_path = os.path.join(self.result_dir, f'{job_id}.xlsx')
+        shutil.move(out_path, result_path)
+        self._conn().execute(
+            'UPDATE jobs SET status = ?, result_path = ?, partial = ?, finished_at = ?, input = ? WHERE id = ?',
+            (status, result_path, int(partial), time.time(), b'', job_id))
+
+    def fail(self, job_id, error, status=FAILED):
+        self._conn().execute(
+            'UPDATE jobs SET status = ?, error = ?, finished_at = ?, input = ? WHERE id = ?',
+            (status, str(error), time.time(), b'', job_id))
+
+    def purge_expired(self):
+        """Delete jobs finished more than job_retention() seconds ago, with their result files."""
+        rows = self._conn().execute(
+            f'SELECT id, result_path FROM jobs WHERE status IN ({", ".join("?" * len(FINAL))}) AND finished_at < ?',
+            (*FINAL, time.time() - job_retention())).fetchall()
+        for job_id, result_path in rows:
+            if result_path:
+                try:
+                    os.remove(result_path)
+                except FileNotFoundError:
+                    pass
+            self._conn().execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        return len(rows)
+
+    def beat(self):
+        """Record that this process's workers are alive."""
+        self._conn().execute('INSERT OR REPLACE INTO workers (token, pid, seen_at) VALUES (?, ?, ?)',
+                             (self.token, os.getpid(), time.time()))
+
+    def requeue_orphans(self):
+        """Put back jobs left running by worker processes that stopped beating (e.g. a restarted container)."""
+        conn = self._conn()
+        conn.execute('DELETE FROM workers WHERE seen_at < ?', (time.time() - WORKER_TIMEOUT,))
+        live = {row[0] for row in conn.execute('SELECT token FROM workers')}
+        live.add(self.token)
+        rows = conn.execute(
+            'SELECT id, worker_token, cancel_requested FROM jobs WHERE status = ?', (RUNNING,)).fetchall()
+        orphans = [(job_id, cancelled) for job_id, token, cancelled in rows if token not in live]
+        for job_id, cancelled in orphans:
+            if cancelled:
+                # Cancelled before its worker went away: do not run it again
+                self._conn().execute(
+                    'UPDATE jobs SET status = ?, finished_at = ?, input = ? WHERE id = ? AND status = ?',
+                    (CANCELLED, time.time(), b'', job_id, RUNNING))
+                continue
+            self._conn().execute(
+                'UPDATE jobs SET status = ?, worker_pid = NULL, worker_token = NULL, started_at = NULL '
+                'WHERE id = ? AND status = ?',
+                (QUEUED, job_id, RUNNING))
+        if orphans:
+            print(f"Requeued {len(orphans)} interrupted job(s)")
+        return orphans
+
+    def start_workers(self, runner, count=None):
+        """Start `count` daemon threads that run runner(file_bytes, faculty_bytes=..., progress=..., budget=..., **params) per job.
+
+        runner returns the path of the generated workbook; an exception fails
+        the job with its message.  budget is the job's JobBudget; runner
+        passes it to http_client.use_budget and returns a partial workbook
+        once it runs out.  A heartbeat thread keeps this process registered
+        as alive, requeues the jobs of processes that are not and purges
+        expired jobs.  Calling this again is a no-op.
+        """
+        with self._workers_lock:
+            if self._workers:
+                return
+            self.beat()
+            self.requeue_orphans()
+            self.purge_expired()
+            for i in range(count or WORKER_COUNT):
+                t = threading.Thread(target=self._work, args=(runner,), name=f'job-worker-{i}', daemon=True)
+                t.start()
+                self._workers.append(t)
+            t = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(WORKER_HEARTBEAT)
+            try:
+                self.beat()
+                if self.requeue_orphans():
+                    self._wakeup.set()
+                self.purge_expired()
+            except Exception as e:
+                print(f"❌ Job queue heartbeat error: {e}")
+
+    def _work(self, runner):
+        while True:
+            try:
+                job = self.claim()
+            except Exception as e:
+                print(f"❌ Job queue error: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(IDLE_POLL)
+                self._wakeup.clear()
+                continue
+            job_id, params, file_bytes, faculty_bytes = job
+            print(f"Job {job_id} started")
+            progress = JobProgress(job_id)
+            budget = JobBudget(self, job_id, job_deadline(params.pop('deadline', None)))
+            with _budgets_lock:
+                _budgets[job_id] = budget
+            try:
+                out_path = runner(file_bytes, faculty_bytes=faculty_bytes, progress=progress, budget=budget, **params)
+                if budget.tripped == 'cancelled':
+                    # Keep what was finished before the cancel, like a deadline does
+                    self.finish(job_id, out_path, status=CANCELLED, partial=True)
+                    print(f"Job {job_id} cancelled")
+                    progress.finish(CANCELLED, partial=True)
+                else:
+                    self.finish(job_id, out_path, partial=budget.tripped == 'deadline')
+                    print(f"Job {job_id} done" + (" (deadline reached, partial workbook)" if budget.tripped else ""))
+                    progress.finish(DONE, partial=budget.tripped == 'deadline')
+            except http_client.BudgetExceeded as e:
+                # Stopped before any workbook could be written
+                status = CANCELLED if e.reason == 'cancelled' else FAILED
+                error = 'Cancelled' if e.reason == 'cancelled' else 'Deadline reached before the workbook was written'
+                print(f"❌ Job {job_id}: {error}")
+                self.fail(job_id, error, status=status)
+                progress.finish(status, error)
+            except Exception as e:
+                print(f"❌ Job {job_id} failed: {e}")
+                self.fail(job_id, e)
+                progress.finish(FAILED, str(e))
+            finally:
+                with _budgets_lock:
+                    _budgets.pop(job_id, None)
+
+
+# job id -> JobBudget of the jobs running in this process
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+
+class JobBudget(http_client.Budget):
+    """Budget of a running job that is also cancelled through the queue (JobQueue.cancel from any process)."""
+
+    def __init__(self, job_queue, job_id, seconds=None):
+        super().__init__(seconds)
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self._polled_at = 0.0
+
+    def exceeded(self):
+        now = time.monotonic()
+        if not self._cancelled.is_set() and now - self._polled_at >= CANCEL_POLL:
+            self._polled_at = now
+            try:
+                if self.job_queue.cancel_requested(self.job_id):
+                    self.cancel()
+            except sqlite3.Error as e:
+                print(f"❌ Could not read the cancel flag of job {self.job_id}: {e}")
+        return super().exceeded()
+
+
+class EventBus:
+    """In-process publish/subscribe of job events; each subscriber gets its own queue."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id):
+        q = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, job_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def publish(self, job_id, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for q in subscribers:
+            q.put((event, data))
+
+
+bus = EventBus()
+# job id -> JobProgress of the jobs running in this process
+_progress = {}
+_progress_lock = threading.Lock()
+
+
+def get_progress(job_id):
+    with _progress_lock:
+        return _progress.get(job_id)
+
+
+class JobProgress:
+    """process_upload progress callback for one job: keeps the counters and publishes them on the bus.
+
+    Every event carries a snapshot: stage, total_orcids, completed,
+    succeeded_orcids, failed_orcids, fallback_orcids, not_reached_orcids
+    (left out by a cancel or deadline), request_rate (API
+    requests per second sent by this process over the last RATE_WINDOW
+    seconds) and eta_seconds (None until the first ORCID not restored from a
+    checkpoint completes).
+    """
+
+    def __init__(self, job_id, event_bus=None):
+        self.job_id = job_id
+        self.bus = event_bus or bus
+        self.stage = 'reading'
+        self.total = None
+        self.restored = 0
+        self.counts = {'succeeded': 0, 'failed': 0, 'fallback': 0, 'not_reached': 0}
+        self.started_at = time.time()
+        self._processing_since = None
+        self._lock = threading.Lock()
+        self._samples = collections.deque()
+        with _progress_lock:
+            _progress[job_id] = self
+
+    def __call__(self, event, **data):
+        with self._lock:
+            if event == 'stage':
+                self.stage = data['stage']
+            elif event == 'start':
+                self.total = data['total']
+                self.restored = data.get('restored', 0)
+                self._processing_since = time.time()
+            elif event == 'orcid':
+                self.counts[data['outcome']] += 1
+                if not isinstance(data.get('name'), str):
+                    data['name'] = None
+        self.bus.publish(self.job_id, event, dict(data, **self.snapshot()))
+
+    def _request_rate(self):
+        now, count = time.time(), http_client.request_count()
+        with self._lock:
+            self._samples.append((now, count))
+            while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW:
+                self._samples.popleft()
+            first_at, first_count = self._samples[0]
+        return round((count - first_count) / (now - first_at), 2) if now > first_at else 0.0
+
+    def snapshot(self):
+        rate = self._request_rate()
+        with self._lock:
+            completed = sum(self.counts.values())
+            eta = None
+            # Checkpoint-restored rows are reported at once: only rows processed now set the pace
+            processed = completed - self.restored
+            if self.total and processed > 0 and self._processing_since:
+                per_item = (time.time() - self._processing_since) / processed
+                eta = round(per_item * (self.total - completed), 1)
+            return {
+                'stage': self.stage,
+                'total_orcids': self.total,
+                'completed': completed,
+                'succeeded_orcids': self.counts['succeeded'],
+                'failed_orcids': self.counts['failed'],
+                'fallback_orcids': self.counts['fallback'],
+                'not_reached_orcids': self.counts['not_reached'],
+                'request_rate': rate,
+                'eta_seconds': eta,
+                'elapsed_seconds': round(time.time() - self.started_at, 1),
+            }
+
+    def finish(self, status, error=None, partial=False):
+        with _progress_lock:
+            _progress.pop(self.job_id, None)
+        self.stage = status
+        self.bus.publish(self.job_id, status, dict(self.snapshot(), error=error, partial=partial))
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_events(job_queue, job_id, heartbeat=HEARTBEAT, max_seconds=STREAM_SECONDS):
+    """Yield Server-Sent Events for a job until it is done, failed or cancelled, or for max_seconds.
+
+    Events come straight from the worker through the bus: 'stage', 'start',
+    'orcid' and finally 'done', 'failed' or 'cancelled'; a 'progress' snapshot is sent
+    when nothing happened for `heartbeat` seconds.  Jobs run by another
+    process only get 'progress' status updates read from the queue.  A
+    stream of an unfinished job ends after max_seconds, so that it never
+    holds a worker past its timeout; the browser reconnects after
+    STREAM_RETRY_MS and gets a fresh snapshot.
+    """
+    q = bus.subscribe(job_id)
+    ends_at = time.time() + max_seconds
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        while True:
+            # Subscribed first, so a job that finishes from here on is seen on the bus
+            job = job_queue.get(job_id)
+            if job is None:
+                return
+            if job['status'] in FINAL:
+                progress = get_progress(job_id)
+                yield _sse(job['status'], dict(progress.snapshot() if progress else {}, error=job['error'],
+                                               partial=job['partial']))
+                return
+            if time.time() >= ends_at:
+                return
+            progress = get_progress(job_id)
+            yield _sse('progress', progress.snapshot() if progress else {'stage': job['status']})
+            deadline = min(time.time() + heartbeat, ends_at)
+            while True:
+                try:
+                    event, data = q.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                yield _sse(event, data)
+                if event in FINAL:
+                    return
+    finally:
+        bus.unsubscribe(job_id, q)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """Return the process-wide JobQueue (JOBS_DB_PATH / JOBS_RESULT_DIR), creating it on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(os.environ.get('JOBS_DB_PATH') or None,
+                                  os.environ.get('JOBS_RESULT_DIR') or None)
+    return _queue
@@ -80,7 +80,7 @@ def get_publications(author, university, start_year, end_year):
         print(f"⚠️ Error retrieving publications: {e}")
         return []
 
-import requests
+import http_client
 
 def get_publications_from_orcid(orcid_id, start_year, end_year):
     headers = {"Accept": "application/json"}
@@ -89,7 +89,7 @@ def get_publications_from_orcid(orcid_id, start_year, end_year):
         orcid_id = orcid_id.rstrip("/").split("/")[-1]
     url = f"https://pub.orcid.org/v3.0/{orcid_id}/works"
     try:
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
         if response.status_code != 200:
             print(f"❌ ORCID API error: {response.status_code}")
             return []
@@ -203,9 +203,8 @@ from bs4 import BeautifulSoup
 
 def GetCredentialsFromORCID(orcid_id):
     
-    import requests
 
-    r = requests.get(f'https://pub.orcid.org/v3.0/expanded-search/?start=0&rows=200&q=orcid:{orcid_id}', headers={"accept": "application/json"})
+    r = http_client.get(f'https://pub.orcid.org/v3.0/expanded-search/?start=0&rows=200&q=orcid:{orcid_id}', headers={"accept": "application/json"})
     try:
         return r.json()
     except Exception as e:
@@ -213,10 +212,9 @@ def GetCredentialsFromORCID(orcid_id):
         
 
 def GetPublicationsFromORCID(orcid_id, start_year, end_year):
-    import requests
     url = f"https://pub.orcid.org/v3.0/{orcid_id}/works"
     headers = {"accept": "application/json"}
-    r = requests.get(url, headers=headers)
+    r = http_client.get(url, headers=headers)
     if r.status_code != 200:
         print(f"❌ ORCID API error: {r.status_code}")
         return []
@@ -283,18 +281,8 @@ def GetPublicationsFromORCID(orcid_id, start_year, end_year):
     except Exception as e:
         print(f"Error in GetPublicationsFromORCID: {e}")
         return []
-def GetCitationCountFromSemanticScholar(doi):
-    import requests
-    url = f"https://api.semanticscholar.org/graph/v1/paper/DOI:{doi}?fields=citationCount"
-    try:
-        r = requests.get(url)
-        if r.status_code == 200:
-            data = r.json()
-            return data.get("citationCount")
-    except Exception:
-        pass
-    return None
-    return results
+# Cached, batch-aware implementation shared with the web app
+from paper_count import GetCitationCountFromSemanticScholar
 
 # Example usage
 orcid_id = "0000-0003-1389-5408"  # Replace with a valid ORCID ID
@@ -324,9 +312,8 @@ from bs4 import BeautifulSoup
 
 def GetCredentialsFromORCID(orcid_id):
     
-    import requests
 
-    r = requests.get(f'https://pub.orcid.org/v3.0/expanded-search/?start=0&rows=200&q=orcid:{orcid_id}', headers={"accept": "application/json"})
+    r = http_client.get(f'https://pub.orcid.org/v3.0/expanded-search/?start=0&rows=200&q=orcid:{orcid_id}', headers={"accept": "application/json"})
     try:
         return r.json()
     except Exception as e:
@@ -334,10 +321,9 @@ def GetCredentialsFromORCID(orcid_id):
         
 
 def GetPublicationsFromORCID(orcid_id, start_year, end_year):
-    import requests
     url = f"https://pub.orcid.org/v3.0/{orcid_id}/works"
     headers = {"accept": "application/json"}
-    r = requests.get(url, headers=headers)
+    r = http_client.get(url, headers=headers)
     if r.status_code != 200:
         print(f"❌ ORCID API error: {r.status_code}")
         return []
@@ -497,18 +483,8 @@ def GetPublicationsFromORCID(orcid_id, start_year, end_year):
     except Exception as e:
         print(f"Error in GetPublicationsFromORCID: {e}")
         return {"journal": [], "book": [], "chapter": []}
-def GetCitationCountFromSemanticScholar(doi):
-    import requests
-    url = f"https://api.semanticscholar.org/graph/v1/paper/DOI:{doi}?fields=citationCount"
-    try:
-        r = requests.get(url)
-        if r.status_code == 200:
-            data = r.json()
-            return data.get("citationCount")
-    except Exception:
-        pass
-    return None
-    return results
+# Cached, batch-aware implementation shared with the web app
+from paper_count import GetCitationCountFromSemanticScholar
 
 # Example usage
 orcid_id = "0000-0002-6217-0430" 
@@ -1,43 +1,562 @@
-def GetCitedByCountFromOpenAlex(doi):
-    import requests
-    # DOI must be in the format: https://doi.org/xxx
-    # OpenAlex expects: https://openalex.org/doi/DOI:xxx
-    openalex_id = f"https://openalex.org/doi/DOI:{doi}"
-    url = f"https://api.openalex.org/works/{openalex_id}"
+import os
+import threading
+from dataclasses import dataclass, field
+
+import doi_store
+import http_client
+
+
+@dataclass
+class DOIMetadata:
+    """Everything the enrichment paths need to know about one DOI.
+
+    Built from at most one CrossRef and one OpenAlex lookup per DOI.
+    """
+    doi: str
+    authors: list = field(default_factory=list)        # full names in CrossRef order
+    authors_list: list = field(default_factory=list)   # [{'name': ..., 'affiliation': ...}]
+    publisher: str = None                               # CrossRef publisher
+    venue_publisher: str = None                         # OpenAlex host venue publisher
+    container_title: str = None
+    citation_count: int = None
+
+
+# Per-process memo of trimmed source records, keyed by lowercased DOI, in front
+# of the persistent doi_store.  A value of None means the source answered but
+# does not know the DOI; transport errors are not memoized so the next caller
+# retries.  Citation memo entries are (count, expires_at).
+_crossref_records = {}
+_openalex_records = {}
+_citation_memo = {}
+# orcid -> (parsed works record over all years, fetched_at), in front of doi_store
+_orcid_works_memo = {}
+# Bumped when the cached works record changes shape; older records are refetched
+ORCID_WORKS_FORMAT = 3
+_doi_cache_lock = threading.Lock()
+
+
+def _doi_key(doi):
+    doi = str(doi).strip()
+    for prefix in ('https://doi.org/', 'http://doi.org/', 'doi:'):
+        if doi.lower().startswith(prefix):
+            doi = doi[len(prefix):]
+    return doi.lower()
+
+
+def _crossref_authors_list(work):
+    authors_list = []
+    for a in (work or {}).get("author", []) or []:
+        full_name = f"{a.get('given', '')} {a.get('family', '')}".strip()
+        if full_name:
+            aff = a.get("affiliation", []) or []
+            aff_str = "; ".join([x.get("name", "") for x in aff if x.get("name")])
+            authors_list.append({"name": full_name, "affiliation": aff_str})
+    return authors_list
+
+
+def _crossref_record(work):
+    """Trim a CrossRef work to the bibliographic fields we keep permanently."""
+    container = work.get("container-title")
+    if isinstance(container, list):
+        container = container[0] if container else None
+    return {
+        "authors_list": _crossref_authors_list(work),
+        "publisher": work.get("publisher") or None,
+        "container_title": container or None,
+    }
+
+
+def _openalex_record(work):
+    """Trim an OpenAlex work to the bibliographic fields we keep permanently."""
+    publisher = (work.get("host_venue") or {}).get("publisher")
+    if not publisher:
+        source = (work.get("primary_location") or {}).get("source") or {}
+        publisher = source.get("host_organization_name")
+    return {
+        "venue_publisher": publisher or None,
+        "publication_year": work.get("publication_year"),
+    }
+
+
+def _lookup_record(memo, source, key):
+    """Return (found, record) from the process memo, then the persistent store."""
+    with _doi_cache_lock:
+        if key in memo:
+            return True, memo[key]
+    store = doi_store.get_store()
+    if store is not None:
+        try:
+            record = store.get_metadata(key, source)
+        except Exception as e:
+            print(f"❌ DOI store read error for {key}: {e}")
+            record = None
+        if record is not None:
+            with _doi_cache_lock:
+                memo[key] = record
+            return True, record
+    return False, None
+
+
+def _save_record(memo, source, key, record):
+    with _doi_cache_lock:
+        memo[key] = record
+    store = doi_store.get_store()
+    if store is not None and record is not None:
+        try:
+            store.put_metadata(key, source, record)
+        except Exception as e:
+            print(f"❌ DOI store write error for {key}: {e}")
+
+
+def _lookup_citation(key, source, count_stats=True):
+    """Return (found, count) for a cached citation count that is still fresh.
+
+    A found count of None is a negative entry: the source recently did not
+    know the DOI.  Lookups that decide between the cache and a fetch are
+    counted in doi_store.get_cache_stats(); re-reads of a count that such a
+    lookup just settled pass count_stats=False.
+    """
+    import time
+    now = time.time()
+    with _doi_cache_lock:
+        hit = _citation_memo.get((key, source))
+    if hit is None or hit[1] <= now:
+        store = doi_store.get_store()
+        if store is not None:
+            try:
+                hit = store.get_citation(key, source)
+            except Exception as e:
+                print(f"❌ DOI store read error for {key}: {e}")
+                hit = None
+            if hit is not None and hit[1] > now:
+                with _doi_cache_lock:
+                    _citation_memo[(key, source)] = hit
+    if hit is None or hit[1] <= now:
+        if count_stats:
+            doi_store.record_lookup(source, 'miss' if hit is None else 'stale')
+        return False, None
+    if count_stats:
+        doi_store.record_lookup(source, 'hit' if hit[0] is not None else 'negative_hit')
+    return True, hit[0]
+
+
+def _save_citation(key, source, count, publication_year=None):
+    """Cache a citation count; None is cached as a bounded-time negative entry."""
+    import time
+    if count is None:
+        ttl = doi_store.negative_ttl()
+    else:
+        ttl = doi_store.citation_ttl(publication_year)
+    with _doi_cache_lock:
+        _citation_memo[(key, source)] = (count, time.time() + ttl)
+    store = doi_store.get_store()
+    if store is not None:
+        try:
+            store.put_citation(key, source, count, ttl)
+        except Exception as e:
+            print(f"❌ DOI store write error for {key}: {e}")
+
+
+def _publication_year_hint(key):
+    """Best known publication year for a DOI key, from cached OpenAlex metadata."""
+    found, record = _lookup_record(_openalex_records, 'openalex', key)
+    return (record or {}).get("publication_year") if found else None
+
+
+def _remember_crossref_work(item):
+    """Seed the CrossRef cache with a work record obtained from a listing/search call."""
+    doi = item.get("DOI") if isinstance(item, dict) else None
+    if doi:
+        _save_record(_crossref_records, 'crossref', _doi_key(doi), _crossref_record(item))
+
+
+def _remember_openalex_work(doi, work):
+    """Cache the permanent fields and the citation count of an OpenAlex work."""
+    key = _doi_key(doi)
+    record = _openalex_record(work)
+    _save_record(_openalex_records, 'openalex', key, record)
+    _save_citation(key, 'openalex', work.get("cited_by_count"), record.get("publication_year"))
+
+
+def _get_crossref_record(doi):
+    """Return the trimmed CrossRef record for a DOI, fetching it at most once."""
+    key = _doi_key(doi)
+    found, record = _lookup_record(_crossref_records, 'crossref', key)
+    if found:
+        return record
     try:
-        r = requests.get(url)
+        r = http_client.get(f"https://api.crossref.org/works/{doi}")
         if r.status_code == 200:
-            data = r.json()
-            return data.get("cited_by_count")
+            work = r.json().get("message") or None
+        elif r.status_code == 404:
+            work = None
+        else:
+            print(f"❌ CrossRef returned {r.status_code} for {doi}")
+            return None
     except Exception as e:
-        print(f"❌ OpenAlex error for {doi}: {e}")
-    return None
-
-def GetAuthorsFromDOI(doi):
-    import requests
-    url = f"https://api.crossref.org/works/{doi}"
+        print(f"❌ CrossRef error for {doi}: {e}")
+        return None
+    if work is None:
+        # Unknown DOI: remember for this process only, it may be registered later
+        with _doi_cache_lock:
+            _crossref_records[key] = None
+        return None
+    record = _crossref_record(work)
+    _save_record(_crossref_records, 'crossref', key, record)
+    return record
+
+
+def _fetch_openalex_work(doi):
+    """Fetch one OpenAlex work and cache it; returns the raw work or None."""
+    key = _doi_key(doi)
     try:
-        r = requests.get(url)
+        r = http_client.get(f"https://api.openalex.org/works/https://doi.org/{doi}")
         if r.status_code == 200:
-            data = r.json()
-            authors = []
-            for a in data["message"].get("author", []):
-                given = a.get("given", "")
-                family = a.get("family", "")
-                full_name = f"{given} {family}".strip()
-                if full_name:
-                    authors.append(full_name)
-            return authors
+            work = r.json() or None
+        elif r.status_code == 404:
+            work = None
+        else:
+            print(f"❌ OpenAlex returned {r.status_code} for {doi}")
+            return None
     except Exception as e:
-        print(f"❌ CrossRef error for {doi}: {e}")
-    return []
+        print(f"❌ OpenAlex error for {doi}: {e}")
+        return None
+    if work is None:
+        with _doi_cache_lock:
+            _openalex_records[key] = None
+        _save_citation(key, 'openalex', None)
+        return None
+    _remember_openalex_work(doi, work)
+    return work
+
+
+def _get_openalex_record(doi):
+    key = _doi_key(doi)
+    found, record = _lookup_record(_openalex_records, 'openalex', key)
+    if found:
+        return record
+    found, count = _lookup_citation(key, 'openalex', count_stats=False)
+    if found and count is None:
+        # OpenAlex recently answered 404 for this DOI
+        return None
+    work = _fetch_openalex_work(doi)
+    return _openalex_record(work) if work else None
+
+
+def GetDOIMetadata(doi):
+    """Resolve authors, affiliations, publisher, container title and citation count for a DOI.
+
+    CrossRef supplies the bibliographic fields and OpenAlex the citation count,
+    with Semantic Scholar as the fallback citation source.  Bibliographic
+    fields are served from the persistent DOI store when known; otherwise each
+    source is queried at most once per DOI.
+    """
+    cr = _get_crossref_record(doi) or {}
+    # Callers prefetch their DOI set first: that prefetch made the cache-or-fetch decision
+    citation_count = _doi_citation_count(doi, count_stats=False)
+    oa = _get_openalex_record(doi) or {}
+    authors_list = [dict(a) for a in cr.get("authors_list") or []]
+    return DOIMetadata(
+        doi=doi,
+        authors=[a["name"] for a in authors_list],
+        authors_list=authors_list,
+        publisher=cr.get("publisher"),
+        venue_publisher=oa.get("venue_publisher"),
+        container_title=cr.get("container_title"),
+        citation_count=citation_count,
+    )
+
+
+def _doi_citation_count(doi, count_stats=True):
+    """Citation count of a DOI from OpenAlex, else Semantic Scholar, through the TTL'd citation caches."""
+    count = GetCitedByCountFromOpenAlex(doi, count_stats=count_stats)
+    if count is None:
+        count = GetCitationCountFromSemanticScholar(doi, count_stats=count_stats)
+    return count
+
+
+def GetCitedByCountFromOpenAlex(doi, count_stats=True):
+    key = _doi_key(doi)
+    found, count = _lookup_citation(key, 'openalex', count_stats)
+    if found:
+        return count
+    work = _fetch_openalex_work(doi)
+    return work.get("cited_by_count") if work else None
+
+def GetAuthorsFromDOI(doi):
+    record = _get_crossref_record(doi) or {}
+    return [a["name"] for a in record.get("authors_list") or []]
+
+
+OPENALEX_BATCH_SIZE = 50
+OPENALEX_WORK_FIELDS = "doi,cited_by_count,publication_year,primary_location"
+
+
+def _batchable_doi(doi):
+    # ',' separates filters and '|' separates OR values in OpenAlex/CrossRef filters
+    return bool(doi) and ',' not in doi and '|' not in doi
+
+
+def _pending_dois(dois, is_cached):
+    """Map DOI key -> DOI for the distinct DOIs that is_cached(key) says still need fetching."""
+    pending = {}
+    for doi in dois or []:
+        if not doi:
+            continue
+        key = _doi_key(doi)
+        if key not in pending and not is_cached(key):
+            pending[key] = doi
+    return pending
+
+
+def _split_batchable(pending, batch_size):
+    """Return (chunks of batchable DOI keys, DOIs that must be looked up one by one)."""
+    singles = [doi for doi in pending.values() if not _batchable_doi(doi)]
+    keys = [k for k, doi in pending.items() if _batchable_doi(doi)]
+    return [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)], singles
+
+
+def _openalex_batch_params(chunk):
+    return {
+        "filter": "doi:" + "|".join(chunk),
+        "select": OPENALEX_WORK_FIELDS,
+        "per-page": OPENALEX_BATCH_SIZE,
+    }
+
+
+def _absorb_openalex_batch(chunk, results):
+    """Cache the works of one OpenAlex DOI batch; requested DOIs it lacks are cached as unknown."""
+    seen = set()
+    for work in results:
+        if work.get("doi"):
+            key = _doi_key(work["doi"])
+            seen.add(key)
+            _remember_openalex_work(key, work)
+    for key in chunk:
+        if key not in seen:
+            with _doi_cache_lock:
+                _openalex_records[key] = None
+            _save_citation(key, 'openalex', None)
+
+
+def FetchOpenAlexWorksByDOI(dois):
+    """Resolve many DOIs against OpenAlex with `filter=doi:a|b|c`, up to 50 per request.
+
+    DOIs whose citation count is already cached are skipped.  Results are fed
+    into the same caches as GetCitedByCountFromOpenAlex; DOIs missing from a
+    successful response are cached as unknown.  Returns the number of HTTP calls made.
+    """
+    pending = _pending_dois(dois, lambda key: _lookup_citation(key, 'openalex')[0])
+    chunks, singles = _split_batchable(pending, OPENALEX_BATCH_SIZE)
+    calls = 0
+    for chunk in chunks:
+        calls += 1
+        try:
+            r = http_client.get("https://api.openalex.org/works", params=_openalex_batch_params(chunk))
+            if r.status_code != 200:
+                print(f"❌ OpenAlex batch returned {r.status_code}; {len(chunk)} DOIs left for single lookups")
+                singles.extend(pending[k] for k in chunk)
+                continue
+            results = r.json().get("results", []) or []
+        except Exception as e:
+            print(f"❌ OpenAlex batch error: {e}")
+            singles.extend(pending[k] for k in chunk)
+            continue
+        _absorb_openalex_batch(chunk, results)
+    for doi in singles:
+        calls += 1
+        _fetch_openalex_work(doi)
+    return calls
+
+
+CROSSREF_BATCH_SIZE = 50
+CROSSREF_WORK_FIELDS = "DOI,author,publisher,container-title"
+
+
+def _crossref_batch_params(chunk):
+    return {
+        "filter": ",".join(f"doi:{k}" for k in chunk),
+        "select": CROSSREF_WORK_FIELDS,
+        "rows": len(chunk),
+    }
+
+
+def _absorb_crossref_batch(chunk, items):
+    """Cache the items of one CrossRef DOI batch; requested DOIs it lacks are remembered as unknown."""
+    seen = set()
+    for item in items:
+        if item.get("DOI"):
+            seen.add(_doi_key(item["DOI"]))
+            _remember_crossref_work(item)
+    with _doi_cache_lock:
+        for key in chunk:
+            if key not in seen:
+                _crossref_records[key] = None
+
+
+def FetchCrossRefWorksByDOI(dois):
+    """Resolve many DOIs against CrossRef with multi-DOI `filter=doi:a,doi:b` queries.
+
+    DOIs whose bibliographic record is already cached are skipped, and
+    `select=` trims each item to the fields GetDOIMetadata needs.  DOIs
+    missing from a successful response are remembered as unknown for this
+    process.  Returns the number of HTTP calls made.
+    """
+    pending = _pending_dois(dois, lambda key: _lookup_record(_crossref_records, 'crossref', key)[0])
+    chunks, singles = _split_batchable(pending, CROSSREF_BATCH_SIZE)
+    calls = 0
+    for chunk in chunks:
+        calls += 1
+        try:
+            r = http_client.get("https://api.crossref.org/works", params=_crossref_batch_params(chunk))
+            if r.status_code != 200:
+                print(f"❌ CrossRef batch returned {r.status_code}; {len(chunk)} DOIs left for single lookups")
+                singles.extend(pending[k] for k in chunk)
+                continue
+            items = r.json().get("message", {}).get("items", []) or []
+        except Exception as e:
+            print(f"❌ CrossRef batch error: {e}")
+            singles.extend(pending[k] for k in chunk)
+            continue
+        _absorb_crossref_batch(chunk, items)
+    for doi in singles:
+        calls += 1
+        _get_crossref_record(doi)
+    return calls
+
+
+OPENALEX_PAGE_SIZE = 200
+OPENALEX_LISTING_FIELDS = "id,doi,title,publication_year,cited_by_count,primary_location,type"
+
+
+def _openalex_listing_params(filter_str, cursor, select=OPENALEX_LISTING_FIELDS):
+    return {"filter": filter_str, "select": select, "per-page": OPENALEX_PAGE_SIZE, "cursor": cursor}
+
+
+def _iter_openalex_works(filter_str, select=OPENALEX_LISTING_FIELDS):
+    """Yield every OpenAlex work matching filter_str, walking cursor pages lazily."""
+    cursor = "*"
+    while cursor:
+        params = _openalex_listing_params(filter_str, cursor, select)
+        r = http_client.get("https://api.openalex.org/works", params=params)
+        if r.status_code != 200:
+            print(f"❌ OpenAlex listing returned {r.status_code} for filter {filter_str}")
+            return
+        data = r.json()
+        results = data.get("results", []) or []
+        for work in results:
+            yield work
+        cursor = (data.get("meta") or {}).get("next_cursor") if results else None
+
+
+def _normalize_title(title):
+    import re
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", str(title or "").lower())).strip()
+
+
+def FetchOpenAlexWorksByORCID(orcid_id, from_year=None, to_year=None):
+    """List all of a researcher's OpenAlex works in one cursor-paged query.
+
+    Works with a DOI are fed into the DOI caches (so later per-DOI lookups are
+    free); the return value indexes every work by DOI key and by normalized
+    title, for joining to ORCID summaries that have no DOI.
+    """
+    return _index_openalex_works(_iter_openalex_works(_openalex_orcid_filter(orcid_id, from_year, to_year)))
+
+
+def _openalex_orcid_filter(orcid_id, from_year=None, to_year=None):
+    filters = [f"author.orcid:https://orcid.org/{orcid_id}"]
+    if from_year or to_year:
+        filters.append(f"publication_year:{from_year or ''}-{to_year or ''}")
+    return ",".join(filters)
+
+
+def _index_openalex_works(works):
+    """Seed the DOI caches from an OpenAlex works listing and index it by DOI key and normalized title."""
+    by_doi, by_title = {}, {}
+    for work in works:
+        if work.get("doi"):
+            key = _doi_key(work["doi"])
+            by_doi[key] = work
+            _remember_openalex_work(key, work)
+        title_key = _normalize_title(work.get("title"))
+        if title_key:
+            by_title.setdefault(title_key, work)
+    return {"doi": by_doi, "title": by_title}
+
+
+SEMANTIC_SCHOLAR_BATCH_SIZE = 500
+SEMANTIC_SCHOLAR_BATCH_URL = "https://api.semanticscholar.org/graph/v1/paper/batch"
+
+
+def _absorb_semantic_scholar_batch(chunk, papers):
+    # The response is positional: one entry (or null) per requested ID
+    for key, paper in zip(chunk, papers):
+        if paper:
+            year = paper.get("year") or _publication_year_hint(key)
+            _save_citation(key, 'semanticscholar', paper.get("citationCount"), year)
+        else:
+            _save_citation(key, 'semanticscholar', None)
+
+
+def FetchSemanticScholarCitations(dois):
+    """Fetch citation counts for many DOIs with Semantic Scholar's POST /paper/batch endpoint.
+
+    Up to 500 IDs per call; DOIs with a cached count (or a cached "unknown")
+    are skipped and unknown papers are negatively cached.  Returns the number
+    of HTTP calls made.
+    """
+    pending = _pending_dois(dois, lambda key: _lookup_citation(key, 'semanticscholar')[0])
+    calls = 0
+    keys = list(pending)
+    for i in range(0, len(keys), SEMANTIC_SCHOLAR_BATCH_SIZE):
+        chunk = keys[i:i + SEMANTIC_SCHOLAR_BATCH_SIZE]
+        calls += 1
+        try:
+            r = http_client.post(
+                SEMANTIC_SCHOLAR_BATCH_URL,
+                params={"fields": "citationCount,year"},
+                json={"ids": [f"DOI:{k}" for k in chunk]},
+                timeout=30,
+            )
+            if r.status_code != 200:
+                print(f"❌ Semantic Scholar batch returned {r.status_code} for {len(chunk)} DOIs")
+                continue
+            papers = r.json() or []
+        except Exception as e:
+            print(f"❌ Semantic Scholar batch error: {e}")
+            continue
+        _absorb_semantic_scholar_batch(chunk, papers)
+    return calls
+
+
+def PrefetchDOIMetadata(dois, citation_dois=None):
+    """Warm the DOI caches for a whole set of DOIs with batched source calls.
+
+    Call this with every DOI a code path is about to resolve; the following
+    GetDOIMetadata calls are then served from cache.  citation_dois only
+    need their citation counts (works reused from a cached record): they
+    join the OpenAlex and Semantic Scholar batches but not CrossRef's.
+    """
+    dois = [d for d in dict.fromkeys(d for d in (dois or []) if d)]
+    counted = [d for d in dict.fromkeys(dois + [d for d in (citation_dois or []) if d])]
+    if not counted:
+        return
+    if dois:
+        FetchCrossRefWorksByDOI(dois)
+    FetchOpenAlexWorksByDOI(counted)
+    FetchSemanticScholarCitations(_dois_without_openalex_count(counted))
+
+
+def _dois_without_openalex_count(dois):
+    # Semantic Scholar is the second citation source, for DOIs OpenAlex cannot count
+    return [d for d in dois if GetCitedByCountFromOpenAlex(d, count_stats=False) is None]
 
 def GetAuthorsFromScienceDirect(url):
     """Extract all author names from a ScienceDirect article page using the 'author-group' tag."""
-    import requests
     from bs4 import BeautifulSoup
     try:
-        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
+        response = http_client.get(url, headers={"User-Agent": "Mozilla/5.0"})
         if response.status_code != 200:
             print(f"❌ Error fetching ScienceDirect page: {response.status_code}")
             return []
@@ -62,14 +581,53 @@ from requests_html import HTMLSession
 from bs4 import BeautifulSoup
 
 def GetCredentialsFromORCID(orcid_id):
-    import requests
-    r = requests.get(f'https://pub.orcid.org/v3.0/expanded-search/?start=0&rows=200&q=orcid:{orcid_id}', headers={"accept": "application/json"})
+    r = http_client.get(f'https://pub.orcid.org/v3.0/expanded-search/?start=0&rows=200&q=orcid:{orcid_id}', headers={"accept": "application/json"})
     try:
         return r.json()
     except Exception as e:
         print(f"❌ ORCID request failed: {e}")
 
-def GetPublicationsByName(prof_name, start_date_str, end_date_str):
+# Seconds each name-search source gets before its results are dropped
+SEARCH_SOURCE_DEADLINE = float(os.environ.get('SEARCH_SOURCE_DEADLINE', 20))
+
+
+def SearchSourcesConcurrently(prof_name, start_date, end_date, sources, deadline=None):
+    """Run every (name, search_fn) source at the same time and merge what finishes in time.
+
+    Results are concatenated in the order of `sources`, whatever order they
+    finish in, so deduplication stays deterministic.  Returns (publications,
+    status), where status maps each source name to 'ok' or 'failed: <error>';
+    a source that misses the deadline has failed too ('failed: timed out
+    after <deadline>s').  It keeps running in the background and its result is
+    discarded.
+    """
+    import concurrent.futures
+    import contextvars
+    deadline = SEARCH_SOURCE_DEADLINE if deadline is None else deadline
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(sources))
+    # Each source runs in a copy of this context so that the job's http_client budget applies to it
+    futures = [(name, executor.submit(contextvars.copy_context().run, fn, prof_name, start_date, end_date))
+               for name, fn in sources]
+    concurrent.futures.wait([f for _, f in futures], timeout=deadline)
+    # Do not wait for late sources
+    executor.shutdown(wait=False)
+
+    all_publications, status = [], {}
+    for name, fut in futures:
+        if not fut.done():
+            status[name] = f'failed: timed out after {deadline:g}s'
+            print(f"❌ {name} search for {prof_name!r} missed the {deadline:.0f}s deadline")
+            continue
+        try:
+            all_publications.extend(fut.result() or [])
+            status[name] = 'ok'
+        except Exception as e:
+            status[name] = f'failed: {e}'
+            print(f"❌ {name} search for {prof_name!r} failed: {e}")
+    return all_publications, status
+
+
+def GetPublicationsByName(prof_name, start_date_str, end_date_str, return_status=False):
     """
     Get publications for a professor by name, searching across multiple sources:
     - Google Scholar
@@ -77,8 +635,11 @@ def GetPublicationsByName(prof_name, start_date_str, end_date_str):
     - ORCID (find ORCID by name, then get publications)
     - OpenAlex
     Then deduplicate results based on DOI or title.
+
+    The sources are queried concurrently with a per-source deadline (see
+    SearchSourcesConcurrently).  With return_status=True the result is
+    (publications, source_status) so callers can show late or failed sources.
     """
-    import requests
     import datetime
     import pandas as pd
 
@@ -87,23 +648,13 @@ def GetPublicationsByName(prof_name, start_date_str, end_date_str):
 
     print(f"Searching publications for professor: {prof_name} across multiple sources")
 
-    all_publications = []
-
-    # Search Google Scholar
-    gs_pubs = _search_google_scholar(prof_name, start_date, end_date)
-    all_publications.extend(gs_pubs)
-
-    # Search CrossRef
-    cr_pubs = _search_crossref(prof_name, start_date, end_date)
-    all_publications.extend(cr_pubs)
-
-    # Search ORCID (find ORCID by name, then get publications)
-    orcid_pubs = _search_orcid_by_name(prof_name, start_date, end_date)
-    all_publications.extend(orcid_pubs)
-
-    # Search OpenAlex
-    oa_pubs = _search_openalex(prof_name, start_date, end_date)
-    all_publications.extend(oa_pubs)
+    all_publications, source_status = SearchSourcesConcurrently(prof_name, start_date, end_date, [
+        ("Google Scholar", _search_google_scholar),
+        ("CrossRef", _search_crossref),
+        # find ORCID by name, then get publications
+        ("ORCID", _search_orcid_by_name),
+        ("OpenAlex", _search_openalex),
+    ])
 
     # Deduplicate publications
     deduplicated = _deduplicate_publications(all_publications)
@@ -421,7 +972,10 @@ def GetPublicationsByName(prof_name, start_date_str, end_date_str):
         print(f"\nBook Chapters for {prof_name}:")
         print(pd.DataFrame(chapter_rows))
 
-    return {"journal": journal_rows, "book": book_rows, "chapter": chapter_rows}
+    publications = {"journal": journal_rows, "book": book_rows, "chapter": chapter_rows}
+    if return_status:
+        return publications, source_status
+    return publications
 
 def _search_google_scholar(prof_name, start_date, end_date):
     """Search Google Scholar for publications by professor name."""
@@ -430,70 +984,139 @@ def _search_google_scholar(prof_name, start_date, end_date):
     print("Google Scholar search not implemented (requires scraping or API)")
     return []
 
+CROSSREF_PAGE_SIZE = 1000  # CrossRef's maximum rows per request
+CROSSREF_SEARCH_FIELDS = "DOI,title,author,published-print,publisher,container-title,is-referenced-by-count"
+# query.author is a relevance search: the best hits come first, so read it in
+# small pages and stop after about the 100 hits the search used to return
+CROSSREF_SEARCH_PAGE_SIZE = 100
+CROSSREF_SEARCH_MAX_RESULTS = int(os.environ.get('CROSSREF_SEARCH_MAX_RESULTS', 200))
+
+
+def _crossref_page_params(params, cursor, select=CROSSREF_SEARCH_FIELDS, rows=CROSSREF_PAGE_SIZE):
+    return dict(params, select=select, rows=rows, cursor=cursor)
+
+
+def _iter_crossref_works(params, select=CROSSREF_SEARCH_FIELDS, max_results=None, page_size=CROSSREF_PAGE_SIZE):
+    """Yield CrossRef /works items for a query, walking deep-paging cursors lazily.
+
+    Stops after max_results items when given.
+    """
+    rows = min(page_size, max_results) if max_results else page_size
+    cursor, yielded = "*", 0
+    while cursor:
+        page = _crossref_page_params(params, cursor, select, rows)
+        r = http_client.get("https://api.crossref.org/works", params=page)
+        if r.status_code != 200:
+            print(f"❌ CrossRef listing returned {r.status_code} for {params}")
+            return
+        message = r.json().get("message", {}) or {}
+        items = message.get("items", []) or []
+        for item in items:
+            yield item
+            yielded += 1
+            if max_results and yielded >= max_results:
+                return
+        cursor = message.get("next-cursor") if items else None
+
+
+def _crossref_orcid_params(orcid_id, from_year=None, to_year=None):
+    filters = [f"orcid:{orcid_id}"]
+    if from_year:
+        filters.append(f"from-pub-date:{from_year}")
+    if to_year:
+        filters.append(f"until-pub-date:{to_year}")
+    return {"filter": ",".join(filters)}
+
+
+def FetchCrossRefWorksByORCID(orcid_id, from_year=None, to_year=None):
+    """List every CrossRef work deposited with this ORCID in one cursor-paged query.
+
+    Publishers that deposit ORCIDs make this a cheap pre-pass: each item seeds
+    the CrossRef record cache (authors, affiliations, publisher, container
+    title), so the later per-DOI resolution skips those DOIs.  Returns the set
+    of DOI keys seen.
+    """
+    keys = set()
+    for item in _iter_crossref_works(_crossref_orcid_params(orcid_id, from_year, to_year), select=CROSSREF_WORK_FIELDS):
+        if item.get("DOI"):
+            keys.add(_doi_key(item["DOI"]))
+            _remember_crossref_work(item)
+    return keys
+
+
 def _search_crossref(prof_name, start_date, end_date):
     """Search CrossRef for publications by professor name."""
-    import requests
     import datetime
 
-    url = f"https://api.crossref.org/works?query.author={prof_name}&rows=100"
+    # Date range and field projection are applied server-side
+    params = {
+        "query.author": prof_name,
+        "filter": f"from-pub-date:{start_date:%Y-%m-%d},until-pub-date:{end_date:%Y-%m-%d}",
+    }
     try:
-        r = requests.get(url)
-        if r.status_code == 200:
-            data = r.json()
-            pubs = []
-            for item in data.get("message", {}).get("items", []):
-                title = item.get("title", ["Untitled"])[0]
-                date_parts = item.get("published-print", {}).get("date-parts", [[None]])[0]
-                if not date_parts or not date_parts[0]:
-                    continue
-                pub_year = date_parts[0]
-                pub_date_obj = datetime.datetime(pub_year, 1, 1)
-                if not (start_date <= pub_date_obj <= end_date):
-                    continue
-                # Extract full date with month and day if available
-                pub_date_str = str(pub_year)
-                if len(date_parts) > 1 and date_parts[1]:
-                    pub_date_str = f"{pub_year}-{date_parts[1]:02d}"
-                    if len(date_parts) > 2 and date_parts[2]:
-                        pub_date_str = f"{pub_year}-{date_parts[1]:02d}-{date_parts[2]:02d}"
-                doi = item.get("DOI")
-                authors_list = []
-                for author in item.get("author", []):
-                    full_name = f"{author.get('given', '')} {author.get('family', '')}".strip()
-                    if full_name:
-                        aff = author.get("affiliation", [])
-                        aff_str = "; ".join([a.get("name", "") for a in aff if a.get("name")])
-                        authors_list.append({"name": full_name, "affiliation": aff_str})
-                authors_str = ", ".join([a["name"] for a in authors_list]) if authors_list else None
-                citation_count = GetCitedByCountFromOpenAlex(doi) if doi else item.get("is-referenced-by-count", 0)
+        in_range = []
+        for item in _iter_crossref_works(params, max_results=CROSSREF_SEARCH_MAX_RESULTS,
+                                         page_size=CROSSREF_SEARCH_PAGE_SIZE):
+            date_parts = item.get("published-print", {}).get("date-parts", [[None]])[0]
+            if not date_parts or not date_parts[0]:
+                continue
+            pub_year = date_parts[0]
+            pub_date_obj = datetime.datetime(pub_year, 1, 1)
+            if not (start_date <= pub_date_obj <= end_date):
+                continue
+            in_range.append((item, date_parts))
+        # The search hits are full CrossRef records: seed the resolver with them
+        # and batch the OpenAlex citation lookups for every DOI up front.
+        for item, _ in in_range:
+            _remember_crossref_work(item)
+        PrefetchDOIMetadata([item.get("DOI") for item, _ in in_range])
+        pubs = []
+        for item, date_parts in in_range:
+            title = item.get("title", ["Untitled"])[0]
+            pub_year = date_parts[0]
+            # Extract full date with month and day if available
+            pub_date_str = str(pub_year)
+            if len(date_parts) > 1 and date_parts[1]:
+                pub_date_str = f"{pub_year}-{date_parts[1]:02d}"
+                if len(date_parts) > 2 and date_parts[2]:
+                    pub_date_str = f"{pub_year}-{date_parts[1]:02d}-{date_parts[2]:02d}"
+            doi = item.get("DOI")
+            if doi:
+                meta = GetDOIMetadata(doi)
+                authors_list = meta.authors_list
+                citation_count = meta.citation_count
+                journal_title = meta.container_title or meta.publisher
+            else:
+                authors_list = _crossref_authors_list(item)
+                citation_count = item.get("is-referenced-by-count", 0)
                 journal_title = item.get('container-title', [])
                 journal_title = journal_title[0] if isinstance(journal_title, list) and journal_title else (item.get('publisher') or None)
-                pubs.append({
-                    "type": "journal",  # Assuming most CrossRef works are journal articles
-                    "title": title,
-                    "doi": doi,
-                    "year": pub_year,
-                    "Publication Date": pub_date_str,
-                    "authors": authors_str,
-                    "authors_list": authors_list,
-                    "citation_count": citation_count,
-                    "Journal Title": journal_title,
-                    "source": "CrossRef"
-                })
-            return pubs
+            authors_str = ", ".join([a["name"] for a in authors_list]) if authors_list else None
+            pubs.append({
+                "type": "journal",  # Assuming most CrossRef works are journal articles
+                "title": title,
+                "doi": doi,
+                "year": pub_year,
+                "Publication Date": pub_date_str,
+                "authors": authors_str,
+                "authors_list": authors_list,
+                "citation_count": citation_count,
+                "Journal Title": journal_title,
+                "source": "CrossRef"
+            })
+        return pubs
     except Exception as e:
         print(f"❌ CrossRef search error: {e}")
     return []
 
 def _search_orcid_by_name(prof_name, start_date, end_date):
     """Find ORCID by name, then get publications."""
-    import requests
     import re
 
     # Search for ORCID by name with stricter matching
     search_url = f"https://pub.orcid.org/v3.0/expanded-search/?q={prof_name}&rows=50"
     try:
-        r = requests.get(search_url, headers={"accept": "application/json"})
+        r = http_client.get(search_url, headers={"accept": "application/json"})
         if r.status_code == 200:
             data = r.json()
             results = data.get("expanded-result", [])
@@ -528,75 +1151,76 @@ def _search_orcid_by_name(prof_name, start_date, end_date):
         print(f"❌ ORCID search error: {e}")
     return []
 
+OPENALEX_SEARCH_FIELDS = "doi,title,publication_year,publication_date,type,cited_by_count,authorships,primary_location"
+
+
 def _search_openalex(prof_name, start_date, end_date):
     """Search OpenAlex for publications by professor name."""
-    import requests
     import datetime
 
     # First, find author ID
-    author_search_url = f"https://api.openalex.org/authors?search={prof_name}&per-page=10"
+    author_search_url = "https://api.openalex.org/authors"
     headers = {"User-Agent": "Mozilla/5.0 (compatible; AcademicResearchTool/1.0)"}
     try:
-        r = requests.get(author_search_url, headers=headers)
+        r = http_client.get(author_search_url, params={"search": prof_name, "per-page": 10}, headers=headers)
         if r.status_code == 200:
             author_data = r.json()
             authors = author_data.get("results", [])
             if authors:
                 author_id = authors[0]["id"]
-                # Get works
-                works_url = f"https://api.openalex.org/works?filter=author.id:{author_id.split('/')[-1]}&per_page=200"
-                r = requests.get(works_url)
-                if r.status_code == 200:
-                    works_data = r.json()
-                    works = works_data.get("results", [])
-                    pubs = []
-                    for work in works:
-                        title = work.get("title", "Untitled")
-                        publication_year = work.get("publication_year")
-                        if not publication_year:
-                            continue
-                        pub_date_obj = datetime.datetime(publication_year, 1, 1)
-                        if not (start_date <= pub_date_obj <= end_date):
-                            continue
-                        doi = work.get("doi")
-                        if doi:
-                            doi = doi.replace("https://doi.org/", "")
-                        authors_list = []
-                        for authorship in work.get("authorships", []):
-                            author_name = authorship.get("author", {}).get("display_name", "")
-                            aff = authorship.get("raw_affiliation_string", "")
-                            if author_name:
-                                authors_list.append({"name": author_name, "affiliation": aff})
-                        authors_str = ", ".join([a["name"] for a in authors_list]) if authors_list else None
-                        work_type = work.get("type", "")
-                        citation_count = work.get("cited_by_count", 0)
-                        pub_type = "journal" if work_type in ["article", "journal-article"] else "book" if work_type == "book" else "chapter"
-                        # Extract journal title from multiple possible fields
-                        journal_title = None
-                        primary_location = work.get('primary_location') or {}
-                        source = primary_location.get('source') or {}
-                        journal_title = source.get('display_name')
-                        # Fallback to legacy host_venue if primary_location not available
-                        if not journal_title:
-                            host = work.get('host_venue') or {}
-                            journal_title = host.get('display_name') or host.get('publisher')
-                        # Extract publication date with month and day if available
-                        pub_date_str = work.get('publication_date') or None
-                        if not pub_date_str:
-                            pub_date_str = str(publication_year)
-                        pubs.append({
-                            "type": pub_type,
-                            "title": title,
-                            "doi": doi,
-                            "year": publication_year,
-                            "Publication Date": pub_date_str,
-                            "authors": authors_str,
-                            "authors_list": authors_list,
-                            "citation_count": citation_count,
-                            "Journal Title": journal_title,
-                            "source": "OpenAlex"
-                        })
-                    return pubs
+                # Get works: the year range and field projection are applied server-side,
+                # and every cursor page is walked so prolific authors are not truncated
+                works_filter = (f"author.id:{author_id.split('/')[-1]},"
+                                f"publication_year:{start_date.year}-{end_date.year}")
+                pubs = []
+                for work in _iter_openalex_works(works_filter, select=OPENALEX_SEARCH_FIELDS):
+                    title = work.get("title", "Untitled")
+                    publication_year = work.get("publication_year")
+                    if not publication_year:
+                        continue
+                    pub_date_obj = datetime.datetime(publication_year, 1, 1)
+                    if not (start_date <= pub_date_obj <= end_date):
+                        continue
+                    doi = work.get("doi")
+                    if doi:
+                        doi = doi.replace("https://doi.org/", "")
+                        _remember_openalex_work(doi, work)
+                    authors_list = []
+                    for authorship in work.get("authorships", []):
+                        author_name = authorship.get("author", {}).get("display_name", "")
+                        aff = authorship.get("raw_affiliation_string", "")
+                        if author_name:
+                            authors_list.append({"name": author_name, "affiliation": aff})
+                    authors_str = ", ".join([a["name"] for a in authors_list]) if authors_list else None
+                    work_type = work.get("type", "")
+                    citation_count = work.get("cited_by_count", 0)
+                    pub_type = "journal" if work_type in ["article", "journal-article"] else "book" if work_type == "book" else "chapter"
+                    # Extract journal title from multiple possible fields
+                    journal_title = None
+                    primary_location = work.get('primary_location') or {}
+                    source = primary_location.get('source') or {}
+                    journal_title = source.get('display_name')
+                    # Fallback to legacy host_venue if primary_location not available
+                    if not journal_title:
+                        host = work.get('host_venue') or {}
+                        journal_title = host.get('display_name') or host.get('publisher')
+                    # Extract publication date with month and day if available
+                    pub_date_str = work.get('publication_date') or None
+                    if not pub_date_str:
+                        pub_date_str = str(publication_year)
+                    pubs.append({
+                        "type": pub_type,
+                        "title": title,
+                        "doi": doi,
+                        "year": publication_year,
+                        "Publication Date": pub_date_str,
+                        "authors": authors_str,
+                        "authors_list": authors_list,
+                        "citation_count": citation_count,
+                        "Journal Title": journal_title,
+                        "source": "OpenAlex"
+                    })
+                return pubs
     except Exception as e:
         print(f"❌ OpenAlex search error: {e}")
     return []
@@ -726,340 +1350,566 @@ def LoadFacultyJoinYears(excel_source, sheet_name='Worker Listing as of 30 Sep',
 
     return by_orcid, by_name, df_faculty_info
 
+def _orcid_summary_doi(summary):
+    for ext_id in summary.get("external-ids", {}).get("external-id", []):
+        if ext_id.get("external-id-type") == "doi":
+            return ext_id.get("external-id-value")
+    return None
+
+
+def _orcid_summary_year(summary):
+    pub_date_info = summary.get("publication-date") or {}
+    year_field = pub_date_info.get("year")
+    try:
+        return int(year_field.get("value")) if isinstance(year_field, dict) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _orcid_summaries_in_range(data, from_year=None, to_year=None):
+    """The first work summary of every group published within [from_year, to_year] (None: unbounded)."""
+    summaries = []
+    for group in data.get("group", []):
+        work_summaries = group.get("work-summary", None)
+        if not work_summaries or not isinstance(work_summaries, list) or not isinstance(work_summaries[0], dict):
+            continue
+        year = _orcid_summary_year(work_summaries[0])
+        if year is None or (from_year and year < from_year) or (to_year and year > to_year):
+            continue
+        summaries.append(work_summaries[0])
+    return summaries
+
+
+ORCID_API = "https://pub.orcid.org/v3.0"
+ORCID_BULK_SIZE = 100  # put-codes per bulk /works/{put-codes} request
+
+
+def _orcid_contributor_names(contributors):
+    """Display names from an ORCID contributors block (credit name, else the contributor's iD)."""
+    names = []
+    for c in (contributors or {}).get("contributor", []) or []:
+        name = (c.get("credit-name") or {}).get("value")
+        if not name:
+            name = (c.get("contributor-orcid") or {}).get("path")
+        if name:
+            names.append(name)
+    return names
+
+
+def _orcid_person_name(record):
+    """'Given Family' (else the credit name) from an ORCID /record response, or None."""
+    name = ((record or {}).get("person") or {}).get("name") or {}
+    full = " ".join(
+        (name.get(part) or {}).get("value", "") for part in ("given-names", "family-name")).strip()
+    return full or (name.get("credit-name") or {}).get("value") or None
+
+
+def _orcid_put_code_chunks(data, from_year=None, to_year=None, only=None):
+    codes = [str(s["put-code"]) for s in _orcid_summaries_in_range(data, from_year, to_year) if s.get("put-code") is not None]
+    if only is not None:
+        codes = [c for c in codes if c in only]
+    return [codes[i:i + ORCID_BULK_SIZE] for i in range(0, len(codes), ORCID_BULK_SIZE)]
+
+
+def _absorb_orcid_bulk_works(data, contributors):
+    """Add put-code -> contributor names from one bulk /works/{put-codes} response to `contributors`."""
+    for entry in (data or {}).get("bulk", []) or []:
+        work = entry.get("work") if isinstance(entry, dict) else None
+        if work and work.get("put-code") is not None:
+            contributors[str(work["put-code"])] = _orcid_contributor_names(work.get("contributors"))
+
+
+def FetchORCIDWorkContributors(orcid_id, data, from_year=None, to_year=None, put_codes=None):
+    """Full contributor lists for the in-range works of an ORCID works summary.
+
+    Work summaries carry no contributors; the full records come from bulk
+    /works/{put-code,...} calls, 100 works per request.  put_codes limits the
+    lookup to those works.  Returns {put-code (str): [names]}.
+    """
+    contributors = {}
+    for chunk in _orcid_put_code_chunks(data, from_year, to_year, only=put_codes):
+        r = http_client.get(f"{ORCID_API}/{orcid_id}/works/{','.join(chunk)}", headers={"accept": "application/json"})
+        if r.status_code != 200:
+            print(f"❌ ORCID bulk works returned {r.status_code} for {orcid_id}")
+            continue
+        _absorb_orcid_bulk_works(r.json(), contributors)
+    return contributors
+
 def GetPublicationsFromORCID(orcid_id, from_date, to_date):
     """Get publications from ORCID API for a given ORCID ID between from_date and to_date."""
     return _get_publications_from_orcid(orcid_id, from_date, to_date)
 
-def _get_publications_from_orcid(orcid_id, from_date, to_date):
-    """Helper function to get publications from ORCID API."""
-    import requests
-    import datetime
+def _orcid_last_modified(item):
+    return ((item or {}).get("last-modified-date") or {}).get("value")
+
+
+def _orcid_put_code_versions(data):
+    """put-code (str) -> last-modified timestamp of the first summary of every dated work group."""
+    return {str(s["put-code"]): _orcid_last_modified(s)
+            for s in _orcid_summaries_in_range(data) if s.get("put-code") is not None}
+
+
+def _orcid_changed_put_codes(data, previous):
+    """Put-codes that are new or modified since the cached works record `previous` (all of them without one)."""
+    versions = _orcid_put_code_versions(data)
+    if not previous:
+        return set(versions)
+    if previous.get("last_modified") is not None and previous["last_modified"] == _orcid_last_modified(data):
+        return set()
+    seen = previous.get("put_codes") or {}
+    return {code for code, modified in versions.items() if code not in seen or seen[code] != modified}
+
+
+def _apply_orcid_record(profile, record):
+    """Fill a profile's name and works summary from an ORCID /record response.
+
+    The summary is diffed against the ORCID's cached works record, even an
+    expired one: profile['changed'] holds the put-codes that need
+    enriching, the rest are reused from profile['previous'].
+    """
+    profile["name"] = _orcid_person_name(record)
+    profile["works"] = ((record.get("activities-summary") or {}).get("works")) or {"group": []}
+    profile["previous"] = _lookup_orcid_works(profile["orcid"], include_expired=True)
+    profile["changed"] = _orcid_changed_put_codes(profile["works"], profile["previous"])
 
-    url = f"https://pub.orcid.org/v3.0/{orcid_id}/works"
+
+def _profile_dois(profile):
+    """DOIs of a profile's works that need enriching (new or modified since the cached record)."""
+    changed = profile.get("changed")
+    return [doi for doi in (_orcid_summary_doi(s) for s in _orcid_summaries_in_range(profile["works"])
+                            if changed is None or str(s.get("put-code")) in changed) if doi]
+
+
+def _profile_reused_dois(profile):
+    """DOIs of a profile's works reused from the cached record; only their citation counts may need refreshing."""
+    changed = profile.get("changed")
+    if changed is None:
+        return []
+    return [doi for doi in (_orcid_summary_doi(s) for s in _orcid_summaries_in_range(profile["works"])
+                            if str(s.get("put-code")) not in changed) if doi]
+
+
+def FetchORCIDProfile(orcid_id, from_year=None, to_year=None, raise_errors=False):
+    """Fetch everything needed to enrich one ORCID, before any per-DOI work.
+
+    Returns {'orcid', 'name', 'works', 'previous', 'changed', 'contributors',
+    'openalex'}: one ORCID
+    /record call gives the person's name and the works summary JSON (None if
+    ORCID did not answer 200), bulk /works calls the contributors of the
+    in-range works (FetchORCIDWorkContributors), and FetchOpenAlexWorksByORCID
+    the researcher's OpenAlex works index.  The CrossRef works deposited with
+    the ORCID are listed too (FetchCrossRefWorksByORCID), which seeds the
+    CrossRef cache for most of the DOIs.  Batch callers fetch all profiles
+    first, enrich the union of their DOIs once with PrefetchDOIMetadata, mark
+    the profiles 'enriched' and then hand each one to
+    _get_publications_from_orcid.  Only works that
+    are new or modified since the ORCID was last cached are looked up; when
+    none are, the record is the only call made.
+
+    With raise_errors=True a failed ORCID call raises the matching
+    http_client.FetchError instead of returning works=None, so callers can
+    tell a rate limit or outage from a bad ORCID iD.
+    """
+    profile = {"orcid": orcid_id, "name": None, "works": None, "contributors": {}, "openalex": {"doi": {}, "title": {}}}
+    url = f"{ORCID_API}/{orcid_id}/record"
     headers = {"accept": "application/json"}
-    r = requests.get(url, headers=headers)
+    try:
+        r = http_client.get(url, headers=headers)
+    except Exception as e:
+        if raise_errors:
+            raise http_client.RetryableFetchError(f"ORCID record for {orcid_id}: {e}") from e
+        print(f"❌ ORCID API error for {orcid_id}: {e}")
+        return profile
     if r.status_code != 200:
         print(f"❌ ORCID API error: {r.status_code}")
-        return {"journal": [], "book": [], "chapter": []}
+        if raise_errors:
+            http_client.raise_for_outcome(r, f"ORCID record for {orcid_id}")
+        return profile
     try:
-        import pandas as pd
-        data = r.json()
-        journal_rows, book_rows, chapter_rows = [], [], []
-        for group in data.get("group", []):
-            work_summaries = group.get("work-summary", None)
-            if not work_summaries or not isinstance(work_summaries, list):
-                continue
-            if len(work_summaries) == 0 or not isinstance(work_summaries[0], dict):
+        _apply_orcid_record(profile, r.json())
+    except Exception as e:
+        print(f"❌ ORCID response for {orcid_id} is not JSON: {e}")
+        if raise_errors:
+            raise http_client.PermanentFetchError(f"ORCID record for {orcid_id}: invalid JSON", r.status_code) from e
+        return profile
+    if not profile["changed"]:
+        print(f"ORCID {orcid_id} unchanged since it was cached; reusing its works")
+        return profile
+    try:
+        profile["contributors"] = FetchORCIDWorkContributors(
+            orcid_id, profile["works"], from_year, to_year, put_codes=profile["changed"])
+    except Exception as e:
+        print(f"❌ ORCID bulk works failed for {orcid_id}: {e}")
+    try:
+        profile["openalex"] = FetchOpenAlexWorksByORCID(orcid_id, from_year, to_year)
+    except Exception as e:
+        print(f"❌ OpenAlex ORCID listing failed for {orcid_id}: {e}")
+    try:
+        FetchCrossRefWorksByORCID(orcid_id, from_year, to_year)
+    except Exception as e:
+        print(f"❌ CrossRef ORCID listing failed for {orcid_id}: {e}")
+    return profile
+
+
+def _lookup_orcid_works(orcid_id, include_expired=False):
+    """Return the cached works record of an ORCID (all years) while it is fresh, else None.
+
+    include_expired returns it whatever its age, as the base of an incremental refresh.
+    """
+    import time
+    with _doi_cache_lock:
+        hit = _orcid_works_memo.get(orcid_id)
+    if hit is None:
+        store = doi_store.get_store()
+        if store is not None:
+            try:
+                hit = store.get_orcid_works(orcid_id)
+            except Exception as e:
+                print(f"❌ DOI store read error for ORCID {orcid_id}: {e}")
+            if hit is not None:
+                with _doi_cache_lock:
+                    _orcid_works_memo[orcid_id] = hit
+    if hit is None or (not include_expired and time.time() - hit[1] > doi_store.orcid_works_ttl()):
+        return None
+    if hit[0].get("format") != ORCID_WORKS_FORMAT:
+        return None
+    return hit[0]
+
+
+def _save_orcid_works(orcid_id, record):
+    import time
+    with _doi_cache_lock:
+        _orcid_works_memo[orcid_id] = (record, time.time())
+    store = doi_store.get_store()
+    if store is not None:
+        try:
+            store.put_orcid_works(orcid_id, record)
+        except Exception as e:
+            print(f"❌ DOI store write error for ORCID {orcid_id}: {e}")
+
+
+def _publications_in_range(record, from_year, to_year, refresh=True):
+    """Serve one year range from a cached works record as {'journal', 'book', 'chapter'} row lists.
+
+    Citation counts of works with a DOI are not part of the record: they are
+    looked up here, so each count follows its own citation TTL.  refresh=False
+    skips refetching expired counts, for a record that was just parsed.
+    """
+    in_range = [w for w in record.get("works", []) if from_year <= w["year"] <= to_year]
+    if refresh:
+        try:
+            # Refresh the expired counts in batches (a no-op when all are fresh)
+            PrefetchDOIMetadata([], citation_dois=[w["doi"] for w in in_range if w.get("doi")])
+        except Exception as e:
+            print(f"❌ Citation refresh failed: {e}")
+    pubs = {"journal": [], "book": [], "chapter": []}
+    for work in in_range:
+        row = dict(work["row"])
+        if work.get("doi"):
+            count = _doi_citation_count(work["doi"], count_stats=False)
+            if count is None:
+                count = 0
+            row["Citation Count"] = row["citation_count"] = count
+        pubs[work["category"]].append(row)
+    return pubs
+
+
+def _get_publications_from_orcid(orcid_id, from_date, to_date, profile=None, raise_errors=False):
+    """Helper function to get publications from ORCID API.
+
+    Every dated work of the record is parsed and enriched whatever the range,
+    and cached per ORCID (_lookup_orcid_works); the range is then applied
+    locally, so other ranges over the same researchers cost no API calls.
+    profile: optional result of FetchORCIDProfile for this ORCID, so that
+    batch callers can fetch and enrich all profiles up front.
+    raise_errors: raise http_client.FetchError for failed ORCID calls and
+    unreadable records instead of returning empty categories, which are then
+    reserved for records that really have nothing in range.
+    """
+    record = _lookup_orcid_works(orcid_id) if profile is None else None
+    cached = record is not None
+    if record is None:
+        if profile is None or profile.get("works") is None:
+            profile = FetchORCIDProfile(orcid_id, raise_errors=raise_errors)
+        if profile.get("works") is None:
+            return {"journal": [], "book": [], "chapter": []}
+        try:
+            record = _parse_orcid_works(orcid_id, profile)
+        except Exception as e:
+            print(f"Error in _get_publications_from_orcid: {e}")
+            if raise_errors:
+                raise http_client.PermanentFetchError(f"ORCID record {orcid_id} could not be read: {e}") from e
+            return {"journal": [], "book": [], "chapter": []}
+        _save_orcid_works(orcid_id, record)
+    pubs = _publications_in_range(record, from_date.year, to_date.year, refresh=cached)
+    import pandas as pd
+    for category, label, plural in (("journal", "Journal Articles", "journal articles"),
+                                    ("book", "Books", "books"), ("chapter", "Book Chapters", "book chapters")):
+        if not pubs[category]:
+            print(f"No {plural} found for this ORCID in the given years.")
+        else:
+            print(f"\n{label}:")
+            print(pd.DataFrame(pubs[category]))
+    return pubs
+
+
+def _orcid_work_entry(summary, category, year, row, doi=None):
+    if doi:
+        # Citation counts move: _publications_in_range looks them up by DOI
+        row = {k: v for k, v in row.items() if k not in ("Citation Count", "citation_count")}
+    return {"put_code": str(summary.get("put-code")), "category": category, "year": year, "doi": doi, "row": row}
+
+
+def _parse_orcid_works(orcid_id, profile):
+    """Parse and enrich every dated work of a FetchORCIDProfile result.
+
+    Returns the cacheable record {'format', 'last_modified', 'put_codes',
+    'works': [{'put_code', 'category', 'year', 'doi', 'row'}]}, category
+    being 'journal', 'book' or 'chapter'; rows of works with a DOI carry no
+    citation count.  Works outside profile['changed'] reuse their rows from
+    profile['previous'].
+    """
+    data = profile["works"]
+    changed = profile.get("changed")
+    reusable = {w["put_code"]: w for w in (profile.get("previous") or {}).get("works", [])}
+    openalex_works = profile["openalex"]
+    # Full contributor lists by put-code (bulk /works) and the researcher's own name (/record)
+    work_contributors = profile.get("contributors") or {}
+    person_name = profile.get("name")
+    # Resolve the DOI set in batches before walking the works one by one,
+    # unless the batch caller already enriched it (profile['enriched'])
+    if not profile.get("enriched"):
+        try:
+            PrefetchDOIMetadata(_profile_dois(profile), citation_dois=_profile_reused_dois(profile))
+        except Exception as e:
+            print(f"❌ DOI prefetch failed for {orcid_id}: {e}")
+    works = []
+    for group in data.get("group", []):
+        work_summaries = group.get("work-summary", None)
+        if not work_summaries or not isinstance(work_summaries, list):
+            continue
+        if len(work_summaries) == 0 or not isinstance(work_summaries[0], dict):
+            continue
+        summary = work_summaries[0]
+        put_code = str(summary.get("put-code"))
+        if changed is not None and put_code not in changed:
+            if put_code in reusable:
+                works.append(reusable[put_code])
+            continue
+        title = summary.get("title", {}).get("title", {}).get("value", "Untitled")
+        doi = _orcid_summary_doi(summary)
+        pub_date_info = summary.get("publication-date")
+        pub_year = pub_month = pub_day = None
+        if pub_date_info:
+            year_field = pub_date_info.get("year")
+            month_field = pub_date_info.get("month")
+            day_field = pub_date_info.get("day")
+            pub_year = year_field.get("value", None) if isinstance(year_field, dict) else None
+            pub_month = month_field.get("value", None) if isinstance(month_field, dict) else None
+            pub_day = day_field.get("value", None) if isinstance(day_field, dict) else None
+        pub_date = None
+        if pub_year:
+            # Build date string with ACTUAL available parts (for display)
+            date_parts = [pub_year]
+            if pub_month:
+                date_parts.append(f"{int(pub_month):02d}")
+                if pub_day:
+                    date_parts.append(f"{int(pub_day):02d}")
+            pub_date = "-".join(date_parts)
+            
+            # Ranges filter by year only (simpler and more reliable)
+            try:
+                filter_year = int(pub_year)
+            except Exception:
                 continue
-            summary = work_summaries[0]
-            title = summary.get("title", {}).get("title", {}).get("value", "Untitled")
-            doi = None
-            for ext_id in summary.get("external-ids", {}).get("external-id", []):
-                if ext_id.get("external-id-type") == "doi":
-                    doi = ext_id.get("external-id-value")
+        else:
+            continue  # Skip if no year
+
+        journal_title = summary.get("journal-title", {}).get("value") if summary.get("journal-title") else None
+        type_of_work = summary.get("type", "")
+        # --- Robust fallback for Book/Chapter fields ---
+        # Book Title for chapters: try summary, then group, then all summaries
+        book_title = None
+        if type_of_work == "book-chapter":
+            book_title = summary.get("container-title", {}).get("value") if summary.get("container-title") else None
+            if not book_title and "title" in group:
+                book_title = group["title"].get("title", {}).get("value")
+            if not book_title:
+                for ws in work_summaries:
+                    bt = ws.get("container-title", {}).get("value") if ws.get("container-title") else None
+                    if bt:
+                        book_title = bt
+                        break
+        # Publisher: try summary, then group, then all summaries
+        publisher = summary.get("publisher", {}).get("value") if summary.get("publisher") else None
+        if not publisher and "publisher" in group:
+            publisher = group["publisher"].get("value")
+        if not publisher:
+            for ws in work_summaries:
+                pub = ws.get("publisher", {}).get("value") if ws.get("publisher") else None
+                if pub:
+                    publisher = pub
                     break
-            pub_date_info = summary.get("publication-date")
-            pub_year = pub_month = pub_day = None
-            if pub_date_info:
-                year_field = pub_date_info.get("year")
-                month_field = pub_date_info.get("month")
-                day_field = pub_date_info.get("day")
-                pub_year = year_field.get("value", None) if isinstance(year_field, dict) else None
-                pub_month = month_field.get("value", None) if isinstance(month_field, dict) else None
-                pub_day = day_field.get("value", None) if isinstance(day_field, dict) else None
-            pub_date = None
-            if pub_year:
-                # Build date string with ACTUAL available parts (for display)
-                date_parts = [pub_year]
-                if pub_month:
-                    date_parts.append(f"{int(pub_month):02d}")
-                    if pub_day:
-                        date_parts.append(f"{int(pub_day):02d}")
-                pub_date = "-".join(date_parts)
-                
-                # Filter by year only (simpler and more reliable)
+        # One resolver call covers CrossRef authors/publisher and the OpenAlex citation count
+        meta = GetDOIMetadata(doi) if doi else None
+        # Citation count: use OpenAlex cited_by_count if DOI exists
+        citation_count = None
+        if meta:
+            citation_count = meta.citation_count
+        else:
+            # No DOI: join to the researcher's OpenAlex works by normalized title
+            oa_match = openalex_works["title"].get(_normalize_title(title))
+            if oa_match:
+                citation_count = oa_match.get("cited_by_count")
+        # If still None after all attempts, set to 0 to avoid NaN
+        if citation_count is None:
+            citation_count = 0
+        # Authors of books and chapters: the full ORCID contributor list, else the researcher's own name
+        contributors = work_contributors.get(str(summary.get("put-code"))) or _orcid_contributor_names(summary.get("contributors"))
+        authors_str = ", ".join(contributors) if contributors else person_name
+        if type_of_work == "journal-article":
+            # Try CrossRef DOI lookup for all authors first
+            all_authors = []
+            if meta:
+                if meta.authors:
+                    all_authors = list(meta.authors)
+                else:
+                    print(f"CrossRef DOI lookup failed for {doi}, falling back to ORCID contributors")
+            # If DOI lookup fails, fallback to ORCID contributors
+            if not all_authors:
+                all_authors = list(contributors)
+                # From all work summaries
+                for ws in work_summaries:
+                    all_authors.extend(_orcid_contributor_names(ws.get("contributors")))
+                # From group-level contributors
+                all_authors.extend(_orcid_contributor_names(group.get("contributors")))
+                # Deduplicate authors (preserve order)
+                all_authors = list(dict.fromkeys(all_authors))
+            all_authors_str = ", ".join(all_authors) if all_authors else None
+            
+            # Build authors_list for affiliation checking (CrossRef authors with affiliations)
+            authors_list = [dict(a) for a in meta.authors_list] if meta else []
+            
+            # Fallback: build minimal authors_list from all_authors
+            if not authors_list and all_authors:
+                authors_list = [{"name": name, "affiliation": ""} for name in all_authors]
+            if not journal_title and meta:
+                journal_title = meta.container_title
+            
+            works.append(_orcid_work_entry(summary, "journal", filter_year, {
+                "All Authors": all_authors_str,
+                "authors": all_authors_str,
+                "authors_list": authors_list,
+                # The faculty member, not the co-authors (those are in All Authors)
+                "Authors in School": person_name,
+                "Article Title": title,
+                "title": title,
+                "Article DOI": doi,
+                "doi": doi,
+                "Year": pub_year,
+                "year": pub_year,
+                "Journal Title": journal_title,
+                "Publication Date": pub_date,
+                "Citation Count": citation_count,
+                "citation_count": citation_count
+            }, doi))
+        elif type_of_work == "book":
+            # Prefer the CrossRef publisher if DOI exists
+            crossref_publisher = meta.publisher if meta else None
+            final_publisher = crossref_publisher if crossref_publisher else publisher
+            # --- Publisher fallback ---
+            if not final_publisher:
+                # Try OpenAlex host venue if DOI exists
+                if meta:
+                    final_publisher = meta.venue_publisher
+                # Fallback to journal-title/container-title if available
+                if not final_publisher:
+                    final_publisher = journal_title or book_title
+            # --- Citation Count fallback ---
+            if citation_count is None and doi:
+                citation_count = GetCitationCountFromSemanticScholar(doi, count_stats=False)
+            if citation_count is None and not doi:
                 try:
-                    filter_year = int(pub_year)
-                    from_year = from_date.year
-                    to_year = to_date.year
-                    
-                    # Check if publication year falls within the search year range
-                    if not (from_year <= filter_year <= to_year):
-                        continue
+                    r = http_client.get(f"https://api.openalex.org/works?filter=title.search:{title}")
+                    if r.status_code == 200:
+                        results = r.json().get("results", [])
+                        if results:
+                            citation_count = results[0].get("cited_by_count")
                 except Exception:
-                    continue
-            else:
-                continue  # Skip if no year
-
-            journal_title = summary.get("journal-title", {}).get("value") if summary.get("journal-title") else None
-            type_of_work = summary.get("type", "")
-            # --- Robust fallback for Book/Chapter fields ---
-            # Book Title for chapters: try summary, then group, then all summaries
-            book_title = None
-            if type_of_work == "book-chapter":
-                book_title = summary.get("container-title", {}).get("value") if summary.get("container-title") else None
-                if not book_title and "title" in group:
-                    book_title = group["title"].get("title", {}).get("value")
-                if not book_title:
-                    for ws in work_summaries:
-                        bt = ws.get("container-title", {}).get("value") if ws.get("container-title") else None
-                        if bt:
-                            book_title = bt
-                            break
-            # Publisher: try summary, then group, then all summaries
-            publisher = summary.get("publisher", {}).get("value") if summary.get("publisher") else None
-            if not publisher and "publisher" in group:
-                publisher = group["publisher"].get("value")
-            if not publisher:
-                for ws in work_summaries:
-                    pub = ws.get("publisher", {}).get("value") if ws.get("publisher") else None
-                    if pub:
-                        publisher = pub
-                        break
-            # Citation count: use OpenAlex cited_by_count if DOI exists
-            citation_count = None
-            if doi:
-                citation_count = GetCitedByCountFromOpenAlex(doi)
-            else:
-                # Try ISBN for books/chapters
-                isbn = None
-                for ext_id in summary.get("external-ids", {}).get("external-id", []):
-                    if ext_id.get("external-id-type") == "isbn":
-                        isbn = ext_id.get("external-id-value")
-                        break
-                if isbn:
-                    citation_count = None  # Placeholder
+                    pass
             # If still None after all attempts, set to 0 to avoid NaN
             if citation_count is None:
                 citation_count = 0
-            # Authors
-            authors = []
-            contributors = summary.get("contributors", {}).get("contributor", []) if summary.get("contributors") else []
-            for c in contributors:
-                name = c.get("credit-name", {}).get("value")
-                if not name:
-                    orcid_obj = c.get("contributor-orcid", {}).get("path")
-                    if orcid_obj:
-                        name = orcid_obj
-                if name:
-                    authors.append(name)
-            authors_str = ", ".join(authors) if authors else None
-            if not authors_str:
+            works.append(_orcid_work_entry(summary, "book", filter_year, {
+                "Authors": authors_str,
+                "authors": authors_str,
+                "Book Title": title,
+                "title": title,
+                "Year": pub_year,
+                "year": pub_year,
+                "Publisher": final_publisher,
+                "Citation Count": citation_count,
+                "citation_count": citation_count,
+                "Publication Date": pub_date
+            }, doi))
+        elif type_of_work == "book-chapter":
+            # Prefer the CrossRef publisher if DOI exists
+            crossref_publisher = meta.publisher if meta else None
+            final_publisher = crossref_publisher if crossref_publisher else publisher
+            # --- Publisher fallback ---
+            if not final_publisher:
+                # Try OpenAlex host venue if DOI exists
+                if meta:
+                    final_publisher = meta.venue_publisher
+                # Fallback to journal-title/container-title if available
+                if not final_publisher:
+                    final_publisher = journal_title or book_title
+            # --- Citation Count fallback ---
+            if citation_count is None and doi:
+                citation_count = GetCitationCountFromSemanticScholar(doi, count_stats=False)
+            if citation_count is None and not doi:
                 try:
-                    cred = GetCredentialsFromORCID(orcid_id)
-                    if cred and 'expanded-result' in cred and len(cred['expanded-result']) > 0:
-                        profile_name = cred['expanded-result'][0].get('given-names', '') + ' ' + cred['expanded-result'][0].get('family-name', '')
-                        authors_str = profile_name.strip() if profile_name.strip() else None
+                    r = http_client.get(f"https://api.openalex.org/works?filter=title.search:{title}")
+                    if r.status_code == 200:
+                        results = r.json().get("results", [])
+                        if results:
+                            citation_count = results[0].get("cited_by_count")
                 except Exception:
                     pass
-            if type_of_work == "journal-article":
-                # Try CrossRef DOI lookup for all authors first
-                all_authors = []
-                if doi:
-                    doi_authors = GetAuthorsFromDOI(doi)
-                    if doi_authors:
-                        all_authors = doi_authors
-                    else:
-                        print(f"CrossRef DOI lookup failed for {doi}, falling back to ORCID contributors")
-                # If DOI lookup fails, fallback to ORCID contributors
-                if not all_authors:
-                    # From all work summaries
-                    for ws in work_summaries:
-                        ws_contributors = ws.get("contributors", {}).get("contributor", [])
-                        for c in ws_contributors:
-                            name = c.get("credit-name", {}).get("value")
-                            if not name:
-                                orcid_obj = c.get("contributor-orcid", {}).get("path")
-                                if orcid_obj:
-                                    name = orcid_obj
-                            if name:
-                                all_authors.append(name)
-                    # From group-level contributors
-                    if group.get("contributors"):
-                        for c in group["contributors"].get("contributor", []):
-                            name = c.get("credit-name", {}).get("value")
-                            if not name:
-                                orcid_obj = c.get("contributor-orcid", {}).get("path")
-                                if orcid_obj:
-                                    name = orcid_obj
-                            if name:
-                                all_authors.append(name)
-                    # Deduplicate authors (preserve order)
-                    all_authors = list(dict.fromkeys(all_authors))
-                all_authors_str = ", ".join(all_authors) if all_authors else None
-                
-                # Build authors_list for affiliation checking
-                authors_list = []
-                if doi:
-                    # Try to get detailed author info from CrossRef
-                    try:
-                        r_crossref = requests.get(f"https://api.crossref.org/works/{doi}")
-                        if r_crossref.status_code == 200:
-                            cr_data = r_crossref.json()
-                            for cr_author in cr_data.get("message", {}).get("author", []):
-                                full_name = f"{cr_author.get('given', '')} {cr_author.get('family', '')}".strip()
-                                if full_name:
-                                    aff = cr_author.get("affiliation", [])
-                                    aff_str = "; ".join([a.get("name", "") for a in aff if a.get("name")])
-                                    authors_list.append({"name": full_name, "affiliation": aff_str})
-                    except Exception:
-                        pass
-                
-                # Fallback: build minimal authors_list from all_authors
-                if not authors_list and all_authors:
-                    authors_list = [{"name": name, "affiliation": ""} for name in all_authors]
-                
-                journal_rows.append({
-                    "All Authors": all_authors_str,
-                    "authors": all_authors_str,
-                    "authors_list": authors_list,
-                    "Authors in School": authors_str,
-                    "Article Title": title,
-                    "title": title,
-                    "Article DOI": doi,
-                    "doi": doi,
-                    "Year": pub_year,
-                    "year": pub_year,
-                    "Journal Title": journal_title,
-                    "Publication Date": pub_date,
-                    "Citation Count": citation_count,
-                    "citation_count": citation_count
-                })
-            elif type_of_work == "book":
-                # Try to get publisher from CrossRef if DOI exists
-                crossref_publisher = None
-                if doi:
-                    try:
-                        r = requests.get(f"https://api.crossref.org/works/{doi}")
-                        if r.status_code == 200:
-                            data = r.json()
-                            crossref_publisher = data["message"].get("publisher")
-                    except Exception as e:
-                        print(f"❌ CrossRef publisher error for {doi}: {e}")
-                final_publisher = crossref_publisher if crossref_publisher else publisher
-                # --- Publisher fallback ---
-                if not final_publisher:
-                    # Try OpenAlex if DOI exists
-                    if doi:
-                        try:
-                            r = requests.get(f"https://api.openalex.org/works/https://doi.org/{doi}")
-                            if r.status_code == 200:
-                                data = r.json()
-                                final_publisher = data.get("host_venue", {}).get("publisher")
-                        except Exception:
-                            pass
-                    # Fallback to journal-title/container-title if available
-                    if not final_publisher:
-                        final_publisher = journal_title or book_title
-                # --- Citation Count fallback ---
-                if citation_count is None and doi:
-                    citation_count = GetCitationCountFromSemanticScholar(doi)
-                if citation_count is None and not doi:
-                    try:
-                        r = requests.get(f"https://api.openalex.org/works?filter=title.search:{title}")
-                        if r.status_code == 200:
-                            results = r.json().get("results", [])
-                            if results:
-                                citation_count = results[0].get("cited_by_count")
-                    except Exception:
-                        pass
-                # If still None after all attempts, set to 0 to avoid NaN
-                if citation_count is None:
-                    citation_count = 0
-                book_rows.append({
-                    "Authors": authors_str,
-                    "authors": authors_str,
-                    "Book Title": title,
-                    "title": title,
-                    "Year": pub_year,
-                    "year": pub_year,
-                    "Publisher": final_publisher,
-                    "Citation Count": citation_count,
-                    "citation_count": citation_count,
-                    "Publication Date": pub_date
-                })
-            elif type_of_work == "book-chapter":
-                # Try to get publisher from CrossRef if DOI exists
-                crossref_publisher = None
-                if doi:
-                    try:
-                        r = requests.get(f"https://api.crossref.org/works/{doi}")
-                        if r.status_code == 200:
-                            data = r.json()
-                            crossref_publisher = data["message"].get("publisher")
-                    except Exception as e:
-                        print(f"❌ CrossRef publisher error for {doi}: {e}")
-                final_publisher = crossref_publisher if crossref_publisher else publisher
-                # --- Publisher fallback ---
-                if not final_publisher:
-                    # Try OpenAlex if DOI exists
-                    if doi:
-                        try:
-                            r = requests.get(f"https://api.openalex.org/works/https://doi.org/{doi}")
-                            if r.status_code == 200:
-                                data = r.json()
-                                final_publisher = data.get("host_venue", {}).get("publisher")
-                        except Exception:
-                            pass
-                    # Fallback to journal-title/container-title if available
-                    if not final_publisher:
-                        final_publisher = journal_title or book_title
-                # --- Citation Count fallback ---
-                if citation_count is None and doi:
-                    citation_count = GetCitationCountFromSemanticScholar(doi)
-                if citation_count is None and not doi:
-                    try:
-                        r = requests.get(f"https://api.openalex.org/works?filter=title.search:{title}")
-                        if r.status_code == 200:
-                            results = r.json().get("results", [])
-                            if results:
-                                citation_count = results[0].get("cited_by_count")
-                    except Exception:
-                        pass
-                chapter_title = title
-                chapter_rows.append({
-                    "Authors": authors_str,
-                    "authors": authors_str,
-                    "Book Title": book_title,
-                    "Chapter Title": chapter_title,
-                    "title": chapter_title,
-                    "Year": pub_year,
-                    "year": pub_year,
-                    "Publisher": final_publisher,
-                    "Citation Count": citation_count,
-                    "citation_count": citation_count,
-                    "Publication Date": pub_date
-                })
-        # Print DataFrames
-        if not journal_rows:
-            print("No journal articles found for this ORCID in the given years.")
-        else:
-            print("\nJournal Articles:")
-            print(pd.DataFrame(journal_rows))
-        if not book_rows:
-            print("No books found for this ORCID in the given years.")
-        else:
-            print("\nBooks:")
-            print(pd.DataFrame(book_rows))
-        if not chapter_rows:
-            print("No book chapters found for this ORCID in the given years.")
-        else:
-            print("\nBook Chapters:")
-            print(pd.DataFrame(chapter_rows))
-        # Return all for further use if needed
-        return {"journal": journal_rows, "book": book_rows, "chapter": chapter_rows}
-    except Exception as e:
-        print(f"Error in _get_publications_from_orcid: {e}")
-        return {"journal": [], "book": [], "chapter": []}
-
-def GetCitationCountFromSemanticScholar(doi):
-    import requests
+            chapter_title = title
+            works.append(_orcid_work_entry(summary, "chapter", filter_year, {
+                "Authors": authors_str,
+                "authors": authors_str,
+                "Book Title": book_title,
+                "Chapter Title": chapter_title,
+                "title": chapter_title,
+                "Year": pub_year,
+                "year": pub_year,
+                "Publisher": final_publisher,
+                "Citation Count": citation_count,
+                "citation_count": citation_count,
+                "Publication Date": pub_date
+            }, doi))
+    return {"format": ORCID_WORKS_FORMAT, "last_modified": _orcid_last_modified(data),
+            "put_codes": _orcid_put_code_versions(data), "works": works}
+
+def GetCitationCountFromSemanticScholar(doi, publication_year=None, count_stats=True):
+    key = _doi_key(doi)
+    found, count = _lookup_citation(key, 'semanticscholar', count_stats)
+    if found:
+        return count
+    if publication_year is None:
+        publication_year = _publication_year_hint(key)
     url = f"https://api.semanticscholar.org/graph/v1/paper/DOI:{doi}?fields=citationCount"
     try:
-        r = requests.get(url)
+        r = http_client.get(url, timeout=15)
         if r.status_code == 200:
             data = r.json()
-            return data.get("citationCount")
+            count = data.get("citationCount")
+            _save_citation(key, 'semanticscholar', count, publication_year)
+            return count
+        if r.status_code == 404:
+            _save_citation(key, 'semanticscholar', None)
     except Exception:
         pass
     return None
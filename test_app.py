@@ -0,0 +1,149 @@
+import datetime
+import io
+import re
+
+import pandas as pd
+import pytest
+
+import app
+import checkpoints
+import doi_store
+import http_client
+import paper_count
+
+
+@pytest.mark.parametrize("orcid", ["0000-0002-1825-0097", "0000-0001-5109-3700", "0000-0002-1694-233X"])
+def test_orcid_checksum_accepts_valid_ids(orcid):
+    assert app._orcid_checksum_ok(orcid)
+
+
+@pytest.mark.parametrize("orcid", ["0000-0002-1825-0098", "0000-0002-1694-2330", "0000-0002-1825-009",
+                                   "0000-000A-1825-0097", ""])
+def test_orcid_checksum_rejects_typos_and_malformed_ids(orcid):
+    assert not app._orcid_checksum_ok(orcid)
+
+
+def test_orcid_cells_are_normalized_before_the_check():
+    cells = pd.Series(["https://orcid.org/0000-0002-1825-0097/", " 0000 0002 1694 233x ", None, "0000-0002-1825"])
+    assert list(app._normalize_orcid_series(cells)) == ["0000-0002-1825-0097", "0000-0002-1694-233X", "",
+                                                        "0000-0002-1825"]
+
+
+@pytest.mark.parametrize("placeholder", ["N/A", "n/a", "-", "none", "TBD", "https://orcid.org/"])
+def test_orcid_placeholders_count_as_empty(placeholder):
+    assert list(app._normalize_orcid_series(pd.Series([placeholder]))) == [""]
+
+
+class _Response:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+        self.headers = {}
+        self.text = str(data)
+
+    def json(self):
+        return self._data
+
+
+def _fake_request(method, url, params=None, json=None, **kwargs):
+    """ORCID records with one journal article each; every other source knows nothing."""
+    record = re.match(r"https://pub\.orcid\.org/v3\.0/([^/]+)/record$", url)
+    if record:
+        orcid = record.group(1)
+        summary = {"put-code": 1, "type": "journal-article", "title": {"title": {"value": f"Paper of {orcid}"}},
+                   "external-ids": {"external-id": [{"external-id-type": "doi", "external-id-value": f"10.1/{orcid}"}]},
+                   "publication-date": {"year": {"value": "2020"}}, "journal-title": {"value": "J"},
+                   "last-modified-date": {"value": 1}}
+        return _Response(200, {"person": {"name": {"given-names": {"value": "Ann"}, "family-name": {"value": "Lee"}}},
+                               "activities-summary": {"works": {"group": [{"work-summary": [summary]}]}}})
+    if re.match(r"https://pub\.orcid\.org/v3\.0/[^/]+/works/[\d,]+$", url):
+        return _Response(200, {"bulk": [{"work": {"put-code": 1, "contributors": {
+            "contributor": [{"credit-name": {"value": "Ann Lee"}}]}}}]})
+    return _Response(404, {})
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """No persistent DOI cache, empty in-process caches and the fake APIs above."""
+    monkeypatch.setattr(doi_store, "_store", None)
+    monkeypatch.setattr(doi_store, "_store_failed", True)
+    for memo in ("_crossref_records", "_openalex_records", "_citation_memo", "_orcid_works_memo"):
+        monkeypatch.setattr(paper_count, memo, {})
+    monkeypatch.setattr(http_client, "request", _fake_request)
+
+
+def _workbook(orcids):
+    buf = io.BytesIO()
+    pd.DataFrame([{"Name": f"Prof {i}", "ORCID ID": orcid, "Join Date": "2018-01-01"}
+                  for i, orcid in enumerate(orcids)]).to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def test_slices_process_a_few_rows_each_and_the_last_assembles_the_workbook(offline, tmp_path):
+    store = checkpoints.SQLiteCheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+    orcids = ["0000-0002-1825-0097", "0000-0001-5109-3700", "0000-0002-1694-233X"]
+    params = {"start_year": 2015, "end_year": 2025}
+
+    token, out_path, status = app.process_upload_slice(file_bytes=_workbook(orcids), params=params,
+                                                       max_rows=2, store=store)
+    assert out_path is None
+    assert (status["total"], status["completed"], status["processed"], status["remaining"]) == (3, 2, 2, 1)
+
+    again, out_path, status = app.process_upload_slice(token, max_rows=2, store=store)
+    assert again == token
+    assert (status["completed"], status["processed"], status["remaining"]) == (3, 1, 0)
+    journal = pd.read_excel(out_path, sheet_name="Journal")
+    assert sorted(journal["Professor ORCID"]) == sorted(orcids)
+    assert sorted(journal["Article Title"]) == sorted(f"Paper of {orcid}" for orcid in orcids)
+    # The finished batch is gone from the store
+    assert app.process_upload_slice(token, store=store) is None
+
+
+class _OrcidAPI:
+    """One researcher with `works` journal articles; OpenAlex batches count `citations` for each DOI."""
+
+    def __init__(self, works, citations):
+        self.works, self.citations = works, citations
+        self.urls = []
+
+    def request(self, method, url, params=None, json=None, **kwargs):
+        self.urls.append(url if url != "https://api.openalex.org/works" else f"{url}?filter={params['filter']}")
+        if url.endswith("/record"):
+            summaries = [{"put-code": n, "type": "journal-article", "title": {"title": {"value": f"Paper {n}"}},
+                          "external-ids": {"external-id": [{"external-id-type": "doi",
+                                                            "external-id-value": f"10.1/w{n}"}]},
+                          "publication-date": {"year": {"value": "2020"}}, "last-modified-date": {"value": 1}}
+                         for n in range(1, self.works + 1)]
+            return _Response(200, {"person": {}, "activities-summary": {"works": {
+                "group": [{"work-summary": [s]} for s in summaries]}}})
+        bulk = re.match(r"https://pub\.orcid\.org/v3\.0/[^/]+/works/([\d,]+)$", url)
+        if bulk:
+            return _Response(200, {"bulk": [{"work": {"put-code": int(code), "contributors": {"contributor": []}}}
+                                            for code in bulk.group(1).split(",")]})
+        if url == "https://api.openalex.org/works" and params.get("filter", "").startswith("doi:"):
+            return _Response(200, {"results": [{"doi": f"https://doi.org/{doi}", "cited_by_count": self.citations}
+                                               for doi in params["filter"][len("doi:"):].split("|")]})
+        return _Response(404, {})
+
+
+def test_rerun_refreshes_expired_counts_of_reused_works_in_one_batch(offline, monkeypatch):
+    orcid = "0000-0002-1825-0097"
+    since, until = datetime.datetime(2015, 1, 1), datetime.datetime(2025, 12, 31)
+
+    def run():
+        profiles, _ = app._fetch_and_enrich_threaded([orcid], None, None, 4)
+        return paper_count._get_publications_from_orcid(orcid, since, until, profile=profiles[orcid])
+
+    monkeypatch.setattr(http_client, "request", _OrcidAPI(20, citations=5).request)
+    assert {row["Citation Count"] for row in run()["journal"]} == {5}
+
+    # A month later: every count has expired and one work was added
+    for key, (count, _) in list(paper_count._citation_memo.items()):
+        paper_count._citation_memo[key] = (count, 0)
+    api = _OrcidAPI(21, citations=9)
+    monkeypatch.setattr(http_client, "request", api.request)
+    journal = run()["journal"]
+    assert len(journal) == 21 and {row["Citation Count"] for row in journal} == {9}
+    # No per-DOI OpenAlex lookups: all 21 counts come from one batch
+    assert [url for url in api.urls if url.startswith("https://api.openalex.org/works/")] == []
+    assert len([url for url in api.urls if url.startswith("https://api.openalex.org/works?filter=doi:")]) == 1
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+import async_engine
+import http_client
+import paper_count as pc
+
+
+def test_spent_budget_stops_fetch_and_enrich():
+    budget = http_client.Budget()
+    budget.cancel()
+    token = http_client.use_budget(budget)
+    try:
+        # Every ORCID task stops before sending; gather must not report it as a fetch failure
+        with pytest.raises(http_client.BudgetExceeded):
+            async_engine.run_fetch_and_enrich(["0000-0002-1825-0097", "0000-0001-5109-3700"])
+    finally:
+        http_client.reset_budget(token)
+    assert budget.tripped == "cancelled"
+
+
+def test_reraise_stops_keeps_ordinary_failures():
+    async_engine._reraise_stops([{}, ValueError("bad answer"), http_client.PermanentFetchError("gone", 404)])
+    with pytest.raises(http_client.BudgetExceeded):
+        async_engine._reraise_stops([{}, http_client.BudgetExceeded("deadline")])
+
+
+def test_prefetch_reads_caches_off_the_event_loop(monkeypatch):
+    loop_threads, lookup_threads = [], []
+
+    def lookup(key, source, count_stats=True):
+        lookup_threads.append(threading.current_thread())
+        return True, 1
+
+    async def prefetch():
+        loop_threads.append(threading.current_thread())
+        await async_engine.prefetch_doi_metadata(None, ["10.1000/a", "10.1000/b"])
+
+    monkeypatch.setattr(pc, "_lookup_record", lambda memo, source, key: (True, {}))
+    monkeypatch.setattr(pc, "_lookup_citation", lookup)
+    monkeypatch.setattr(pc, "GetCitedByCountFromOpenAlex", lambda doi, count_stats=True: 1)
+    asyncio.run(prefetch())
+    assert lookup_threads and loop_threads[0] not in lookup_threads
@@ -0,0 +1,61 @@
+import pytest
+
+import checkpoints
+
+
+@pytest.fixture(params=["sqlite", "filesystem"])
+def store(request, tmp_path):
+    if request.param == "filesystem":
+        return checkpoints.FilesystemCheckpointStore(str(tmp_path / "checkpoints"))
+    return checkpoints.SQLiteCheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+
+
+def test_batch_key_follows_the_workbook_and_parameters():
+    key = checkpoints.batch_key(b"sheet", start_year=2015, end_year=2025)
+    assert key == checkpoints.batch_key(b"sheet", end_year=2025, start_year=2015)
+    assert key != checkpoints.batch_key(b"sheet", start_year=2016, end_year=2025)
+    assert key != checkpoints.batch_key(b"sheet", b"faculty", start_year=2015, end_year=2025)
+
+
+def test_saved_results_load_per_batch(store):
+    batch, other = "ab" * 32, "cd" * 32
+    store.save(batch, "0000-0002-1825-0097", {"pubs": [{"Title": "A paper"}]})
+    store.save(batch, "row-3", {"error": "No ORCID"})
+    store.save(other, "row-1", {"pubs": []})
+    assert store.load(batch) == {"0000-0002-1825-0097": {"pubs": [{"Title": "A paper"}]},
+                                 "row-3": {"error": "No ORCID"}}
+    store.clear(batch)
+    assert store.load(batch) == {}
+    assert store.load(other) == {"row-1": {"pubs": []}}
+
+
+def test_checkpoints_past_their_ttl_are_ignored(store, monkeypatch):
+    batch = "ab" * 32
+    store.save(batch, "row-1", {"pubs": []})
+    monkeypatch.setenv("CHECKPOINT_TTL", "-1")
+    assert store.load(batch) == {}
+
+
+def test_saved_input_round_trips_until_cleared(store):
+    batch = "ab" * 32
+    assert store.load_input(batch) is None
+    store.save_input(batch, b"sheet\x00bytes", None, {"start_year": 2015})
+    assert store.load_input(batch) == (b"sheet\x00bytes", None, {"start_year": 2015})
+    store.save_input(batch, b"sheet", b"faculty", {})
+    assert store.load_input(batch) == (b"sheet", b"faculty", {})
+    store.clear(batch)
+    assert store.load_input(batch) is None
+
+
+def test_saved_input_past_its_ttl_is_gone(store, monkeypatch):
+    batch = "ab" * 32
+    store.save_input(batch, b"sheet")
+    monkeypatch.setenv("CHECKPOINT_TTL", "-1")
+    assert store.load_input(batch) is None
+
+
+def test_filesystem_store_rejects_batch_keys_that_are_not_hex(tmp_path):
+    store = checkpoints.FilesystemCheckpointStore(str(tmp_path / "checkpoints"))
+    for batch in ("../escape", "", "AB" * 32):
+        with pytest.raises(ValueError):
+            store.save(batch, "row-1", {})
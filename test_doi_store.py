@@ -0,0 +1,68 @@
+import datetime
+import time
+
+import pytest
+
+import doi_store
+import paper_count
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A fresh on-disk store as the process-wide one, with empty in-process caches."""
+    store = doi_store.DOIStore(str(tmp_path / "doi_store.sqlite3"))
+    monkeypatch.setattr(doi_store, "_store", store)
+    monkeypatch.setattr(doi_store, "_stats", {})
+    monkeypatch.setattr(paper_count, "_citation_memo", {})
+    monkeypatch.setattr(paper_count, "_orcid_works_memo", {})
+    return store
+
+
+def test_metadata_is_kept_and_citations_carry_their_expiry(store):
+    store.put_metadata("10.1000/a", "crossref", {"publisher": "Pub"})
+    assert store.get_metadata("10.1000/a", "crossref") == {"publisher": "Pub"}
+    assert store.get_metadata("10.1000/a", "openalex") is None
+
+    store.put_citation("10.1000/a", "openalex", 12, ttl=60)
+    count, expires_at = store.get_citation("10.1000/a", "openalex")
+    assert count == 12 and expires_at == pytest.approx(time.time() + 60, abs=5)
+
+
+def test_expired_citation_is_stale_until_refetched(store):
+    store.put_citation("10.1000/a", "openalex", 12, ttl=-1)
+    assert paper_count._lookup_citation("10.1000/a", "openalex") == (False, None)
+    assert doi_store.get_cache_stats()["openalex"]["stale"] == 1
+
+    paper_count._save_citation("10.1000/a", "openalex", 15, publication_year=2000)
+    paper_count._citation_memo.clear()
+    assert paper_count._lookup_citation("10.1000/a", "openalex") == (True, 15)
+
+
+def test_negative_entries_expire_after_the_negative_ttl(store, monkeypatch):
+    monkeypatch.setenv("DOI_NEGATIVE_TTL", "0")
+    paper_count._save_citation("10.1000/gone", "openalex", None)
+    assert paper_count._lookup_citation("10.1000/gone", "openalex") == (False, None)
+
+    monkeypatch.setenv("DOI_NEGATIVE_TTL", "3600")
+    paper_count._save_citation("10.1000/gone", "openalex", None)
+    assert paper_count._lookup_citation("10.1000/gone", "openalex") == (True, None)
+
+
+def test_citation_ttl_grows_with_publication_age(monkeypatch):
+    this_year = datetime.date.today().year
+    ttls = [doi_store.citation_ttl(this_year - age) for age in (0, 3, 8, 30)]
+    assert ttls == sorted(ttls) and len(set(ttls)) == 4
+    monkeypatch.setenv("DOI_CITATION_TTL", "123")
+    assert doi_store.citation_ttl(None) == 123
+
+
+def test_orcid_works_expire_after_their_ttl(store, monkeypatch):
+    record = {"format": paper_count.ORCID_WORKS_FORMAT, "works": []}
+    paper_count._save_orcid_works("0000-0002-1825-0097", record)
+    assert paper_count._lookup_orcid_works("0000-0002-1825-0097") == record
+
+    monkeypatch.setenv("ORCID_WORKS_TTL", "-1")
+    paper_count._orcid_works_memo.clear()
+    assert paper_count._lookup_orcid_works("0000-0002-1825-0097") is None
+    # An incremental refresh still starts from the expired record
+    assert paper_count._lookup_orcid_works("0000-0002-1825-0097", include_expired=True) == record
@@ -0,0 +1,87 @@
+import types
+
+import pytest
+
+import http_client
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual clock standing in for http_client's time module."""
+    now = [100.0]
+    fake = types.SimpleNamespace(monotonic=lambda: now[0], time=lambda: now[0])
+    fake.advance = lambda seconds: now.__setitem__(0, now[0] + seconds)
+    monkeypatch.setattr(http_client, "time", fake)
+    return fake
+
+
+def test_token_bucket_spends_its_burst_then_waits(clock):
+    bucket = http_client.TokenBucket(rate=2, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    # The next caller queues behind the one already waiting
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_token_bucket_refills_at_its_rate_up_to_capacity(clock):
+    bucket = http_client.TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        bucket.reserve()
+    clock.advance(1.0)
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() > 0
+    clock.advance(60.0)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() > 0
+
+
+def test_token_bucket_pause_holds_callers_without_a_burst_after(clock):
+    bucket = http_client.TokenBucket(rate=2, capacity=3)
+    bucket.pause(10)
+    clock.advance(4.0)
+    assert bucket.reserve() == pytest.approx(6.5)
+    clock.advance(6.0)
+    # Nothing refilled during the pause: the callers after it are paced at the rate
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock.advance(1.0)
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_callers_queued_during_a_pause_are_spread_after_it(clock):
+    bucket = http_client.TokenBucket(rate=2, capacity=3)
+    bucket.pause(10)
+    waits = [bucket.reserve() for _ in range(3)]
+    assert waits == [pytest.approx(10.5), pytest.approx(11.0), pytest.approx(11.5)]
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_raise_for_outcome_accepts_200():
+    http_client.raise_for_outcome(_Response(200), "ORCID record")
+
+
+@pytest.mark.parametrize("status, error", [
+    (500, http_client.RetryableFetchError),
+    (503, http_client.RetryableFetchError),
+    (408, http_client.RetryableFetchError),
+    (404, http_client.PermanentFetchError),
+    (400, http_client.PermanentFetchError),
+    (409, http_client.PermanentFetchError),
+])
+def test_raise_for_outcome_maps_status_to_error(status, error):
+    with pytest.raises(error) as raised:
+        http_client.raise_for_outcome(_Response(status), "ORCID record")
+    assert type(raised.value) is error
+    assert raised.value.status == status
+    assert raised.value.retryable == (error is http_client.RetryableFetchError)
+
+
+def test_raise_for_outcome_keeps_retry_after_of_429():
+    with pytest.raises(http_client.RateLimitedError) as raised:
+        http_client.raise_for_outcome(_Response(429, {"Retry-After": "7"}), "ORCID record")
+    assert raised.value.retryable
+    assert raised.value.retry_after == 7.0
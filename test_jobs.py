@@ -0,0 +1,116 @@
+import os
+import time
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    """Queues sharing one database, each standing for a separate worker process."""
+    def make(token):
+        return jobs.JobQueue(str(tmp_path / 'jobs.sqlite3'), str(tmp_path / 'results'), token=token)
+    return make
+
+
+def test_job_of_a_process_that_stopped_beating_is_requeued(make_queue, monkeypatch):
+    old, new = make_queue('old-boot'), make_queue('new-boot')
+    job_id = old.submit(b'sheet')
+    old.beat()
+    assert old.claim()[0] == job_id
+    # Same PID after a container restart, but the old token is no longer refreshed
+    monkeypatch.setattr(jobs, 'WORKER_TIMEOUT', 0.0)
+    time.sleep(0.01)
+    new.beat()
+    assert [orphan for orphan, _ in new.requeue_orphans()] == [job_id]
+    assert new.get(job_id)['status'] == jobs.QUEUED
+    assert new.claim()[0] == job_id
+
+
+def test_job_of_a_live_process_is_left_running(make_queue):
+    worker, other = make_queue('worker'), make_queue('other')
+    job_id = worker.submit(b'sheet')
+    worker.beat()
+    worker.claim()
+    other.beat()
+    assert other.requeue_orphans() == []
+    assert other.get(job_id)['status'] == jobs.RUNNING
+
+
+def test_cancelled_orphan_is_not_run_again(make_queue):
+    gone, new = make_queue('gone'), make_queue('new')
+    job_id = gone.submit(b'sheet')
+    gone.claim()
+    gone.cancel(job_id)
+    new.requeue_orphans()
+    assert new.get(job_id)['status'] == jobs.CANCELLED
+    assert new.claim() is None
+
+
+class _Bus:
+    def publish(self, job_id, event, data):
+        pass
+
+
+def test_eta_ignores_rows_restored_from_checkpoints(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(jobs.time, 'time', lambda: clock[0])
+    progress = jobs.JobProgress('eta-job', event_bus=_Bus())
+    progress('start', total=10, restored=6)
+    for _ in range(6):
+        progress('orcid', outcome='succeeded')
+    assert progress.snapshot()['eta_seconds'] is None
+    clock[0] += 4.0
+    progress('orcid', outcome='succeeded')
+    # One fresh row took 4s; three remain
+    assert progress.snapshot()['eta_seconds'] == 12.0
+    progress.finish(jobs.DONE)
+
+
+def test_event_stream_of_a_running_job_ends_for_the_browser_to_reconnect(make_queue):
+    job_queue = make_queue('worker')
+    job_id = job_queue.submit(b'sheet')
+    job_queue.claim()
+    events = list(jobs.stream_events(job_queue, job_id, heartbeat=0.05, max_seconds=0.2))
+    assert events[0].startswith('retry: ')
+    assert events[1].startswith('event: progress\n')
+    assert not any(event.startswith(f'event: {jobs.DONE}') for event in events)
+
+
+def test_event_stream_of_a_finished_job_sends_its_final_event(make_queue, tmp_path):
+    job_queue = make_queue('worker')
+    job_id = job_queue.submit(b'sheet')
+    job_queue.claim()
+    out_path = tmp_path / 'out.xlsx'
+    out_path.write_bytes(b'xlsx')
+    job_queue.finish(job_id, str(out_path))
+    events = list(jobs.stream_events(job_queue, job_id, max_seconds=0))
+    assert events[-1].startswith(f'event: {jobs.DONE}\n')
+
+
+def test_failed_job_drops_its_upload(make_queue):
+    job_queue = make_queue('worker')
+    job_id = job_queue.submit(b'sheet')
+    job_queue.claim()
+    job_queue.fail(job_id, 'bad sheet')
+    row = job_queue._conn().execute('SELECT input FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    assert bytes(row[0]) == b''
+
+
+def test_jobs_past_their_retention_are_purged_with_their_workbooks(make_queue, tmp_path, monkeypatch):
+    job_queue = make_queue('worker')
+    done_id, running_id = job_queue.submit(b'sheet'), job_queue.submit(b'sheet')
+    job_queue.claim()
+    out_path = tmp_path / 'out.xlsx'
+    out_path.write_bytes(b'xlsx')
+    job_queue.finish(done_id, str(out_path))
+    job_queue.claim()
+    result_path = job_queue.get(done_id)['result_path']
+
+    assert job_queue.purge_expired() == 0
+    monkeypatch.setenv('JOB_RETENTION', '-1')
+    assert job_queue.purge_expired() == 1
+    assert job_queue.get(done_id) is None
+    assert not os.path.exists(result_path)
+    assert job_queue.get(running_id)['status'] == jobs.RUNNING
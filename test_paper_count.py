@@ -0,0 +1,290 @@
+import json
+
+import pytest
+
+import doi_store
+import http_client
+import paper_count
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+        self.headers = {}
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self._data
+
+
+def _crossref_work(doi):
+    return {"DOI": doi, "author": [{"given": "Ann", "family": "Lee"}], "publisher": "Pub",
+            "container-title": ["Journal"], "published-print": {"date-parts": [[2020, 1]]}}
+
+
+def _fake_request(method, url, params=None, json=None, **kwargs):
+    """CrossRef and OpenAlex DOI batch endpoints; every DOI is known with 5 citations."""
+    if url == "https://api.crossref.org/works":
+        dois = [f[len("doi:"):] for f in params["filter"].split(",")]
+        return FakeResponse(200, {"message": {"items": [_crossref_work(d) for d in dois]}})
+    if url == "https://api.openalex.org/works":
+        dois = params["filter"][len("doi:"):].split("|")
+        return FakeResponse(200, {"results": [{"doi": f"https://doi.org/{d}", "cited_by_count": 5,
+                                               "publication_year": 2020} for d in dois]})
+    return FakeResponse(404, {})
+
+
+@pytest.fixture
+def cold_cache(monkeypatch):
+    """Empty in-process DOI caches, no persistent store and fake API answers."""
+    monkeypatch.setattr(doi_store, "_store", None)
+    monkeypatch.setattr(doi_store, "_store_failed", True)
+    monkeypatch.setattr(doi_store, "_stats", {})
+    for memo in ("_crossref_records", "_openalex_records", "_citation_memo", "_orcid_works_memo"):
+        monkeypatch.setattr(paper_count, memo, {})
+    monkeypatch.setattr(http_client, "request", _fake_request)
+
+
+def test_cold_cache_stats_are_all_misses(cold_cache):
+    dois = [f"10.1000/{i}" for i in range(10)]
+    paper_count.PrefetchDOIMetadata(dois)
+    for doi in dois:
+        assert paper_count.GetDOIMetadata(doi).citation_count == 5
+
+    stats = doi_store.get_cache_stats()["openalex"]
+    assert (stats["miss"], stats["hit"], stats["lookups"]) == (10, 0, 10)
+    assert stats["hit_rate"] == 0.0
+
+
+def test_warm_cache_stats_are_hits(cold_cache):
+    dois = [f"10.1000/{i}" for i in range(10)]
+    paper_count.PrefetchDOIMetadata(dois)
+    doi_store._stats.clear()
+
+    paper_count.PrefetchDOIMetadata(dois)
+    for doi in dois:
+        paper_count.GetDOIMetadata(doi)
+
+    stats = doi_store.get_cache_stats()["openalex"]
+    assert (stats["hit"], stats["miss"], stats["lookups"]) == (10, 0, 10)
+
+
+def _orcid_profile(work_type, doi=None, put_code=7):
+    external_ids = [{"external-id-type": "doi", "external-id-value": doi}] if doi else []
+    summary = {"put-code": put_code, "type": work_type, "title": {"title": {"value": "A paper"}},
+               "external-ids": {"external-id": external_ids},
+               "publication-date": {"year": {"value": "2020"}}, "last-modified-date": {"value": 1}}
+    return {"orcid": "0000-0002-1825-0097", "name": "Ann Lee",
+            "works": {"group": [{"work-summary": [summary]}]},
+            "contributors": {str(put_code): ["Ann Lee", "Bob Yu"]},
+            "openalex": {"title": {}}, "previous": None, "changed": None, "enriched": True}
+
+
+def test_authors_in_school_is_the_faculty_member(cold_cache):
+    record = paper_count._parse_orcid_works("0000-0002-1825-0097", _orcid_profile("journal-article"))
+    row = record["works"][0]["row"]
+    assert row["Authors in School"] == "Ann Lee"
+    assert row["All Authors"] == "Ann Lee, Bob Yu"
+
+
+def test_reused_works_record_serves_current_citation_counts(cold_cache, monkeypatch):
+    profile = dict(_orcid_profile("journal-article", doi="10.1000/a"), enriched=False)
+    record = paper_count._parse_orcid_works("0000-0002-1825-0097", profile)
+    assert "Citation Count" not in record["works"][0]["row"]
+    assert paper_count._publications_in_range(record, 2015, 2025)["journal"][0]["Citation Count"] == 5
+
+    # The count expires and OpenAlex now reports more citations
+    for key, (count, _) in list(paper_count._citation_memo.items()):
+        paper_count._citation_memo[key] = (count, 0)
+
+    def more_citations(method, url, params=None, **kwargs):
+        response = _fake_request(method, url, params=params, **kwargs)
+        for work in response.json().get("results", []) if url == "https://api.openalex.org/works" else []:
+            work["cited_by_count"] = 9
+        return response
+
+    monkeypatch.setattr(http_client, "request", more_citations)
+    assert paper_count._publications_in_range(record, 2015, 2025)["journal"][0]["Citation Count"] == 9
+
+
+def test_unknown_citation_count_of_a_chapter_is_zero(cold_cache, monkeypatch):
+    monkeypatch.setattr(http_client, "request", lambda method, url, **kwargs: FakeResponse(404, {}))
+    profile = dict(_orcid_profile("book-chapter", doi="10.1000/unknown"), enriched=False)
+    record = paper_count._parse_orcid_works("0000-0002-1825-0097", profile)
+    assert paper_count._publications_in_range(record, 2015, 2025)["chapter"][0]["Citation Count"] == 0
+
+
+def test_crossref_name_search_walks_cursor_pages_up_to_its_cap(cold_cache, monkeypatch):
+    import datetime
+
+    pages = []
+
+    def search(method, url, params=None, **kwargs):
+        if url == "https://api.crossref.org/works" and "query.author" in params:
+            pages.append(params)
+            page = len(pages)
+            items = [_crossref_work(f"10.1000/p{page}-{i}") for i in range(params["rows"])]
+            return FakeResponse(200, {"message": {"next-cursor": f"c{page + 1}", "items": items}})
+        return _fake_request(method, url, params=params, **kwargs)
+
+    monkeypatch.setattr(http_client, "request", search)
+    pubs = paper_count._search_crossref("Ann Lee", datetime.datetime(2015, 1, 1), datetime.datetime(2025, 12, 31))
+    assert [(p["cursor"], p["rows"]) for p in pages] == [("*", 100), ("c2", 100)]
+    assert len(pubs) == paper_count.CROSSREF_SEARCH_MAX_RESULTS == 200
+    assert {pub["citation_count"] for pub in pubs} == {5}
+
+
+class _Recorder:
+    """Fake http_client.request that logs every call and answers with `answer(method, url, params, json)`."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    def __call__(self, method, url, params=None, json=None, **kwargs):
+        self.calls.append((method, url, params, json))
+        return self.answer(method, url, params, json)
+
+
+def _openalex_batch(known_count=5, missing=()):
+    def answer(method, url, params, json):
+        dois = params["filter"][len("doi:"):].split("|")
+        return FakeResponse(200, {"results": [{"doi": f"https://doi.org/{d}", "cited_by_count": known_count}
+                                              for d in dois if d not in missing]})
+    return answer
+
+
+def test_openalex_batches_are_split_at_the_batch_size(cold_cache, monkeypatch):
+    api = _Recorder(_openalex_batch())
+    monkeypatch.setattr(http_client, "request", api)
+    dois = [f"10.1000/{i}" for i in range(2 * paper_count.OPENALEX_BATCH_SIZE + 1)]
+    assert paper_count.FetchOpenAlexWorksByDOI(dois) == 3
+    sizes = [len(params["filter"][len("doi:"):].split("|")) for _, _, params, _ in api.calls]
+    assert sizes == [paper_count.OPENALEX_BATCH_SIZE, paper_count.OPENALEX_BATCH_SIZE, 1]
+    assert all(paper_count._lookup_citation(paper_count._doi_key(d), "openalex") == (True, 5) for d in dois)
+
+
+def test_openalex_partial_batch_caches_the_missing_doi_as_unknown(cold_cache, monkeypatch):
+    monkeypatch.setattr(http_client, "request", _Recorder(_openalex_batch(missing={"10.1000/b"})))
+    paper_count.FetchOpenAlexWorksByDOI(["10.1000/a", "10.1000/b"])
+    assert paper_count._lookup_citation("10.1000/a", "openalex") == (True, 5)
+    assert paper_count._lookup_citation("10.1000/b", "openalex") == (True, None)
+
+
+def test_openalex_doi_in_two_batches_is_fetched_once(cold_cache, monkeypatch):
+    api = _Recorder(_openalex_batch())
+    monkeypatch.setattr(http_client, "request", api)
+    paper_count.FetchOpenAlexWorksByDOI(["10.1000/a", "https://doi.org/10.1000/A", "10.1000/b"])
+    assert paper_count.FetchOpenAlexWorksByDOI(["10.1000/b", "10.1000/c"]) == 1
+    requested = [params["filter"] for _, _, params, _ in api.calls]
+    assert requested == ["doi:10.1000/a|10.1000/b", "doi:10.1000/c"]
+
+
+def _crossref_batch(missing=()):
+    def answer(method, url, params, json):
+        if url != "https://api.crossref.org/works":
+            return FakeResponse(404, {})
+        dois = [f[len("doi:"):] for f in params["filter"].split(",")]
+        return FakeResponse(200, {"message": {"items": [_crossref_work(d) for d in dois if d not in missing]}})
+    return answer
+
+
+def test_crossref_batches_are_split_at_the_batch_size(cold_cache, monkeypatch):
+    api = _Recorder(_crossref_batch())
+    monkeypatch.setattr(http_client, "request", api)
+    dois = [f"10.1000/{i}" for i in range(paper_count.CROSSREF_BATCH_SIZE + 2)]
+    assert paper_count.FetchCrossRefWorksByDOI(dois) == 2
+    filters = [params["filter"].split(",") for _, _, params, _ in api.calls]
+    assert [len(f) for f in filters] == [paper_count.CROSSREF_BATCH_SIZE, 2]
+    assert filters[1] == [f"doi:10.1000/{paper_count.CROSSREF_BATCH_SIZE}",
+                          f"doi:10.1000/{paper_count.CROSSREF_BATCH_SIZE + 1}"]
+    assert [params["rows"] for _, _, params, _ in api.calls] == [paper_count.CROSSREF_BATCH_SIZE, 2]
+
+
+def test_crossref_partial_batch_remembers_the_missing_doi_as_unknown(cold_cache, monkeypatch):
+    api = _Recorder(_crossref_batch(missing={"10.1000/b"}))
+    monkeypatch.setattr(http_client, "request", api)
+    paper_count.FetchCrossRefWorksByDOI(["10.1000/a", "10.1000/b"])
+    assert paper_count._get_crossref_record("10.1000/a")["publisher"] == "Pub"
+    assert paper_count._get_crossref_record("10.1000/b") is None
+    # Neither DOI is looked up again on its own
+    assert len(api.calls) == 1
+
+
+def test_crossref_doi_in_two_batches_is_fetched_once(cold_cache, monkeypatch):
+    api = _Recorder(_crossref_batch())
+    monkeypatch.setattr(http_client, "request", api)
+    paper_count.FetchCrossRefWorksByDOI(["10.1000/a", "10.1000/b"])
+    assert paper_count.FetchCrossRefWorksByDOI(["10.1000/B", "10.1000/c"]) == 1
+    assert api.calls[-1][2]["filter"] == "doi:10.1000/c"
+
+
+def test_crossref_doi_that_breaks_the_filter_is_looked_up_alone(cold_cache, monkeypatch):
+    api = _Recorder(_crossref_batch())
+    monkeypatch.setattr(http_client, "request", api)
+    assert paper_count.FetchCrossRefWorksByDOI(["10.1000/a", "10.1000/x,y"]) == 2
+    assert [url for _, url, _, _ in api.calls] == ["https://api.crossref.org/works",
+                                                   "https://api.crossref.org/works/10.1000/x,y"]
+
+
+def _semantic_scholar_batch(unknown=()):
+    def answer(method, url, params, json):
+        return FakeResponse(200, [None if i[len("DOI:"):] in unknown else {"citationCount": 42, "year": 2019}
+                                  for i in json["ids"]])
+    return answer
+
+
+def test_semantic_scholar_batches_are_split_at_the_batch_size(cold_cache, monkeypatch):
+    monkeypatch.setattr(paper_count, "SEMANTIC_SCHOLAR_BATCH_SIZE", 2)
+    api = _Recorder(_semantic_scholar_batch())
+    monkeypatch.setattr(http_client, "request", api)
+    assert paper_count.FetchSemanticScholarCitations(["10.1000/a", "10.1000/b", "10.1000/c"]) == 2
+    assert [(method, url, body["ids"]) for method, url, _, body in api.calls] == [
+        ("POST", paper_count.SEMANTIC_SCHOLAR_BATCH_URL, ["DOI:10.1000/a", "DOI:10.1000/b"]),
+        ("POST", paper_count.SEMANTIC_SCHOLAR_BATCH_URL, ["DOI:10.1000/c"]),
+    ]
+
+
+def test_semantic_scholar_null_entry_caches_that_doi_as_unknown(cold_cache, monkeypatch):
+    monkeypatch.setattr(http_client, "request", _Recorder(_semantic_scholar_batch(unknown={"10.1000/b"})))
+    paper_count.FetchSemanticScholarCitations(["10.1000/a", "10.1000/b", "10.1000/c"])
+    # The answer is positional: the null in the middle belongs to 10.1000/b only
+    assert paper_count._lookup_citation("10.1000/a", "semanticscholar") == (True, 42)
+    assert paper_count._lookup_citation("10.1000/b", "semanticscholar") == (True, None)
+    assert paper_count._lookup_citation("10.1000/c", "semanticscholar") == (True, 42)
+
+
+def test_semantic_scholar_doi_in_two_batches_is_fetched_once(cold_cache, monkeypatch):
+    api = _Recorder(_semantic_scholar_batch(unknown={"10.1000/b"}))
+    monkeypatch.setattr(http_client, "request", api)
+    paper_count.FetchSemanticScholarCitations(["10.1000/a", "10.1000/b"])
+    assert paper_count.FetchSemanticScholarCitations(["10.1000/a", "10.1000/b", "10.1000/c"]) == 1
+    assert api.calls[-1][3]["ids"] == ["DOI:10.1000/c"]
+
+
+def test_search_sources_reports_late_and_failing_sources_as_failed():
+    import threading
+    import time
+
+    release = threading.Event()
+
+    def fast(name, start, end):
+        return [{"title": "fast"}]
+
+    def slow(name, start, end):
+        release.wait(5)
+        return [{"title": "late"}]
+
+    def broken(name, start, end):
+        raise RuntimeError("HTTP 500")
+
+    started = time.monotonic()
+    try:
+        pubs, status = paper_count.SearchSourcesConcurrently(
+            "Ann Lee", None, None, [("Slow", slow), ("Fast", fast), ("Broken", broken)], deadline=0.2)
+    finally:
+        release.set()
+    assert time.monotonic() - started < 2
+    assert pubs == [{"title": "fast"}]
+    assert status == {"Slow": "failed: timed out after 0.2s", "Fast": "ok", "Broken": "failed: HTTP 500"}